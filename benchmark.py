@@ -0,0 +1,661 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import main
+from instrumentation import SuiviMemoire
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_CSV = os.path.join(BASE_DIR, "crime_reports.csv")
+
+# --- Données synthétiques ---
+
+def _tirer_copies(rng, n, taux):
+    """Positions à remplacer (au taux donné) et, pour chacune, une ligne antérieure non remplacée à copier."""
+    cibles = np.flatnonzero(rng.random(n) < taux)
+    gardees = np.setdiff1d(np.arange(n), cibles)
+    nb_avant = np.searchsorted(gardees, cibles)
+    cibles, nb_avant = cibles[nb_avant > 0], nb_avant[nb_avant > 0]
+    sources = gardees[(rng.random(len(cibles)) * nb_avant).astype(np.int64)]
+    return cibles, sources
+
+def generer_fichier_synthetique(chemin, nb_lignes, graine=0, taille_bloc=1_000_000):
+    """Écrit un CSV de nb_lignes qui reproduit le mélange d'anomalies de crime_reports.csv.
+
+    Les lignes sont tirées du fichier réel : Crime nul, intervalles de dates, Reporting
+    Area non numériques, quartiers invalides et rapports antérieurs au crime gardent
+    leur fréquence. Les File Number sont renumérotés, puis les File Number répétés et
+    les doublons exacts sont réinjectés aux taux mesurés sur le fichier réel.
+    """
+    source = pd.read_csv(SOURCE_CSV, dtype=str)
+    doublons = source.duplicated()
+    taux_doublons = doublons.mean()
+    taux_doublons_id = (~doublons & source['File Number'].duplicated()).mean()
+    source = source[~doublons]
+    rng = np.random.default_rng(graine)
+    ecrites = 0
+    while ecrites < nb_lignes:
+        n = min(taille_bloc, nb_lignes - ecrites)
+        bloc = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+        annees = bloc['File Number'].str[:4].fillna("2016")
+        numeros = pd.Series(ecrites + np.arange(n)).astype(str).str.zfill(8)
+        ids = (annees + "-" + numeros).to_numpy()
+        # File Number déjà attribué à une autre ligne du bloc (taux corrigé : une partie
+        # de ces lignes est ensuite écrasée par les doublons exacts)
+        cibles, sources = _tirer_copies(rng, n, taux_doublons_id / (1 - taux_doublons))
+        ids[cibles] = ids[sources]
+        bloc['File Number'] = ids
+        # Doublons exacts : copie complète d'une ligne antérieure du bloc
+        lignes = np.arange(n)
+        cibles, sources = _tirer_copies(rng, n, taux_doublons)
+        lignes[cibles] = sources
+        bloc = bloc.take(lignes)
+        bloc.to_csv(chemin, mode='w' if ecrites == 0 else 'a', header=(ecrites == 0), index=False)
+        ecrites += n
+    return chemin
+
+def fichier_synthetique(nb_lignes, dossier=None, graine=0):
+    """Retourne le chemin du fichier synthétique (généré s'il n'existe pas)."""
+    dossier = dossier or os.path.join(BASE_DIR, "bench_data")
+    os.makedirs(dossier, exist_ok=True)
+    chemin = os.path.join(dossier, f"crimes_{nb_lignes}_{graine}.csv")
+    if not os.path.exists(chemin):
+        print(f"Génération de {chemin} ...")
+        generer_fichier_synthetique(chemin, nb_lignes, graine)
+    return chemin
+
+def taux_anomalies(df):
+    """Part (%) de chaque type d'anomalie dans un fichier brut."""
+    doublons = df.duplicated()
+    report = main.parser_date_report(df['Date of Report'])
+    debut, fin = main.parser_intervalle_crime(df['Crime Date Time'])
+    taux = {
+        "doublons exacts": doublons,
+        "File Number répétés": ~doublons & df['File Number'].duplicated(),
+        "Crime nul": df['Crime'].isna(),
+        "intervalles de dates": fin > debut,
+        "dates invalides": report.isna() | debut.isna(),
+        "Reporting Area non numérique": pd.to_numeric(df['Reporting Area'], errors='coerce').isna(),
+        "Neighborhood invalide": ~df['Neighborhood'].isin(main.VALID_NEIGHBORHOODS),
+        "rapport avant le crime": report < debut,
+    }
+    return {anomalie: round(100 * masque.mean(), 3) for anomalie, masque in taux.items()}
+
+def chronometrer(fonction, *args, repetitions=1):
+    """Retourne le meilleur temps (s) sur plusieurs répétitions."""
+    meilleur = float('inf')
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction(*args)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur
+
+def mesurer(etape, fonction, *args, **kwargs):
+    """Exécute une étape sans ses affichages ; retourne son résultat et ses mesures."""
+    with SuiviMemoire() as memoire, contextlib.redirect_stdout(io.StringIO()):
+        debut, debut_cpu = time.perf_counter(), time.process_time()
+        resultat = fonction(*args, **kwargs)
+        secondes, cpu = time.perf_counter() - debut, time.process_time() - debut_cpu
+    mesures = {
+        "etape": etape,
+        "secondes": round(secondes, 3),
+        "cpu_s": round(cpu, 3),
+        "rss_debut_mo": round(memoire.debut, 1),
+        "pic_rss_mo": round(memoire.pic, 1),
+        "surcout_mo": round(memoire.pic - memoire.debut, 1),
+    }
+    if isinstance(resultat, pd.DataFrame):
+        mesures["lignes"] = len(resultat)
+    return resultat, mesures
+
+def commit_git():
+    """Commit courant (None hors dépôt git)."""
+    try:
+        sortie = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return sortie.stdout.strip()
+
+# --- Benchmarks ---
+
+def bench_generer(args):
+    source = taux_anomalies(pd.read_csv(SOURCE_CSV, dtype=str))
+    colonnes = {"crime_reports.csv": source}
+    for nb_lignes in args.lignes:
+        chemin = fichier_synthetique(nb_lignes, graine=args.graine)
+        # Au-delà d'un million de lignes, les taux sont mesurés sur le premier million
+        colonnes[os.path.basename(chemin)] = taux_anomalies(pd.read_csv(chemin, dtype=str, nrows=1_000_000))
+    print("Anomalies (% des lignes)")
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(pd.DataFrame(colonnes))
+
+def exporter(df, chemin):
+    """Export Parquet + cube, comme main.py (entrée de generer_carte)."""
+    main.exporter_parquet(df, chemin)
+    main.exporter_cube(main.construire_cube(df), main.chemin_cube(chemin))
+
+def bench_pipeline(args):
+    # geopandas / folium importés hors mesure
+    import mapping_crime
+
+    for nb_lignes in args.lignes:
+        chemin = fichier_synthetique(nb_lignes, graine=args.graine)
+        etapes = []
+        with tempfile.TemporaryDirectory() as dossier:
+            sortie = os.path.join(dossier, "crime_reports_clean.parquet")
+            df, mesures = mesurer("charger_donnees_crime", main.charger_donnees_crime, chemin, compact=args.compact)
+            etapes.append(mesures)
+            etapes.append(mesurer("auditer_qualite", main.auditer_qualite, df)[1])
+            df, mesures = mesurer("nettoyer_donnees", main.nettoyer_donnees, df, workers=args.workers)
+            etapes.append(mesures)
+            df, mesures = mesurer("enrichir_donnees", main.enrichir_donnees, df)
+            etapes.append(mesures)
+            etapes.append(mesurer("exporter", exporter, df, sortie)[1])
+            del df
+            etapes.append(mesurer("generer_carte", mapping_crime.generer_carte, sortie=os.path.join(dossier, "map.html"),
+                                  chemin=sortie, ouvrir=False)[1])
+
+        enregistrement = {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": commit_git(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "cpu": os.cpu_count(),
+            "fichier": os.path.basename(chemin),
+            "lignes": nb_lignes,
+            "compact": args.compact,
+            "workers": args.workers,
+            "etapes": etapes,
+        }
+        with open(args.resultats, "a", encoding="utf-8") as f:
+            f.write(json.dumps(enregistrement, ensure_ascii=False) + "\n")
+
+        print(f"\nPipeline sur {nb_lignes} lignes")
+        with pd.option_context('display.width', 200, 'display.max_columns', None):
+            print(pd.DataFrame(etapes).set_index("etape").astype({"lignes": "Int64"}))
+    print(f"\nRésultats ajoutés à {args.resultats}")
+
+
+# --- Audit historique (référence de bench_audit) ---
+# Un scan (et un parsing) par indicateur, tel qu'avant le moteur de règles main.REGLES.
+
+def _debut_crime(df, col_crime='Crime Date Time'):
+    """Début de l'intervalle du crime : colonne crime_start si déjà parsée, sinon parsing."""
+    if 'crime_start' in df.columns:
+        return df['crime_start']
+    if col_crime in df.columns:
+        return main.parser_intervalle_crime(df[col_crime])[0]
+    return None
+
+def indicateur_completude(df, colonnes):
+    """Calcule le % de valeurs non nulles pour une liste de colonnes."""
+    resultats = {}
+    for col in colonnes:
+        if col in df.columns:
+            taux = (1 - df[col].isnull().mean()) * 100
+            resultats[col] = taux
+        else:
+            resultats[col] = 0.0
+    return pd.Series(resultats)
+
+def indicateur_unicite(df, colonne):
+    """Calcule le % de valeurs uniques (proportion par rapport au total)."""
+    if colonne not in df.columns: return 0.0
+    return (df[colonne].nunique() / len(df)) * 100
+
+def indicateur_doublons(df):
+    """Calcule le % de lignes strictement identiques."""
+    return (df.duplicated().sum() / len(df)) * 100
+
+def indicateur_date_valide(df, colonne):
+    """Calcule le % de dates parsables (intervalle valide pour 'Crime Date Time')."""
+    if colonne == 'Crime Date Time' and 'crime_start' in df.columns:
+        return (df['crime_start'].notna().sum() / len(df)) * 100
+    if colonne not in df.columns: return 0.0
+    
+    # Parsers spécifiques pour 'Date of Report' et 'Crime Date Time'
+    if colonne == 'Date of Report':
+        dates_valides = main.parser_date_report(df[colonne]).notna().sum()
+    elif colonne == 'Crime Date Time':
+        dates_valides = main.parser_intervalle_crime(df[colonne])[0].notna().sum()
+    else:
+        # Sinon on tente 'mixed'
+        dates_valides = pd.to_datetime(df[colonne], errors='coerce').notna().sum()
+        
+    return (dates_valides / len(df)) * 100
+
+def indicateur_coherence_temporelle(df, col_report, col_crime):
+    """Calcule le % de lignes où Date of Report >= début de Crime Date Time."""
+    if col_report not in df.columns: return 0.0
+    
+    dt_report = main.parser_date_report(df[col_report])
+    dt_crime = _debut_crime(df, col_crime)
+    if dt_crime is None: return 0.0
+    
+    # On ne garde que les lignes où les deux dates sont valides
+    valid_mask = dt_report.notna() & dt_crime.notna()
+    if valid_mask.sum() == 0: return 0.0
+    
+    # Cohérent si Report >= Crime
+    nb_coherents = (dt_report[valid_mask] >= dt_crime[valid_mask]).sum()
+    
+    return (nb_coherents / len(df)) * 100
+
+def indicateur_conformite_area(df, colonne):
+    """Calcule le % de valeurs numériques dans Reporting Area."""
+    if colonne not in df.columns: return 0.0
+    # On essaie de convertir en numérique
+    conformes = pd.to_numeric(df[colonne], errors='coerce').notna().sum()
+    return (conformes / len(df)) * 100
+
+def audit_par_indicateur(df):
+    """Audit historique : un scan (et un parsing) par indicateur."""
+    indicateur_completude(df, ['File Number', 'Crime', 'Neighborhood'])
+    indicateur_unicite(df, 'File Number')
+    indicateur_doublons(df)
+    indicateur_date_valide(df, 'Date of Report')
+    indicateur_coherence_temporelle(df, 'Date of Report', 'Crime Date Time')
+    indicateur_conformite_area(df, 'Reporting Area')
+
+def bench_audit(args):
+    chemin = fichier_synthetique(args.lignes)
+    df = pd.read_csv(chemin, low_memory=False)
+    print(f"Audit sur {len(df)} lignes ({args.repetitions} répétition(s))")
+
+    t_ancien = chronometrer(audit_par_indicateur, df, repetitions=args.repetitions)
+    t_fusion = chronometrer(main.calculer_indicateurs, df, repetitions=args.repetitions)
+    print(f"Avant nettoyage  - par indicateur : {t_ancien:.2f}s | une passe : {t_fusion:.2f}s | x{t_ancien / t_fusion:.1f}")
+
+    # Après nettoyage : les dates sont déjà des datetime, il n'y a plus rien à parser ;
+    # temps affichés pour référence, sans gain attendu de la passe unique
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_clean = main.nettoyer_donnees(df)
+    del df
+    t_ancien = chronometrer(audit_par_indicateur, df_clean, repetitions=args.repetitions)
+    t_fusion = chronometrer(main.calculer_indicateurs, df_clean, repetitions=args.repetitions)
+    print(f"Après nettoyage  - par indicateur : {t_ancien:.2f}s | une passe : {t_fusion:.2f}s "
+          f"(dates déjà converties : pas de parsing à mutualiser)")
+
+def _mesurer_audit(mode, chemin, taille_echantillon):
+    """Un audit dans un processus neuf, modules déjà chargés : même mémoire de départ pour les deux modes."""
+    import audit_approx
+
+    if mode == "approché":
+        return mesurer(mode, audit_approx.auditer_approx, chemin, taille_echantillon=taille_echantillon)
+    return mesurer(mode, lambda: main.calculer_indicateurs(pd.read_csv(chemin, low_memory=False)))
+
+def bench_approx(args):
+    chemin = fichier_synthetique(args.lignes)
+    print(f"Audit exact vs approché sur {chemin} (échantillon de {args.echantillon} lignes)")
+    resultats = {}
+    for mode in ("exact", "approché"):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            resultats[mode] = pool.submit(_mesurer_audit, mode, chemin, args.echantillon).result()
+    exacts, m_exact = resultats["exact"]
+    (stats, erreurs, _), m_approx = resultats["approché"]
+
+    tableau = pd.DataFrame({"exact (%)": exacts, "approché (%)": stats, "± 95 %": erreurs})
+    tableau["écart"] = tableau["approché (%)"] - tableau["exact (%)"]
+    tableau["dans l'intervalle"] = tableau["écart"].abs() <= tableau["± 95 %"]
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 200, 'display.max_columns', None):
+        print(tableau)
+    # Surcoût : pic de mémoire résidente moins celle du processus avant l'audit (modules chargés)
+    for m in (m_exact, m_approx):
+        print(f"{m['etape']:<9} : {m['secondes']:.2f}s, pic RSS {m['pic_rss_mo']:.0f} Mo (+{m['surcout_mo']:.0f} Mo)")
+
+def bench_nettoyage(args):
+    chemin = fichier_synthetique(args.lignes)
+    df = pd.read_csv(chemin, low_memory=False)
+    print(f"Nettoyage sur {len(df)} lignes ({os.cpu_count()} coeur(s) disponibles)")
+
+    reference = None
+    temps = {}
+    for workers in args.workers:
+        debut = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            df_clean = main.nettoyer_donnees(df, workers=workers)
+        temps[workers] = time.perf_counter() - debut
+        if reference is None:
+            reference = df_clean
+        elif not df_clean.equals(reference):
+            print(f"❌ Résultat différent avec {workers} workers")
+    for workers, t in temps.items():
+        print(f"{workers:>2} worker(s) : {t:.2f}s (x{temps[args.workers[0]] / t:.2f})")
+
+def bench_flux(args):
+    import crime
+    import pipeline_flux
+
+    chemin = fichier_synthetique(args.lignes)
+    print(f"Nettoyage en flux sur {chemin} (blocs de {args.blocs} lignes, {os.cpu_count()} coeur(s) disponibles)")
+    with tempfile.TemporaryDirectory() as dossier:
+        sorties = {mode: os.path.join(dossier, f"{mode}.parquet") for mode in ("memoire", "blocs", "serie", "pipeline")}
+        _, m_memoire = mesurer("en mémoire", crime.principal,
+                               ["clean", "--entree", chemin, "--sortie", sorties["memoire"], "--sans-cache"])
+        _, m_blocs = mesurer("--blocs", main.nettoyer_donnees_par_blocs, chemin, sorties["blocs"],
+                             taille_bloc=args.blocs)
+        # Profondeur 0 : mêmes étages exécutés en série, référence sans parallélisme
+        _, m_serie = mesurer("en série", pipeline_flux.nettoyer_en_pipeline, chemin, sorties["serie"],
+                             taille_bloc=args.blocs, profondeur=0)
+        resultat, m_pipeline = mesurer("--pipeline", pipeline_flux.nettoyer_en_pipeline, chemin, sorties["pipeline"],
+                                       taille_bloc=args.blocs, profondeur=args.profondeur)
+        reference = pd.read_parquet(sorties["blocs"])
+        for mode in ("serie", "pipeline"):
+            if not pd.read_parquet(sorties[mode]).equals(reference):
+                print(f"❌ Parquet différent entre --blocs et {mode}")
+
+    # --blocs n'audite pas : les autres modes font les deux audits en plus
+    for m in (m_memoire, m_blocs, m_serie, m_pipeline):
+        print(f"{m['etape']:<10} : {m['secondes']:6.2f}s (CPU {m['cpu_s']:.2f}s), pic RSS {m['pic_rss_mo']:.0f} Mo")
+    bilan = resultat['bilan']
+    cpu_etages = {nom: stats['cpu_s'] for nom, stats in bilan.items()}
+    print(f"\nÉtages du pipeline : somme {sum(cpu_etages.values()):.2f}s CPU, plus coûteux "
+          f"{max(cpu_etages, key=cpu_etages.get)} ({max(cpu_etages.values()):.2f}s), total mesuré {m_pipeline['secondes']:.2f}s")
+    for nom, stats in bilan.items():
+        print(f"  {nom:<12} : {stats['cpu_s']:6.2f}s CPU, {stats['attente_s']:6.2f}s en attente")
+
+def nettoyer_et_enrichir(df):
+    """Nettoyage + enrichissement, sans les affichages."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return main.enrichir_donnees(main.nettoyer_donnees(df))
+
+def pics_par_groupby(cube, par, fenetre, seuil, min_crimes, debut, fin):
+    """Référence : un groupby, puis rolling pandas série par série (nombre de pics)."""
+    import hotspots_crime
+
+    jours = pd.date_range(debut, fin, freq="D")
+    nb_pics = 0
+    for _, groupe in cube[(cube['jour'] >= debut) & (cube['jour'] <= fin)].groupby(par, observed=True):
+        serie = groupe.groupby('jour')[hotspots_crime.MESURE].sum().reindex(jours, fill_value=0).astype(float)
+        moyenne = serie.rolling(fenetre).mean().shift(1)
+        ecart = serie.rolling(fenetre).std(ddof=0).shift(1)
+        z = (serie - moyenne) / ecart.clip(lower=hotspots_crime.ECART_MIN)
+        nb_pics += int(((z > seuil) & (serie >= min_crimes)).sum())
+    return nb_pics
+
+def bench_hotspots(args):
+    import hotspots_crime
+
+    chemin = fichier_synthetique(args.lignes)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cube = hotspots_crime.cube_depuis_donnees(nettoyer_et_enrichir(pd.read_csv(chemin, low_memory=False)))
+    fin = cube['jour'].max()
+    debut = fin - pd.Timedelta(days=args.historique - 1)
+    print(f"Pics sur {chemin} : cube de {len(cube)} cellules, {args.historique} jours")
+
+    decoupages = [['Neighborhood'], ['reporting_area_group'], ['Crime'], ['Neighborhood', 'Crime'],
+                  ['reporting_area_group', 'Crime'], ['Neighborhood', 'reporting_area_group', 'Crime']]
+    lignes = []
+    for par in decoupages:
+        for pas, methode in (("jour", "moyenne"), ("jour", "ewma"), ("heure", "moyenne")):
+            series, temps, _ = hotspots_crime.matrice_series(cube, par, pas, debut, fin)
+            pics, secondes = None, float('inf')
+            for _ in range(3):
+                t = time.perf_counter()
+                pics = hotspots_crime.detecter_pics(cube, par, pas, methode=methode, debut=debut, fin=fin)
+                secondes = min(secondes, time.perf_counter() - t)
+            lignes.append({"series": " x ".join(par), "pas": pas, "methode": methode, "nb_series": len(series),
+                           "nb_pas": len(temps), "secondes": round(secondes, 3), "pics": len(pics)})
+    print(pd.DataFrame(lignes).to_string(index=False))
+
+    # Même détection série par série (groupby + rolling) sur le découpage le plus fin
+    par = decoupages[-1]
+    debut_ref = time.perf_counter()
+    nb_reference = pics_par_groupby(cube, par, hotspots_crime.FENETRE, hotspots_crime.SEUIL_Z,
+                                    hotspots_crime.MIN_CRIMES, debut, fin)
+    secondes_ref = time.perf_counter() - debut_ref
+    vectorise = next(l for l in lignes if l["series"] == " x ".join(par) and l["pas"] == "jour" and l["methode"] == "moyenne")
+    print(f"\ngroupby + rolling par série ({vectorise['nb_series']} séries) : {secondes_ref:.2f}s, {nb_reference} pics "
+          f"(matrice : {vectorise['secondes']:.3f}s, {vectorise['pics']} pics, x{secondes_ref / vectorise['secondes']:.0f})")
+
+    # Passage à l'échelle : séries de Poisson synthétiques, scorées en un appel
+    comptes = np.random.default_rng(0).poisson(2.0, (args.series, args.historique)).astype(np.float64)
+    for methode in ("moyenne", "ewma"):
+        debut_score = time.perf_counter()
+        moyenne, ecart, _ = hotspots_crime.ligne_de_base(comptes, methode=methode)
+        hotspots_crime.scorer(comptes, moyenne, ecart)
+        print(f"{args.series} séries x {args.historique} jours ({methode}) : {time.perf_counter() - debut_score:.3f}s")
+
+def _injecter_quasi_doublons(df, taux, rng):
+    """Copies d'un même incident : autre File Number, saisie différente, heure décalée (< 2 h).
+
+    Retourne le DataFrame avec les copies à la fin et la position de la source de chaque copie.
+    """
+    sources = np.flatnonzero(rng.random(len(df)) < taux)
+    copies = df.iloc[sources].copy()
+    copies['File Number'] = [f"Q-{i}" for i in range(len(copies))]
+    copies['Crime'] = copies['Crime'].astype(str).str.upper().str.replace(' and ', ' & ', regex=False)
+    copies['Location'] = (copies['Location'].astype(str).str.replace(' ST,', ' STREET,', regex=False)
+                          .str.replace(' AVE,', ' AVENUE,', regex=False))
+    copies['crime_start'] += pd.to_timedelta(rng.integers(0, 90, len(copies)), unit='min')
+    return pd.concat([df, copies], ignore_index=True), sources
+
+def bench_quasi(args):
+    import quasi_doublons
+
+    # Fichier réel : les lignes synthétiques, tirées avec remise, sont déjà des quasi-doublons
+    rng = np.random.default_rng(0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = main.nettoyer_donnees(pd.read_csv(SOURCE_CSV, low_memory=False)).reset_index(drop=True)
+    nb_origine = len(df)
+    df, sources = _injecter_quasi_doublons(df, args.taux, rng)
+    (groupes, a_supprimer), m = mesurer("quasi_doublons", quasi_doublons.marquer_quasi_doublons, df)
+    copies = np.arange(nb_origine, len(df))
+    retrouvees = int(((groupes[copies] >= 0) & (groupes[copies] == groupes[sources])).sum())
+    autres = int(a_supprimer[:nb_origine].sum())
+    print(f"Quasi-doublons sur {SOURCE_CSV} nettoyé ({nb_origine} lignes + {len(sources)} copies injectées) :")
+    print(f"  {m['secondes']:.3f}s ; {retrouvees} copies regroupées avec leur source "
+          f"({retrouvees / max(len(sources), 1):.1%}), {autres} quasi-doublons d'origine")
+
+    # Passage à l'échelle : valeurs tirées parmi celles du fichier, catégories comme --compact
+    n = args.echelle
+    crimes, locations = df['Crime'].dropna().unique(), df['Location'].dropna().unique()
+    grand = pd.DataFrame({
+        'Crime': pd.Categorical.from_codes(rng.integers(0, len(crimes), n), crimes),
+        'Location': pd.Categorical.from_codes(rng.integers(0, len(locations), n), locations),
+        'Reporting Area': rng.integers(100, 1200, n),
+        'crime_start': pd.Timestamp('2010-01-01') + pd.to_timedelta(rng.integers(0, 15 * 365 * 24 * 60, n), unit='min'),
+    })
+    (_, a_supprimer), m = mesurer("quasi_doublons", quasi_doublons.marquer_quasi_doublons, grand)
+    print(f"  {n} lignes : {m['secondes']:.2f}s, pic RSS {m['pic_rss_mo']:.0f} Mo "
+          f"(surcoût {m['surcout_mo']:.0f} Mo), {int(a_supprimer.sum())} lignes fusionnées")
+
+def bench_compact(args):
+    chemin = fichier_synthetique(args.lignes)
+    chargements = {
+        'object': lambda: pd.read_csv(chemin, dtype=object),
+        'str': lambda: pd.read_csv(chemin, low_memory=False),
+        'compact': lambda: main.lire_csv_compact(chemin),
+    }
+    operations = {
+        "isin(Neighborhood)": lambda df: df['Neighborhood'].isin(main.VALID_NEIGHBORHOODS),
+        "drop_duplicates(File Number)": lambda df: df.drop_duplicates(subset=['File Number']),
+        "drop_duplicates()": lambda df: df.drop_duplicates(),
+        "value_counts(Crime)": lambda df: df['Crime'].value_counts(),
+        "nettoyage + enrichissement": nettoyer_et_enrichir,
+    }
+
+    resultats = {}
+    exports = {}
+    for nom, charger in chargements.items():
+        debut = time.perf_counter()
+        df = charger()
+        mesures = {"chargement (s)": time.perf_counter() - debut,
+                   "mémoire brute (Mo)": df.memory_usage(deep=True).sum() / 1e6}
+        for operation, fonction in operations.items():
+            mesures[f"{operation} (s)"] = chronometrer(fonction, df, repetitions=args.repetitions)
+        df_clean = nettoyer_et_enrichir(df)
+        mesures["mémoire nettoyée (Mo)"] = df_clean.memory_usage(deep=True).sum() / 1e6
+        exports[nom] = main.decompacter_donnees(df_clean).to_csv(index=False, date_format=main.FMT_EXPORT)
+        resultats[nom] = mesures
+        del df, df_clean
+
+    print(f"Représentation compacte sur {args.lignes} lignes")
+    tableau = pd.DataFrame(resultats)
+    tableau['gain vs object'] = tableau['object'] / tableau['compact']
+    tableau['gain vs str'] = tableau['str'] / tableau['compact']
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 200, 'display.max_columns', None):
+        print(tableau)
+    if len(set(exports.values())) > 1:
+        print("❌ Export différent selon la représentation")
+
+def bench_carte(args):
+    import mapping_crime
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cube = mapping_crime.charger_cube_crimes(args.donnees)
+    tranches = mapping_crime.tranches_par_crime_mois(cube)
+    echantillon = tranches[:args.tranches]
+    print(f"Cartes crime x mois : {len(tranches)} tranches, rendu HTML mesuré sur {len(echantillon)}")
+    with tempfile.TemporaryDirectory() as dossier:
+        lot, web = os.path.join(dossier, "lot"), os.path.join(dossier, "web")
+        fichiers_lot, m_lot = mesurer("lot html", mapping_crime.generer_cartes_lot, echantillon, lot,
+                                      formats=("html",), chemin=args.donnees)
+        fichiers_web, m_web = mesurer("web", mapping_crime.exporter_carte_web, web, chemin=args.donnees)
+        octets_html = [os.path.getsize(f) for f in fichiers_lot]
+        octets_communs = sum(os.path.getsize(f) for f in fichiers_web[:3])
+        octets_tranches = [os.path.getsize(f) for f in fichiers_web[3:]]
+
+    par_carte = m_lot['secondes'] / max(len(echantillon), 1)
+    print(f"  --lot html : {m_lot['secondes']:.2f}s pour {len(echantillon)} cartes ({par_carte * 1000:.0f} ms/carte, "
+          f"~{par_carte * len(tranches):.0f}s pour toutes), {statistics.median(octets_html) / 1024:.1f} Ko par carte")
+    print(f"  --web      : {m_web['secondes']:.2f}s pour {len(fichiers_web) - 3} tranches "
+          f"({m_web['secondes'] / max(len(octets_tranches), 1) * 1000:.2f} ms/tranche)")
+    print(f"  Octets par vue : 1re vue {(octets_communs + octets_tranches[0]) / 1024:.1f} Ko (page, topologie, index), "
+          f"vues suivantes {statistics.median(octets_tranches)} octets (médiane), "
+          f"contre {statistics.median(octets_html) / 1024:.1f} Ko par carte HTML")
+
+def bench_demarrage(args):
+    """Démarrage à froid de crime.py : médiane de processus neufs, par sous-commande.
+
+    Pour les exécutions réelles, l'étape « imports » de --instrumentation donne la
+    part du temps passée à charger pandas / geopandas / matplotlib. Les lignes
+    « (cache) » mesurent un succès du cache des résultats (entrées inchangées).
+    """
+    script = os.path.join(BASE_DIR, "crime.py")
+    with tempfile.TemporaryDirectory() as dossier:
+        parquet = os.path.join(dossier, "propre.parquet")
+        reelles = {
+            "audit": ["audit", "--entree", args.entree],
+            "clean": ["clean", "--entree", args.entree, "--sortie", parquet],
+            "map": ["map", "--donnees", parquet, "--sortie", os.path.join(dossier, "carte.html")],
+        }
+        commandes = {
+            "--help": ["--help"],
+            "audit --help": ["audit", "--help"],
+            "clean --help": ["clean", "--help"],
+            "map --help": ["map", "--help"],
+            "audit (fichier absent)": ["audit", "--entree", os.path.join(dossier, "absent.csv")],
+            **{nom: [*commande, "--sans-cache"] for nom, commande in reelles.items()},
+            **{f"{nom} (cache)": commande for nom, commande in reelles.items()},
+        }
+        environnement = {**os.environ, "CRIME_CACHE": os.path.join(dossier, "cache")}
+        lignes = []
+        for nom, commande in commandes.items():
+            mesures = os.path.join(dossier, "mesures.json")
+            instrumentee = "--help" not in commande and nom != "audit (fichier absent)"
+            if nom.endswith("(cache)"):
+                # Première exécution : remplit le cache
+                subprocess.run([sys.executable, script, *commande], cwd=dossier, env=environnement,
+                               capture_output=True, check=True)
+            temps, imports = [], []
+            for _ in range(args.repetitions):
+                debut = time.perf_counter()
+                subprocess.run([sys.executable, script, *commande,
+                                *(["--instrumentation", mesures] if instrumentee else [])],
+                               cwd=dossier, env=environnement, capture_output=True,
+                               check=nom != "audit (fichier absent)")
+                temps.append(time.perf_counter() - debut)
+                if instrumentee:
+                    with open(mesures, encoding="utf-8") as f:
+                        etapes = {e["etape"]: e["secondes"] for e in json.load(f)["etapes"]}
+                    imports.append(etapes.get("imports", 0.0))
+            lignes.append({"commande": nom, "total (s)": statistics.median(temps),
+                           "imports (s)": statistics.median(imports) if imports else None})
+
+    print(f"Démarrage à froid de crime.py (médiane de {args.repetitions} exécutions, {os.path.basename(args.entree)})")
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 200):
+        print(pd.DataFrame(lignes).set_index("commande"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks du pipeline crime.")
+    sous = parser.add_subparsers(dest="commande", required=True)
+
+    p_audit = sous.add_parser("audit", help="Audit par indicateur vs audit en une passe")
+    p_audit.add_argument("--lignes", type=int, default=10_000_000)
+    p_audit.add_argument("--repetitions", type=int, default=1)
+    p_audit.set_defaults(fonction=bench_audit)
+
+    p_approx = sous.add_parser("approx", help="Audit approché (flux, une passe) vs audit exact : écarts, temps et mémoire")
+    p_approx.add_argument("--lignes", type=int, default=1_000_000)
+    p_approx.add_argument("--echantillon", type=int, default=100_000)
+    p_approx.set_defaults(fonction=bench_approx)
+
+    p_flux = sous.add_parser("flux", help="Nettoyage en mémoire vs par blocs vs en pipeline (temps, mémoire, étages)")
+    p_flux.add_argument("--lignes", type=int, default=1_000_000)
+    p_flux.add_argument("--blocs", type=int, default=100_000)
+    p_flux.add_argument("--profondeur", type=int, default=2)
+    p_flux.set_defaults(fonction=bench_flux)
+
+    p_hotspots = sous.add_parser("hotspots", help="Pics par matrice dense vs groupby + rolling par série")
+    p_hotspots.add_argument("--lignes", type=int, default=1_000_000)
+    p_hotspots.add_argument("--historique", type=int, default=365, metavar="JOURS")
+    p_hotspots.add_argument("--series", type=int, default=5000, help="Séries synthétiques du test de passage à l'échelle")
+    p_hotspots.set_defaults(fonction=bench_hotspots)
+
+    p_quasi = sous.add_parser("quasi", help="Quasi-doublons : copies injectées retrouvées, passage à l'échelle")
+    p_quasi.add_argument("--taux", type=float, default=0.05, help="Part des lignes copiées en quasi-doublons")
+    p_quasi.add_argument("--echelle", type=int, default=10_000_000, help="Lignes du test de passage à l'échelle")
+    p_quasi.set_defaults(fonction=bench_quasi)
+
+    p_nettoyage = sous.add_parser("nettoyage", help="Passage à l'échelle du nettoyage multi-processus")
+    p_nettoyage.add_argument("--lignes", type=int, default=10_000_000)
+    p_nettoyage.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p_nettoyage.set_defaults(fonction=bench_nettoyage)
+
+    p_generer = sous.add_parser("generer", help="Génère les fichiers synthétiques et compare leurs anomalies au fichier réel")
+    p_generer.add_argument("--lignes", type=int, nargs="+", default=[100_000, 1_000_000])
+    p_generer.add_argument("--graine", type=int, default=0)
+    p_generer.set_defaults(fonction=bench_generer)
+
+    p_pipeline = sous.add_parser("pipeline", help="Temps et mémoire de chaque étape du pipeline (résultats JSON)")
+    p_pipeline.add_argument("--lignes", type=int, nargs="+", default=[100_000, 1_000_000])
+    p_pipeline.add_argument("--graine", type=int, default=0)
+    p_pipeline.add_argument("--compact", action="store_true", help="Chargement en représentation compacte")
+    p_pipeline.add_argument("--workers", type=int, default=1)
+    p_pipeline.add_argument("--resultats", default=os.path.join(BASE_DIR, "bench_data", "pipeline.jsonl"),
+                            help="Fichier JSON Lines auquel chaque exécution est ajoutée")
+    p_pipeline.set_defaults(fonction=bench_pipeline)
+
+    p_compact = sous.add_parser("compact", help="Représentation compacte vs colonnes texte (mémoire et temps)")
+    p_compact.add_argument("--lignes", type=int, default=1_000_000)
+    p_compact.add_argument("--repetitions", type=int, default=3)
+    p_compact.set_defaults(fonction=bench_compact)
+
+    p_carte = sous.add_parser("carte", help="Rendu par lot en HTML autonomes vs export web (TopoJSON + JSON par tranche)")
+    p_carte.add_argument("--donnees", default=None, metavar="CHEMIN", help="Données nettoyées (défaut : les plus récentes)")
+    p_carte.add_argument("--tranches", type=int, default=50, help="Cartes HTML rendues pour la mesure")
+    p_carte.set_defaults(fonction=bench_carte)
+
+    p_demarrage = sous.add_parser("demarrage", help="Démarrage à froid de chaque sous-commande de crime.py (avec et sans cache)")
+    p_demarrage.add_argument("--entree", default=SOURCE_CSV, help="CSV brut utilisé pour audit / clean / map")
+    p_demarrage.add_argument("--repetitions", type=int, default=5)
+    p_demarrage.set_defaults(fonction=bench_demarrage)
+
+    args = parser.parse_args()
+    args.fonction(args)
@@ -0,0 +1,266 @@
+"""Cache disque des résultats (audit, données nettoyées, cube, cartes), indexé par contenu.
+
+La clé d'une entrée est le SHA-256 de ses composantes : empreintes du contenu des
+fichiers d'entrée, version du code (sources du pipeline, où sont écrites les règles de
+nettoyage : VALID_NEIGHBORHOODS, formats de dates), versions des bibliothèques et
+options de la commande. Bibliothèque standard uniquement : un succès est servi par
+crime.py sans importer pandas.
+"""
+import datetime
+import hashlib
+import importlib.metadata
+import json
+import os
+import shutil
+import sys
+
+from chemins import BASE_DIR
+
+# Dossier du cache : variable d'environnement CRIME_CACHE, sinon cache/ à côté du script
+CACHE_ENV = "CRIME_CACHE"
+TAILLE_MAX_MO = 1024
+
+FICHIER_EMPREINTES = "_empreintes.json"
+FICHIER_META = "entree.json"
+
+# Sources dont dépendent les résultats (CLI, règles de nettoyage, agrégation, rendu, mesures)
+MODULES_PIPELINE = ("crime.py", "main.py", "cube_crime.py", "jointure_spatiale.py", "mapping_crime.py", "chemins.py",
+                    "audit_approx.py", "pipeline_flux.py", "quasi_doublons.py", "carte_web.py",
+                    "instrumentation.py")
+BIBLIOTHEQUES = ("pandas", "numpy", "pyarrow", "shapely", "geopandas", "folium", "mapclassify", "matplotlib")
+
+def dossier_par_defaut():
+    return os.environ.get(CACHE_ENV) or os.path.join(BASE_DIR, "cache")
+
+# --- Empreintes ---
+
+def _hacher_fichier(chemin):
+    """SHA-256 du contenu, lu en flux (tampon fixe : mémoire constante quelle que soit la taille)."""
+    with open(chemin, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+def _etat_fichier(chemin):
+    st = os.stat(chemin)
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+class Empreintes:
+    """Empreintes SHA-256 mémorisées par (taille, date de modification, inode), comme l'index
+    de git : un fichier n'est relu en entier que s'il a été modifié depuis le dernier calcul.
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        try:
+            with open(chemin, encoding="utf-8") as f:
+                self.table = json.load(f)
+        except (OSError, ValueError):
+            self.table = {}
+        self.modifie = False
+
+    def connue(self, chemin):
+        """Empreinte mémorisée si le fichier n'a pas changé depuis (None sinon, sans relire le fichier)."""
+        chemin = os.path.abspath(chemin)
+        connu = self.table.get(chemin)
+        try:
+            if connu and connu[:3] == _etat_fichier(chemin):
+                return connu[3]
+        except OSError:
+            pass
+        return None
+
+    def memoriser(self, chemin, empreinte):
+        self.table[os.path.abspath(chemin)] = _etat_fichier(chemin) + [empreinte]
+        self.modifie = True
+
+    def fichier(self, chemin):
+        empreinte = self.connue(chemin)
+        if empreinte is None:
+            empreinte = _hacher_fichier(chemin)
+            self.memoriser(chemin, empreinte)
+        return empreinte
+
+    def calculer(self, chemin):
+        """Empreinte d'un fichier, ou d'un dossier (store incrémental) à partir de ses fichiers."""
+        if not os.path.isdir(chemin):
+            return self.fichier(chemin)
+        h = hashlib.sha256()
+        for racine, dossiers, fichiers in os.walk(chemin):
+            dossiers.sort()
+            for nom in sorted(fichiers):
+                complet = os.path.join(racine, nom)
+                h.update(f"{os.path.relpath(complet, chemin)}\0{self.fichier(complet)}\n".encode())
+        return h.hexdigest()
+
+    def sauver(self):
+        if not self.modifie:
+            return
+        table = {chemin: etat for chemin, etat in self.table.items() if os.path.exists(chemin)}
+        temporaire = f"{self.chemin}.{os.getpid()}"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            json.dump(table, f)
+        os.replace(temporaire, self.chemin)
+        self.modifie = False
+
+def version_code(modules=MODULES_PIPELINE):
+    """Empreinte des sources du pipeline : toute modification du code ou des règles invalide le cache."""
+    h = hashlib.sha256()
+    for nom in modules:
+        with open(os.path.join(BASE_DIR, nom), "rb") as f:
+            h.update(nom.encode() + b"\0" + f.read())
+    return h.hexdigest()
+
+def versions_bibliotheques(noms=BIBLIOTHEQUES):
+    versions = {}
+    for nom in noms:
+        try:
+            versions[nom] = importlib.metadata.version(nom)
+        except importlib.metadata.PackageNotFoundError:
+            versions[nom] = None
+    return versions
+
+def calculer_cle(composantes):
+    return hashlib.sha256(json.dumps(composantes, sort_keys=True).encode()).hexdigest()
+
+# --- Sortie console ---
+
+class Capture:
+    """Recopie tout ce qui est écrit sur stdout pendant le bloc (rejoué lors d'un succès du cache)."""
+
+    def __init__(self):
+        self.morceaux = []
+
+    def __enter__(self):
+        self._stdout = sys.stdout
+        sys.stdout = self
+        return self
+
+    def write(self, texte):
+        self.morceaux.append(texte)
+        return self._stdout.write(texte)
+
+    def __getattr__(self, nom):
+        return getattr(self._stdout, nom)
+
+    def __exit__(self, *exc):
+        sys.stdout = self._stdout
+
+    @property
+    def texte(self):
+        return "".join(self.morceaux)
+
+# --- Cache ---
+
+class CacheResultats:
+    """Entrées <dossier>/<clé>/ : fichiers produits + entree.json (métadonnées, sortie console).
+
+    Éviction LRU bornée en taille : la date de modification de entree.json sert de date
+    de dernier accès, et les entrées les plus anciennes sont supprimées au-delà de taille_max_mo.
+    """
+
+    def __init__(self, dossier=None, taille_max_mo=TAILLE_MAX_MO):
+        self.dossier = dossier or dossier_par_defaut()
+        self.taille_max = taille_max_mo * 1e6
+        os.makedirs(self.dossier, exist_ok=True)
+        self.empreintes = Empreintes(os.path.join(self.dossier, FICHIER_EMPREINTES))
+
+    def composantes(self, commande, entrees, options):
+        """Composantes de la clé : empreintes des entrées ({nom: chemin}), code, bibliothèques, options."""
+        composantes = {
+            "commande": commande,
+            "entrees": {nom: self.empreintes.calculer(chemin) for nom, chemin in entrees.items()},
+            "code": version_code(),
+            "bibliotheques": versions_bibliotheques(),
+            "options": options,
+        }
+        self.empreintes.sauver()
+        return composantes
+
+    def _meta(self, cle):
+        return os.path.join(self.dossier, cle, FICHIER_META)
+
+    def lire(self, cle):
+        """Métadonnées de l'entrée (None si absente) ; l'entrée devient la plus récemment utilisée."""
+        try:
+            with open(self._meta(cle), encoding="utf-8") as f:
+                meta = json.load(f)
+            os.utime(self._meta(cle))
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def restaurer(self, cle, meta, destinations):
+        """Copie les fichiers de l'entrée vers destinations ({nom: chemin}, ou un dossier pour tous).
+
+        Les fichiers sans destination (ex: audit.json sans --audit) restent dans le cache ;
+        une destination déjà identique (même empreinte mémorisée, fichier inchangé) n'est pas recopiée.
+        """
+        if isinstance(destinations, str):
+            destinations = {nom: os.path.join(destinations, nom) for nom in meta["fichiers"]}
+        for nom, infos in meta["fichiers"].items():
+            destination, empreinte = destinations.get(nom), infos["sha256"]
+            if destination is None or self.empreintes.connue(destination) == empreinte:
+                continue
+            os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+            shutil.copyfile(os.path.join(self.dossier, cle, nom), destination)
+            self.empreintes.memoriser(destination, empreinte)
+        self.empreintes.sauver()
+
+    def enregistrer(self, cle, fichiers, rapport="", composantes=None):
+        """Crée l'entrée à partir des fichiers produits ({nom: chemin}), puis applique la limite de taille.
+
+        L'entrée est écrite dans un dossier temporaire puis renommée : une exécution
+        interrompue ne laisse jamais d'entrée partielle.
+        """
+        taille = sum(os.path.getsize(chemin) for chemin in fichiers.values())
+        if taille > self.taille_max:
+            print(f"⚠️ Cache : résultat trop volumineux ({taille / 1e6:.0f} Mo), non conservé")
+            return False
+        entree = os.path.join(self.dossier, cle)
+        temporaire = f"{entree}.tmp{os.getpid()}"
+        shutil.rmtree(temporaire, ignore_errors=True)
+        os.makedirs(temporaire)
+        meta = {
+            "cle": cle,
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "taille": taille,
+            "composantes": composantes or {},
+            "rapport": rapport,
+            "fichiers": {},
+        }
+        for nom, chemin in fichiers.items():
+            # Nom relatif (ex: tranches/x.json pour l'export web) : sous-dossiers recréés
+            os.makedirs(os.path.dirname(os.path.join(temporaire, nom)), exist_ok=True)
+            shutil.copyfile(chemin, os.path.join(temporaire, nom))
+            meta["fichiers"][nom] = {"taille": os.path.getsize(chemin), "sha256": self.empreintes.fichier(chemin)}
+        with open(os.path.join(temporaire, FICHIER_META), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        shutil.rmtree(entree, ignore_errors=True)
+        os.replace(temporaire, entree)
+        self.empreintes.sauver()
+        self.evincer(garder=cle)
+        return True
+
+    def entrees(self):
+        """Entrées complètes : (dernier accès, taille, clé)."""
+        resultat = []
+        for cle in os.listdir(self.dossier):
+            try:
+                acces = os.path.getmtime(self._meta(cle))
+                with open(self._meta(cle), encoding="utf-8") as f:
+                    taille = json.load(f)["taille"]
+            except (OSError, ValueError, KeyError):
+                continue
+            resultat.append((acces, taille, cle))
+        return resultat
+
+    def evincer(self, garder=None):
+        """Supprime les entrées les moins récemment utilisées jusqu'à repasser sous la taille maximale."""
+        entrees = sorted(self.entrees())
+        total = sum(taille for _, taille, _ in entrees)
+        for _, taille, cle in entrees:
+            if total <= self.taille_max:
+                break
+            if cle == garder:
+                continue
+            shutil.rmtree(os.path.join(self.dossier, cle), ignore_errors=True)
+            total -= taille
@@ -0,0 +1,305 @@
+"""Export web de la carte (crime.py map --web) : géométrie une fois, comptes à la demande.
+
+Au lieu d'un HTML autonome par carte (géométrie pleine résolution et données incluses),
+le dossier exporté contient :
+
+- quartiers.topojson : polygones quantifiés sur une grille entière, frontières communes
+  stockées une seule fois (arcs partagés), simplifiées arc par arc (Douglas-Peucker :
+  deux quartiers voisins gardent exactement la même frontière) et codées en différences ;
+- tranches.json : l'index des tranches, groupées par type de crime (libellé, total) ;
+- tranches/<n>.json : le nombre de crimes de chaque polygone pour la n-ième tranche de
+  l'index, dans l'ordre des polygones de la topologie (quelques dizaines d'octets) ;
+- index.html : page statique (Leaflet + topojson-client) qui charge la topologie une fois
+  puis le JSON de la tranche choisie.
+
+Les comptes de toutes les tranches sont calculés sur le cube en un seul groupby.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from cube_crime import MESURE, compter_par_quartier, decrire_filtres
+from jointure_spatiale import NOMS_RAPPORTS
+
+QUANTIFICATION = 10_000     # grille de 10 000 x 10 000 points sur l'emprise (~1 m à Cambridge)
+TOLERANCE_WEB = 0.0001      # tolérance de simplification (degrés, ~10 m), comme le rendu par lot
+OBJET = "quartiers"
+
+# --- Topologie ---
+
+def _anneaux(geometrie):
+    """Anneaux (extérieur puis trous) de chaque polygone d'une géométrie, sans point de fermeture."""
+    polygones = geometrie.geoms if geometrie.geom_type == 'MultiPolygon' else [geometrie]
+    return [[np.asarray(anneau.coords)[:-1] for anneau in (p.exterior, *p.interiors)] for p in polygones]
+
+def _quantifier(points, origine, pas):
+    """Points sur la grille entière, sans répétitions consécutives (même après fermeture)
+    ni allers-retours A, B, A créés par l'arrondi de points très proches."""
+    q = np.round((points - origine) / pas).astype(np.int64)
+    while len(q) > 3:
+        garder = np.any(q != np.roll(q, 1, axis=0), axis=1)
+        # Pointe : le point précédent et le suivant sont confondus, on retire la pointe
+        garder &= np.any(np.roll(q, 1, axis=0) != np.roll(q, -1, axis=0), axis=1)
+        if garder.all():
+            break
+        q = q[garder]
+    return q
+
+def _jonctions(anneaux):
+    """Points où se rejoignent au moins deux frontières différentes.
+
+    Un point est une jonction si ses occurrences n'ont pas toutes les mêmes voisins
+    (précédent, suivant), dans un sens ou dans l'autre.
+    """
+    points, voisins = [], []
+    for anneau in anneaux:
+        precedent, suivant = np.roll(anneau, 1, axis=0), np.roll(anneau, -1, axis=0)
+        # Paire de voisins non ordonnée : même frontière parcourue dans l'autre sens
+        inverser = ((precedent[:, 0] > suivant[:, 0])
+                    | ((precedent[:, 0] == suivant[:, 0]) & (precedent[:, 1] > suivant[:, 1])))
+        a = np.where(inverser[:, None], suivant, precedent)
+        b = np.where(inverser[:, None], precedent, suivant)
+        points.append(anneau)
+        voisins.append(np.hstack([a, b]))
+    points, voisins = np.vstack(points), np.vstack(voisins)
+    occurrences = np.unique(np.hstack([points, voisins]), axis=0)
+    uniques, nb = np.unique(occurrences[:, :2], axis=0, return_counts=True)
+    return {tuple(p) for p in uniques[nb > 1].tolist()}
+
+def _decouper(anneau, jonctions):
+    """Arcs d'un anneau, coupé à chaque jonction (les deux extrémités sont dans l'arc)."""
+    points = [tuple(p) for p in anneau.tolist()]
+    coupures = [i for i, p in enumerate(points) if p in jonctions]
+    if not coupures:
+        # Anneau isolé : départ canonique, pour reconnaître le même anneau parcouru ailleurs
+        debut = min(range(len(points)), key=points.__getitem__)
+        points = points[debut:] + points[:debut]
+        return [points + points[:1]]
+    debut = coupures[0]
+    points = points[debut:] + points[:debut] + [points[debut]]
+    coupures = [i - debut for i in coupures] + [len(points) - 1]
+    return [points[i:j + 1] for i, j in zip(coupures[:-1], coupures[1:])]
+
+def _simplifier(arc, tolerance):
+    """Douglas-Peucker sur un arc (extrémités conservées), en unités de la grille."""
+    import shapely
+
+    if tolerance <= 0 or len(arc) <= 2:
+        return arc
+    simplifie = shapely.simplify(shapely.LineString(arc), tolerance, preserve_topology=False)
+    points = [tuple(int(v) for v in p) for p in shapely.get_coordinates(simplifie).tolist()]
+    # Un anneau fermé doit garder au moins 4 points
+    if arc[0] == arc[-1] and len(points) < 4:
+        return arc
+    return points
+
+def _delta(arc):
+    """Codage TopoJSON : premier point absolu, puis différences successives."""
+    points = np.asarray(arc, dtype=np.int64)
+    return np.vstack([points[:1], np.diff(points, axis=0)]).tolist()
+
+def topologie(gdf, geo_col, quantification=QUANTIFICATION, tolerance=TOLERANCE_WEB):
+    """TopoJSON (dict) des polygones de gdf (EPSG:4326), avec la colonne de nom en propriété.
+
+    Les coordonnées sont quantifiées, les anneaux coupés aux jonctions et chaque
+    frontière n'est stockée et simplifiée qu'une fois, quel que soit le nombre de
+    polygones qui la partagent.
+    """
+    xmin, ymin, xmax, ymax = gdf.total_bounds
+    pas = np.array([(xmax - xmin) / (quantification - 1) or 1.0, (ymax - ymin) / (quantification - 1) or 1.0])
+    origine = np.array([xmin, ymin])
+
+    polygones = [[[_quantifier(a, origine, pas) for a in polygone] for polygone in _anneaux(geometrie)]
+                 for geometrie in gdf.geometry]
+    jonctions = _jonctions([a for geometrie in polygones for polygone in geometrie for a in polygone])
+
+    arcs, index = [], {}
+
+    def indexer(arc):
+        """Indice de l'arc (~indice s'il est déjà stocké dans l'autre sens)."""
+        cle = tuple(arc)
+        if cle in index:
+            return index[cle]
+        inverse = cle[::-1]
+        if inverse in index:
+            return ~index[inverse]
+        index[cle] = len(arcs)
+        arcs.append(arc)
+        return index[cle]
+
+    geometries = []
+    for nom, geometrie in zip(gdf[geo_col], polygones):
+        refs = [[[indexer(arc) for arc in _decouper(a, jonctions)] for a in polygone] for polygone in geometrie]
+        geometries.append({
+            "type": "Polygon" if len(refs) == 1 else "MultiPolygon",
+            "arcs": refs[0] if len(refs) == 1 else refs,
+            "properties": {"nom": str(nom)},
+        })
+    tolerance_grille = tolerance / pas.min() if tolerance else 0
+    return {
+        "type": "Topology",
+        "transform": {"scale": pas.tolist(), "translate": origine.tolist()},
+        "objects": {OBJET: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": [_delta(_simplifier(arc, tolerance_grille)) for arc in arcs],
+    }
+
+# --- Comptes par tranche ---
+
+def comptes_crime_mois(cube, noms):
+    """Tranches crime x mois (comme tranches_par_crime_mois) et leurs comptes, en un groupby.
+
+    Retourne (liste de filtres, matrice tranches x polygones dans l'ordre de noms).
+    """
+    mois = cube['jour'].dt.to_period('M')
+    agregat = cube.groupby([cube['Crime'].astype(str).rename('crime'), mois.rename('mois'),
+                            cube['Neighborhood'].astype(str).rename('quartier')], observed=True)[MESURE].sum()
+    matrice = agregat.unstack('quartier', fill_value=0).reindex(columns=list(noms), fill_value=0)
+    filtres = [{'crime': crime, 'debut': str(m.start_time.date()), 'fin': str(m.end_time.date())}
+               for crime, m in matrice.index]
+    return filtres, matrice.to_numpy(dtype=np.int64)
+
+def comptes_filtres(cube, noms, liste_filtres):
+    """Comptes (tranches x polygones) de filtres quelconques, un filtre du cube par tranche."""
+    matrice = np.zeros((len(liste_filtres), len(noms)), dtype=np.int64)
+    position = {nom: i for i, nom in enumerate(noms)}
+    for i, filtres in enumerate(liste_filtres):
+        for nom, nb in compter_par_quartier(cube, **filtres).itertuples(index=False, name=None):
+            if nom in position:
+                matrice[i, position[nom]] = nb
+    return matrice
+
+def _verifier_couverture(cube, noms, comptes_tous):
+    """Erreur si des crimes du cube n'ont pas de polygone (quartier absent de la topologie)."""
+    total = int(cube[MESURE].sum())
+    places = int(np.sum(comptes_tous))
+    if places != total:
+        absents = sorted(set(cube['Neighborhood'].astype(str)) - set(noms))
+        raise ValueError(f"{total - places} crimes sur {total} sans polygone (quartiers : {absents})")
+
+def _libelle(filtres):
+    """Libellé d'une tranche dans son groupe (sans le type de crime) ; AAAA-MM pour un mois entier."""
+    reste = {cle: valeur for cle, valeur in filtres.items() if cle != 'crime'}
+    if reste.keys() == {'debut', 'fin'}:
+        mois = pd.Period(reste['debut'], freq='M')
+        if str(mois.start_time.date()) == reste['debut'] and str(mois.end_time.date()) == reste['fin']:
+            return str(mois)
+    return decrire_filtres(**reste) if reste else "Toute la période"
+
+def _ecrire_json(chemin, contenu):
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(contenu, f, ensure_ascii=False, separators=(",", ":"))
+
+def exporter_web(gdf, geo_col, cube, dossier, liste_filtres=None, tolerance=TOLERANCE_WEB):
+    """Écrit la topologie, l'index des tranches, un JSON par tranche et la page dans `dossier`.
+
+    liste_filtres : filtres de cube_crime.filtrer_cube (défaut : tous les crimes, puis
+    chaque type de crime par mois). Retourne les fichiers écrits.
+    ValueError si des crimes du cube ne correspondent à aucun polygone.
+    """
+    # Le cube est indexé par les noms des rapports, pas par les noms officiels du GeoJSON
+    noms = [NOMS_RAPPORTS.get(str(nom), str(nom)) for nom in gdf[geo_col]]
+    tous = comptes_filtres(cube, noms, [{}])
+    _verifier_couverture(cube, noms, tous)
+    if liste_filtres is None:
+        filtres_mois, matrice_mois = comptes_crime_mois(cube, noms)
+        liste_filtres = [{}] + filtres_mois
+        matrice = np.vstack([tous, matrice_mois])
+    else:
+        matrice = comptes_filtres(cube, noms, liste_filtres)
+
+    # Index groupé par type de crime (libellés courts) ; tranches numérotées dans l'ordre de l'index
+    groupes = {}
+    for filtres, comptes in zip(liste_filtres, matrice.tolist()):
+        crime = filtres.get('crime')
+        groupe = decrire_filtres(crime=crime) if crime is not None else "Tous les crimes"
+        groupes.setdefault(groupe, []).append((_libelle(filtres), decrire_filtres(**filtres), comptes))
+
+    os.makedirs(os.path.join(dossier, "tranches"), exist_ok=True)
+    fichiers = [os.path.join(dossier, f"{OBJET}.topojson"), os.path.join(dossier, "tranches.json"),
+                os.path.join(dossier, "index.html")]
+    _ecrire_json(fichiers[0], topologie(gdf, geo_col, tolerance=tolerance))
+    index = []
+    for groupe, tranches in groupes.items():
+        index.append({"groupe": groupe, "tranches": [[libelle, sum(comptes)] for libelle, _, comptes in tranches]})
+        for _, titre, comptes in tranches:
+            chemin = os.path.join(dossier, "tranches", f"{len(fichiers) - 3}.json")
+            _ecrire_json(chemin, {"titre": titre, "comptes": comptes})
+            fichiers.append(chemin)
+    _ecrire_json(fichiers[1], index)
+    with open(fichiers[2], "w", encoding="utf-8") as f:
+        f.write(PAGE_HTML.replace("__OBJET__", OBJET))
+    return fichiers
+
+# Page statique : Leaflet + topojson-client (CDN), comptes de la tranche chargés à la demande.
+# fetch() exige un serveur HTTP : python -m http.server dans le dossier exporté.
+PAGE_HTML = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>Crimes par quartier - Cambridge</title>
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css">
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<script src="https://unpkg.com/topojson-client@3/dist/topojson-client.min.js"></script>
+<style>
+  html, body, #carte { height: 100%; margin: 0; }
+  #panneau { position: absolute; top: 10px; right: 10px; z-index: 1000; background: white; padding: 6px;
+             font: 13px sans-serif; box-shadow: 0 1px 4px rgba(0,0,0,.4); }
+  #panneau select { max-width: 320px; }
+</style>
+</head>
+<body>
+<div id="carte"></div>
+<div id="panneau"><select id="tranche"></select> <span id="total"></span></div>
+<script>
+const COULEURS = ["#1a9850", "#91cf60", "#fee08b", "#fc8d59", "#d73027"];
+const carte = L.map("carte");
+L.tileLayer("https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png",
+            {attribution: "&copy; OpenStreetMap, &copy; CARTO"}).addTo(carte);
+let couche = null, comptes = [];
+
+function couleur(n, seuils) {
+  let classe = 0;
+  while (classe < seuils.length && n > seuils[classe]) classe++;
+  return COULEURS[Math.min(classe, COULEURS.length - 1)];
+}
+
+function seuilsQuantiles(valeurs) {
+  const tries = valeurs.slice().sort((a, b) => a - b);
+  return [1, 2, 3, 4].map(k => tries[Math.floor(k * (tries.length - 1) / 5)]);
+}
+
+async function afficherTranche(numero) {
+  const tranche = await (await fetch("tranches/" + numero + ".json")).json();
+  comptes = tranche.comptes;
+  const seuils = seuilsQuantiles(comptes);
+  couche.eachLayer(l => l.setStyle({fillColor: couleur(comptes[l.feature.index], seuils)}));
+  document.getElementById("total").textContent = comptes.reduce((a, b) => a + b, 0) + " crimes";
+}
+
+(async () => {
+  const [topo, index] = await Promise.all([fetch("__OBJET__.topojson").then(r => r.json()),
+                                           fetch("tranches.json").then(r => r.json())]);
+  const entites = topojson.feature(topo, topo.objects.__OBJET__);
+  entites.features.forEach((f, i) => f.index = i);
+  couche = L.geoJSON(entites, {
+    style: {color: "#555", weight: 1, fillOpacity: 0.7},
+    onEachFeature: (f, l) => l.bindTooltip(() => f.properties.nom + " : " + comptes[f.index]),
+  }).addTo(carte);
+  carte.fitBounds(couche.getBounds());
+  const liste = document.getElementById("tranche");
+  let numero = 0;
+  for (const g of index) {
+    const groupe = document.createElement("optgroup");
+    groupe.label = g.groupe;
+    for (const [libelle, total] of g.tranches) groupe.append(new Option(libelle + " (" + total + ")", numero++));
+    liste.append(groupe);
+  }
+  liste.onchange = () => afficherTranche(liste.value);
+  afficherTranche(0);
+})();
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,34 @@
+"""Chemins par défaut du pipeline (sans dépendance lourde : utilisé par crime.py au démarrage)."""
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Fichier brut : variable d'environnement CRIME_ENTREE, sinon crime_reports.csv à côté du script
+ENTREE_ENV = "CRIME_ENTREE"
+
+# Données nettoyées : Parquet, store incrémental, copie CSV de compatibilité
+PARQUET_FILE = os.path.join(BASE_DIR, "crime_reports_clean.parquet")
+STORE_DIR = os.path.join(BASE_DIR, "crime_reports_store")
+CSV_FILE = os.path.join(BASE_DIR, "crime_reports_clean.csv")
+
+GEOJSON_FILE = os.path.join(BASE_DIR, "BOUNDARY_CDDNeighborhoods.geojson")
+OUTPUT_MAP = os.path.join(BASE_DIR, "map.html")
+
+def entree_par_defaut():
+    return os.environ.get(ENTREE_ENV) or os.path.join(BASE_DIR, "crime_reports.csv")
+
+def chemin_cube(chemin_donnees):
+    """Chemin du cube associé à des données nettoyées (fichier Parquet/CSV ou dossier du store)."""
+    if os.path.isdir(chemin_donnees):
+        return os.path.join(chemin_donnees, "_cube.parquet")
+    return os.path.splitext(chemin_donnees)[0] + "_cube.parquet"
+
+def chemin_donnees_propres():
+    """Retourne les données nettoyées à lire : le Parquet ou le store incrémental
+    le plus récent, sinon le CSV."""
+    candidats = [c for c in (PARQUET_FILE, STORE_DIR) if os.path.exists(c)]
+    if candidats:
+        return max(candidats, key=os.path.getmtime)
+    if os.path.exists(CSV_FILE):
+        return CSV_FILE
+    return None
@@ -0,0 +1,320 @@
+"""Point d'entrée unique du pipeline : python crime.py {audit,clean,map,hotspots} [options].
+
+Au démarrage, seuls argparse et la bibliothèque standard sont importés. pandas,
+geopandas, matplotlib ou folium ne sont chargés que par la sous-commande qui en a
+besoin, après la vérification des fichiers d'entrée. Le temps de ces imports est
+mesuré par l'étape « imports » de --instrumentation.
+
+Les résultats d'audit, de nettoyage et de carte sont mis en cache (cache_resultats.py) :
+si les entrées, le code et les options n'ont pas changé, les fichiers sont restaurés
+et la sortie console rejouée sans rien recalculer.
+"""
+import argparse
+import os
+import sys
+
+from chemins import (CSV_FILE, ENTREE_ENV, GEOJSON_FILE, OUTPUT_MAP, PARQUET_FILE, STORE_DIR, chemin_cube,
+                     chemin_donnees_propres, entree_par_defaut)
+import instrumentation
+from instrumentation import etape
+
+def lire_heures(texte):
+    """Convertit '20-6' en (20, 6)."""
+    h_debut, h_fin = texte.split("-")
+    return int(h_debut), int(h_fin)
+
+def _introuvable(chemin):
+    """Affiche l'erreur et retourne True si le fichier (ou dossier) n'existe pas."""
+    if os.path.exists(chemin):
+        return False
+    print(f"❌ Erreur : Le fichier '{chemin}' est introuvable.")
+    return True
+
+# --- Cache des résultats ---
+
+def _ouvrir_cache(args):
+    """Cache des résultats (None avec --sans-cache)."""
+    if args.sans_cache:
+        return None
+    import cache_resultats
+
+    return cache_resultats.CacheResultats(args.cache, args.cache_taille)
+
+def _executer_avec_cache(cache, commande, entrees, options, destinations, executer, servi=None):
+    """Restaure le résultat depuis le cache, ou exécute la commande puis enregistre ses fichiers.
+
+    entrees      : {nom: chemin} des fichiers (ou dossiers) dont le contenu entre dans la clé
+    destinations : {nom: chemin} des fichiers à restaurer (ou dossier, pour le rendu par lot)
+    executer     : fonction sans argument retournant (code de sortie, {nom: chemin produit})
+    servi        : fonction appelée après une restauration (ex: ouvrir la carte)
+    """
+    import cache_resultats
+
+    with etape('cache'):
+        composantes = cache.composantes(commande, entrees, options)
+        cle = cache_resultats.calculer_cle(composantes)
+        meta = cache.lire(cle)
+        if meta is not None:
+            cache.restaurer(cle, meta, destinations)
+    if meta is not None:
+        print(f"♻️ Entrées inchangées : résultat servi par le cache ({cle[:12]})")
+        sys.stdout.write(meta["rapport"])
+        if servi:
+            servi()
+        return 0
+    with cache_resultats.Capture() as capture:
+        code, fichiers = executer()
+    if code == 0:
+        with etape('cache_ecriture'):
+            cache.enregistrer(cle, fichiers, capture.texte, composantes)
+    return code
+
+def _options_cle(args, noms):
+    """Options de la clé de cache : toutes celles qui changent les fichiers ou la sortie console."""
+    return {nom: getattr(args, nom) for nom in noms}
+
+def _produits(chemins):
+    """Fichiers effectivement écrits parmi {nom: chemin}."""
+    return {nom: chemin for nom, chemin in chemins.items() if chemin and os.path.exists(chemin)}
+
+# --- Sous-commandes ---
+
+def commande_audit(args):
+    args.entree = args.entree or entree_par_defaut()
+    if _introuvable(args.entree):
+        return 1
+
+    def executer():
+        with etape('imports'):
+            import main
+        return main.executer_audit(args), _produits({"audit.json": args.sortie})
+
+    cache = _ouvrir_cache(args)
+    if cache is None:
+        return executer()[0]
+    options = _options_cle(args, ("entree", "sortie", "compact", "approx"))
+    options["echantillon"] = args.echantillon if args.approx else None
+    return _executer_avec_cache(cache, "audit", {"entree": args.entree}, options,
+                                {"audit.json": args.sortie}, executer)
+
+def commande_clean(args):
+    args.entree = args.entree or entree_par_defaut()
+    if _introuvable(args.entree) or (args.adresses and _introuvable(args.adresses)):
+        return 1
+    if args.quasi_doublons is not None and (args.blocs or args.pipeline or args.incremental):
+        # Les quasi-doublons d'un incident peuvent tomber dans deux blocs différents
+        print("❌ Erreur : --quasi-doublons n'est disponible qu'en mémoire (sans --blocs, --pipeline ni --incremental).")
+        return 1
+    args.sortie = args.sortie or (STORE_DIR if args.incremental else PARQUET_FILE)
+    if args.csv == "":
+        args.csv = CSV_FILE
+    # Le mode incrémental dépend de l'état du store : il n'est jamais servi par le cache
+    cache = None if args.incremental else _ouvrir_cache(args)
+    if cache is None:
+        with etape('imports'):
+            import main
+        return main.executer_nettoyage(args)
+
+    destinations = {"donnees.parquet": args.sortie, "cube.parquet": chemin_cube(args.sortie),
+                    "donnees.csv": args.csv, "audit.json": args.audit, "quasi_doublons.csv": args.quasi_doublons or None}
+    # Les indicateurs avant / après sont conservés même sans --audit (--blocs seul n'audite pas)
+    audite = args.pipeline or not args.blocs
+    audit_demande = args.audit
+    if audite:
+        args.audit = args.audit or os.path.join(cache.dossier, f"_audit{os.getpid()}.json")
+
+    def executer():
+        with etape('imports'):
+            import main
+        code = main.executer_nettoyage(args)
+        return code, _produits({**destinations, "audit.json": args.audit if audite else None})
+
+    entrees = {"entree": args.entree}
+    if args.quartiers_geo or args.adresses:
+        entrees["geojson"] = GEOJSON_FILE
+    if args.adresses:
+        entrees["adresses"] = args.adresses
+    # Taille des blocs : elle fixe les row groups du Parquet ; entree : chemin écrit dans l'audit
+    options = _options_cle(args, ("entree", "sortie", "csv", "blocs", "pipeline", "profondeur", "quartiers_geo",
+                                  "adresses", "quasi_doublons", "workers", "compact"))
+    try:
+        return _executer_avec_cache(cache, "clean", entrees, options, destinations, executer)
+    finally:
+        if args.audit != audit_demande and os.path.exists(args.audit):
+            os.remove(args.audit)
+
+def commande_map(args):
+    if (args.donnees and _introuvable(args.donnees)) or (args.tranches and _introuvable(args.tranches)):
+        return 1
+    args.donnees = args.donnees or chemin_donnees_propres()
+    args.sortie = args.sortie or OUTPUT_MAP
+    fichiers = []
+
+    def executer():
+        with etape('imports'):
+            import mapping_crime
+        code = mapping_crime.executer_carte(args, fichiers)
+        if args.web:
+            return code, {os.path.relpath(chemin, args.web): chemin for chemin in fichiers}
+        if args.lot:
+            return code, {os.path.basename(chemin): chemin for chemin in fichiers}
+        return code, {"carte" + os.path.splitext(chemin)[1]: chemin for chemin in fichiers}
+
+    cache = _ouvrir_cache(args)
+    if cache is None or args.donnees is None or _introuvable(GEOJSON_FILE):
+        return executer()[0]
+
+    # La carte ne lit que le cube pré-agrégé s'il existe : c'est lui qui entre dans la clé
+    cube = chemin_cube(args.donnees)
+    entrees = {"donnees": cube if os.path.exists(cube) else args.donnees, "geojson": GEOJSON_FILE}
+    options = {cle: getattr(args, cle) for cle in ('crime', 'debut', 'fin', 'heures', 'sortie')}
+    if args.web:
+        if args.tranches:
+            entrees["tranches"] = args.tranches
+        options = {"web": args.web}
+        destinations = args.web
+    elif args.lot:
+        if args.tranches:
+            entrees["tranches"] = args.tranches
+        options = {"lot": args.lot, "formats": sorted(args.formats), "workers": args.workers}
+        destinations = args.lot
+    else:
+        destinations = {"carte.html": args.sortie, "carte.png": os.path.splitext(args.sortie)[0] + ".png"}
+
+    def ouvrir():
+        if args.ouvrir and not (args.lot or args.web) and os.path.exists(args.sortie):
+            import mapping_crime
+
+            mapping_crime.ouvrir_carte(args.sortie)
+
+    return _executer_avec_cache(cache, "map", entrees, options, destinations, executer, servi=ouvrir)
+
+def commande_hotspots(args):
+    if args.donnees and _introuvable(args.donnees):
+        return 1
+    args.donnees = args.donnees or chemin_donnees_propres()
+    # Lecture du cube seul : assez rapide pour suivre chaque chargement incrémental, sans cache
+    with etape('imports'):
+        import hotspots_crime
+    return hotspots_crime.executer_hotspots(args)
+
+# --- Arguments ---
+
+def _options_instrumentation(parser):
+    parser.add_argument("--instrumentation", default=None, metavar="FICHIER",
+                        help="Mesures par étape et par règle (temps, CPU, pic RSS, lignes) : .json ou .prom (Prometheus)")
+    parser.add_argument("--profil", choices=sorted(instrumentation.PROFILEURS), default=None,
+                        help="Profile chaque étape de premier niveau (ou --profil-etapes) dans --profil-dossier")
+    parser.add_argument("--profil-etapes", nargs="+", default=None, metavar="ETAPE",
+                        help="Étapes à profiler, par leur nom complet (ex: nettoyage/dates)")
+    parser.add_argument("--profil-dossier", default="profils", metavar="DOSSIER")
+
+def _options_cache(parser):
+    parser.add_argument("--cache", default=None, metavar="DOSSIER",
+                        help="Dossier du cache des résultats (défaut : $CRIME_CACHE ou cache/)")
+    parser.add_argument("--cache-taille", type=float, default=1024, metavar="MO",
+                        help="Taille maximale du cache ; les entrées les moins récemment utilisées sont supprimées")
+    parser.add_argument("--sans-cache", action="store_true", help="Recalcule tout sans lire ni écrire le cache")
+
+def construire_parser():
+    parser = argparse.ArgumentParser(description="Audit, nettoyage et cartographie des rapports de crimes.")
+    sous = parser.add_subparsers(dest="commande", required=True)
+
+    p_audit = sous.add_parser("audit", help="Indicateurs de qualité du fichier brut (sans nettoyage)")
+    p_audit.add_argument("--entree", default=None, help=f"CSV brut (défaut : ${ENTREE_ENV} ou crime_reports.csv)")
+    p_audit.add_argument("--sortie", default=None, metavar="JSON", help="Écrit les indicateurs dans un fichier JSON")
+    p_audit.add_argument("--compact", action="store_true",
+                         help="Charge les données en représentation compacte (catégories, clés entières)")
+    p_audit.add_argument("--approx", action="store_true",
+                         help="Audit approché en une passe sur le CSV lu en flux (HyperLogLog, "
+                              "filtre de Bloom, échantillon), avec intervalles à 95 %%")
+    p_audit.add_argument("--echantillon", type=int, default=100_000, metavar="N",
+                         help="Taille de l'échantillon par réservoir de --approx")
+    _options_cache(p_audit)
+    _options_instrumentation(p_audit)
+    p_audit.set_defaults(fonction=commande_audit)
+
+    p_clean = sous.add_parser("clean", help="Audit avant/après, nettoyage, enrichissement et export")
+    p_clean.add_argument("--entree", default=None, help=f"CSV brut (défaut : ${ENTREE_ENV} ou crime_reports.csv)")
+    p_clean.add_argument("--sortie", default=None, help="Parquet nettoyé (défaut : crime_reports_clean.parquet, ou crime_reports_store/ avec --incremental)")
+    p_clean.add_argument("--csv", nargs="?", const="", default=None, metavar="CHEMIN",
+                         help="Exporte aussi un CSV de compatibilité (défaut : crime_reports_clean.csv)")
+    p_clean.add_argument("--blocs", type=int, default=None, metavar="N",
+                         help="Mode flux : traite le fichier par blocs de N lignes (mémoire bornée)")
+    p_clean.add_argument("--pipeline", action="store_true",
+                         help="Mode flux en pipeline : lecture, audits, nettoyage et écriture en parallèle "
+                              "(blocs de --blocs lignes, 100 000 par défaut)")
+    p_clean.add_argument("--profondeur", type=int, default=2, metavar="N",
+                         help="Blocs en attente entre deux étages du pipeline (borne la mémoire)")
+    p_clean.add_argument("--incremental", action="store_true",
+                         help="Ne traite que les nouveaux rapports ; --sortie désigne alors le dossier du store")
+    p_clean.add_argument("--quartiers-geo", action="store_true",
+                         help="Récupère les Neighborhood invalides par jointure spatiale (Longitude/Latitude ou --adresses)")
+    p_clean.add_argument("--adresses", default=None, metavar="CSV",
+                         help="Table locale de géocodage (Location, Longitude, Latitude) pour --quartiers-geo")
+    p_clean.add_argument("--quasi-doublons", nargs="?", const="", default=None, metavar="CSV",
+                         help="Fusionne aussi les rapports d'un même incident (Crime et Location normalisés, "
+                              "heures proches) ; CSV : exporte les groupes fusionnés")
+    p_clean.add_argument("--workers", type=int, default=1, metavar="N",
+                         help="Nombre de processus pour les règles de nettoyage ligne à ligne")
+    p_clean.add_argument("--compact", action="store_true",
+                         help="Charge les données en représentation compacte (catégories, clés entières)")
+    p_clean.add_argument("--audit", default=None, metavar="JSON",
+                         help="Écrit les indicateurs avant / après nettoyage dans un fichier JSON")
+    _options_cache(p_clean)
+    _options_instrumentation(p_clean)
+    p_clean.set_defaults(fonction=commande_clean)
+
+    p_map = sous.add_parser("map", help="Carte choroplèthe des crimes par quartier (ou rendu par lot)")
+    p_map.add_argument("--donnees", default=None, metavar="CHEMIN",
+                       help="Données nettoyées : Parquet, dossier du store ou CSV (défaut : le plus récent)")
+    p_map.add_argument("--crime", default=None, help="Type de crime (ex: 'Larceny from MV')")
+    p_map.add_argument("--debut", default=None, help="Premier jour inclus (AAAA-MM-JJ)")
+    p_map.add_argument("--fin", default=None, help="Dernier jour inclus (AAAA-MM-JJ)")
+    p_map.add_argument("--heures", type=lire_heures, default=None, help="Heures de début du crime, ex: 20-6 pour la nuit")
+    p_map.add_argument("--sortie", default=None, help="Fichier HTML de la carte (défaut : map.html)")
+    p_map.add_argument("--ouvrir", action="store_true", help="Ouvre la carte dans le navigateur")
+    p_map.add_argument("--lot", default=None, metavar="DOSSIER",
+                       help="Rendu par lot dans DOSSIER (une carte par crime et par mois, ou --tranches)")
+    p_map.add_argument("--web", default=None, metavar="DOSSIER",
+                       help="Export web dans DOSSIER : topologie TopoJSON simplifiée + un JSON de comptes par tranche "
+                            "(tous les crimes, puis chaque crime par mois, ou --tranches) et une page qui les charge")
+    p_map.add_argument("--tranches", default=None, metavar="JSON",
+                       help="Fichier JSON : liste de filtres, ex: [{\"crime\": \"Auto Theft\", \"heures\": [20, 6]}]")
+    p_map.add_argument("--workers", type=int, default=1, help="Nombre de processus pour le rendu par lot")
+    p_map.add_argument("--formats", nargs="+", default=["html", "png"], choices=["html", "png"])
+    _options_cache(p_map)
+    _options_instrumentation(p_map)
+    p_map.set_defaults(fonction=commande_map)
+
+    p_hot = sous.add_parser("hotspots", help="Pics de crimes par quartier, groupe de zone ou type (fenêtre glissante)")
+    p_hot.add_argument("--donnees", default=None, metavar="CHEMIN",
+                       help="Données nettoyées : Parquet, dossier du store ou CSV (défaut : le plus récent)")
+    p_hot.add_argument("--par", nargs="+", default=["Neighborhood"],
+                       choices=["Neighborhood", "reporting_area_group", "Crime"],
+                       help="Colonnes qui définissent une série (ex: --par reporting_area_group Crime)")
+    p_hot.add_argument("--pas", choices=["jour", "heure"], default="jour", help="Pas de temps des séries")
+    p_hot.add_argument("--methode", choices=["moyenne", "ewma"], default="moyenne",
+                       help="Ligne de base : moyenne / écart type glissants, ou EWMA")
+    p_hot.add_argument("--fenetre", type=int, default=28, metavar="N", help="Fenêtre de référence (en pas)")
+    p_hot.add_argument("--seuil", type=float, default=3.0, help="Score z au-delà duquel un point est un pic")
+    p_hot.add_argument("--min-crimes", type=int, default=3, metavar="N", help="Nombre minimal de crimes d'un pic")
+    p_hot.add_argument("--debut", default=None, help="Premier jour inclus (AAAA-MM-JJ, défaut : --historique jours avant --fin)")
+    p_hot.add_argument("--fin", default=None, help="Dernier jour inclus (AAAA-MM-JJ, défaut : dernier jour des données)")
+    p_hot.add_argument("--historique", type=int, default=365, metavar="JOURS", help="Jours analysés sans --debut")
+    p_hot.add_argument("--recents", type=int, default=None, metavar="N",
+                       help="Ne signale que les pics des N derniers pas (suivi après un chargement incrémental)")
+    p_hot.add_argument("--sortie", default=None, metavar="CSV", help="Exporte tous les pics en CSV")
+    _options_instrumentation(p_hot)
+    p_hot.set_defaults(fonction=commande_hotspots)
+    return parser
+
+def principal(argv=None):
+    """Analyse les arguments et exécute la sous-commande ; retourne le code de sortie."""
+    args = construire_parser().parse_args(argv)
+    if args.instrumentation or args.profil:
+        instrumentation.activer(args.instrumentation, args.profil, args.profil_etapes, args.profil_dossier)
+    return args.fonction(args)
+
+if __name__ == "__main__":
+    sys.exit(principal())
@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+
+from chemins import chemin_cube
+
+# Dimensions du cube pré-agrégé et mesure
+DIMENSIONS = ['Neighborhood', 'Crime', 'reporting_area_group', 'jour', 'heure']
+MESURE = 'nb_crimes'
+
+def construire_cube(df):
+    """Agrège les crimes par quartier x type x groupe de zone x jour x heure (début du crime).
+
+    Retourne None si une des colonnes nécessaires manque.
+    """
+    colonnes = ['Neighborhood', 'Crime', 'reporting_area_group', 'crime_start']
+    if any(col not in df.columns for col in colonnes):
+        return None
+    debut = df['crime_start']
+    cles = [
+        df['Neighborhood'].astype(str),
+        df['Crime'].astype(str),
+        df['reporting_area_group'],
+        debut.dt.floor('D').rename('jour'),
+        debut.dt.hour.rename('heure'),
+    ]
+    return df.groupby(cles, observed=True).size().rename(MESURE).reset_index()
+
+def fusionner_cubes(cubes):
+    """Additionne des cubes partiels (blocs, ou cube existant + delta incrémental)."""
+    cubes = [c for c in cubes if c is not None and not c.empty]
+    if not cubes:
+        return None
+    if len(cubes) == 1:
+        return cubes[0]
+    tous = pd.concat(cubes, ignore_index=True)
+    tous['Neighborhood'] = tous['Neighborhood'].astype(str)
+    tous['Crime'] = tous['Crime'].astype(str)
+    return tous.groupby(DIMENSIONS, observed=True)[MESURE].sum().reset_index()
+
+def charger_cube(chemin):
+    """Charge un cube (None s'il n'existe pas)."""
+    if not os.path.exists(chemin):
+        return None
+    return pd.read_parquet(chemin, memory_map=True)
+
+def filtrer_cube(cube, crime=None, debut=None, fin=None, heures=None, groupes=None):
+    """Filtre le cube.
+
+    crime   : type de crime (ou liste de types)
+    debut   : premier jour inclus (ex: '2016-01-01')
+    fin     : dernier jour inclus (ex: '2016-12-31')
+    heures  : (h_debut, h_fin) heures du début du crime, fin exclue ; (20, 6) = la nuit
+    groupes : liste de reporting_area_group
+    """
+    masque = pd.Series(True, index=cube.index)
+    if crime is not None:
+        crimes = [crime] if isinstance(crime, str) else list(crime)
+        masque &= cube['Crime'].isin(crimes)
+    if debut is not None:
+        masque &= cube['jour'] >= pd.Timestamp(debut)
+    if fin is not None:
+        masque &= cube['jour'] <= pd.Timestamp(fin)
+    if heures is not None:
+        h_debut, h_fin = heures
+        if h_debut <= h_fin:
+            masque &= (cube['heure'] >= h_debut) & (cube['heure'] < h_fin)
+        else:
+            # Plage qui passe minuit
+            masque &= (cube['heure'] >= h_debut) | (cube['heure'] < h_fin)
+    if groupes is not None:
+        masque &= cube['reporting_area_group'].isin(groupes)
+    return cube[masque]
+
+def compter_par_quartier(cube, **filtres):
+    """Nombre de crimes par quartier pour un filtre donné (colonnes Neighborhood, Crime_Count)."""
+    selection = filtrer_cube(cube, **filtres)
+    comptes = selection.groupby(selection['Neighborhood'].astype(str))[MESURE].sum()
+    comptes = comptes[comptes > 0].sort_values(ascending=False)
+    return pd.DataFrame({'Neighborhood': comptes.index, 'Crime_Count': comptes.to_numpy()})
+
+def decrire_filtres(crime=None, debut=None, fin=None, heures=None, groupes=None):
+    """Libellé court d'un filtre (titre de carte)."""
+    morceaux = []
+    if crime is not None:
+        morceaux.append(crime if isinstance(crime, str) else ", ".join(crime))
+    if debut is not None or fin is not None:
+        morceaux.append(f"{debut or '...'} → {fin or '...'}")
+    if heures is not None:
+        morceaux.append(f"{heures[0]:02d}h-{heures[1]:02d}h")
+    if groupes is not None:
+        morceaux.append("groupes " + ", ".join(str(g) for g in groupes))
+    return " | ".join(morceaux) or "Tous les crimes"
@@ -0,0 +1,152 @@
+"""Détection de pics de crimes (crime.py hotspots).
+
+Les séries quotidiennes ou horaires (par quartier, groupe de zone, type de crime ou une
+combinaison) sont rangées dans une matrice dense séries x temps, construite en un seul
+np.bincount à partir du cube. La ligne de base (moyenne glissante ou EWMA) et le score z
+sont calculés pour toutes les séries à la fois : des milliers de séries en un appel, sans
+groupby par série.
+"""
+import numpy as np
+import pandas as pd
+
+from cube_crime import MESURE, construire_cube
+
+# Dimensions utilisables pour découper les séries
+DIMENSIONS_SERIES = ['Neighborhood', 'reporting_area_group', 'Crime']
+PAS = {'jour': pd.Timedelta(days=1), 'heure': pd.Timedelta(hours=1)}
+
+FENETRE = 28            # pas de temps de référence
+SEUIL_Z = 3.0
+MIN_CRIMES = 3          # un pic compte au moins MIN_CRIMES crimes
+ECART_MIN = 1.0         # plancher de l'écart type (séries creuses : zéros répétés)
+HISTORIQUE_JOURS = 365
+
+def cube_depuis_donnees(df):
+    """Cube d'un DataFrame nettoyé (sortie de nettoyer_donnees, enrichi ou non)."""
+    if 'reporting_area_group' not in df.columns and 'Reporting Area' in df.columns:
+        df = df.assign(reporting_area_group=df['Reporting Area'] // 100)
+    return construire_cube(df)
+
+def matrice_series(cube, par=('Neighborhood',), pas='jour', debut=None, fin=None):
+    """Nombres de crimes en matrice dense (séries x pas de temps), zéros compris.
+
+    par         : colonnes qui définissent une série (ex: ['reporting_area_group', 'Crime'])
+    debut / fin : premier et dernier jour inclus (défaut : toute l'étendue du cube)
+    Retourne (series, temps, comptes) : DataFrame des clés de chaque ligne, DatetimeIndex
+    des colonnes et tableau float64 de forme (len(series), len(temps)).
+    """
+    par = list(par)
+    jours = cube['jour']
+    debut = pd.Timestamp(debut) if debut is not None else jours.min()
+    fin = pd.Timestamp(fin) if fin is not None else jours.max()
+    cube = cube[(jours >= debut) & (jours <= fin)]
+    temps = pd.date_range(debut, fin + pd.Timedelta(days=1) - PAS[pas], freq=PAS[pas])
+
+    instants = cube['jour']
+    if pas == 'heure':
+        instants = instants + pd.to_timedelta(cube['heure'], unit='h')
+    codes_temps = ((instants - debut) // PAS[pas]).to_numpy(dtype=np.int64)
+    codes_series, cles = pd.MultiIndex.from_frame(cube[par].astype(object)).factorize(sort=True)
+
+    nb_temps = len(temps)
+    comptes = np.bincount(codes_series * nb_temps + codes_temps, weights=cube[MESURE].to_numpy(dtype=np.float64),
+                          minlength=len(cles) * nb_temps).reshape(len(cles), nb_temps)
+    series = pd.DataFrame(list(cles), columns=par)
+    return series, temps, comptes
+
+def ligne_de_base(comptes, fenetre=FENETRE, methode='moyenne'):
+    """Référence de chaque point, calculée sur les points précédents seulement.
+
+    moyenne : moyenne et écart type des `fenetre` derniers pas (sommes cumulées, O(n))
+    ewma    : moyenne et variance à pondération exponentielle, alpha = 2 / (fenetre + 1)
+    Retourne (moyenne, ecart, nb_points) ; nb_points est le nombre de pas d'historique.
+    """
+    nb_series, nb_temps = comptes.shape
+    points = np.arange(nb_temps)
+    if methode == 'moyenne':
+        cumul = np.zeros((nb_series, nb_temps + 1))
+        carres = np.zeros((nb_series, nb_temps + 1))
+        np.cumsum(comptes, axis=1, out=cumul[:, 1:])
+        np.cumsum(comptes * comptes, axis=1, out=carres[:, 1:])
+        # Fenêtre [t - fenetre, t) : le point t n'entre pas dans sa propre référence
+        debut = np.maximum(points - fenetre, 0)
+        nb_points = points - debut
+        with np.errstate(invalid='ignore', divide='ignore'):
+            moyenne = (cumul[:, points] - cumul[:, debut]) / nb_points
+            variance = (carres[:, points] - carres[:, debut]) / nb_points - moyenne * moyenne
+        moyenne[:, 0] = 0.0
+        variance[:, 0] = 0.0
+    elif methode == 'ewma':
+        alpha = 2 / (fenetre + 1)
+        moyenne = np.zeros_like(comptes)
+        variance = np.zeros_like(comptes)
+        m = comptes[:, 0].copy()
+        v = np.zeros(nb_series)
+        # Récurrence sur le temps, vectorisée sur toutes les séries
+        for t in range(1, nb_temps):
+            moyenne[:, t], variance[:, t] = m, v
+            ecart_point = comptes[:, t] - m
+            increment = alpha * ecart_point
+            m += increment
+            v = (1 - alpha) * (v + ecart_point * increment)
+        nb_points = points
+    else:
+        raise ValueError(f"Méthode inconnue : {methode} (moyenne ou ewma)")
+    return moyenne, np.sqrt(np.maximum(variance, 0.0)), nb_points
+
+def scorer(comptes, moyenne, ecart, ecart_min=ECART_MIN):
+    """Score z de chaque point par rapport à sa référence (écart type planché à ecart_min)."""
+    return (comptes - moyenne) / np.maximum(ecart, ecart_min)
+
+def detecter_pics(cube, par=('Neighborhood',), pas='jour', fenetre=FENETRE, methode='moyenne', seuil=SEUIL_Z,
+                  min_crimes=MIN_CRIMES, debut=None, fin=None, recents=None):
+    """Pics de toutes les séries en un appel : points dont le score z dépasse seuil.
+
+    Un point n'est scoré qu'avec une fenêtre d'historique complète et s'il compte au
+    moins min_crimes crimes. recents : ne garde que les pics des `recents` derniers pas.
+    Retourne les pics (clés de la série, debut, nb_crimes, reference, ecart, z), triés par z.
+    """
+    series, temps, comptes = matrice_series(cube, par, pas, debut, fin)
+    moyenne, ecart, nb_points = ligne_de_base(comptes, fenetre, methode)
+    z = scorer(comptes, moyenne, ecart)
+
+    pics = (z > seuil) & (comptes >= min_crimes) & (nb_points >= fenetre)
+    if recents is not None:
+        pics[:, :max(len(temps) - recents, 0)] = False
+    lignes, colonnes = np.nonzero(pics)
+    resultat = series.iloc[lignes].reset_index(drop=True)
+    resultat['debut'] = temps[colonnes]
+    resultat[MESURE] = comptes[lignes, colonnes].astype(np.int64)
+    resultat['reference'] = moyenne[lignes, colonnes]
+    resultat['ecart'] = ecart[lignes, colonnes]
+    resultat['z'] = z[lignes, colonnes]
+    return resultat.sort_values('z', ascending=False, ignore_index=True)
+
+def afficher_pics(pics, limite=20):
+    print(f"\n🔥 --- PICS DE CRIMES ({len(pics)}) --- 🔥")
+    if pics.empty:
+        print("Aucun pic détecté.")
+        return
+    with pd.option_context('display.float_format', '{:.2f}'.format, 'display.width', 200):
+        print(pics.head(limite).to_string(index=False))
+    if len(pics) > limite:
+        print(f"... {len(pics) - limite} autres pics (voir --sortie)")
+
+def executer_hotspots(args):
+    """Sous-commande hotspots (voir crime.py) : pics sur le cube des données nettoyées."""
+    from mapping_crime import charger_cube_crimes
+
+    cube = charger_cube_crimes(args.donnees)
+    if cube is None or cube.empty:
+        return 1
+    fin = pd.Timestamp(args.fin) if args.fin else cube['jour'].max()
+    debut = pd.Timestamp(args.debut) if args.debut else fin - pd.Timedelta(days=args.historique - 1)
+    pics = detecter_pics(cube, par=args.par, pas=args.pas, fenetre=args.fenetre, methode=args.methode,
+                         seuil=args.seuil, min_crimes=args.min_crimes, debut=debut, fin=fin, recents=args.recents)
+    print(f"Séries par {' x '.join(args.par)}, pas : {args.pas}, du {debut.date()} au {fin.date()} "
+          f"(référence : {args.methode} sur {args.fenetre} pas, seuil z > {args.seuil})")
+    afficher_pics(pics)
+    if args.sortie:
+        pics.to_csv(args.sortie, index=False, date_format='%Y-%m-%d %H:%M:%S')
+        print(f"✅ Pics exportés vers : {args.sortie}")
+    return 0
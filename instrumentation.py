@@ -0,0 +1,300 @@
+import atexit
+import collections
+import contextlib
+import datetime
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+# --- Mémoire résidente ---
+
+def rss_mo():
+    """Mémoire résidente actuelle du processus (Mo), lue dans /proc (Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        # Hors Linux : pic depuis le démarrage du processus
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+class SuiviMemoire:
+    """Pic de mémoire résidente pendant un bloc de code, échantillonné dans un thread."""
+
+    def __init__(self, intervalle=0.005):
+        self.intervalle = intervalle
+
+    def __enter__(self):
+        self.debut = self.pic = rss_mo()
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._echantillonner, daemon=True)
+        self._thread.start()
+        return self
+
+    def _echantillonner(self):
+        while not self._arret.wait(self.intervalle):
+            self.pic = max(self.pic, rss_mo())
+
+    def __exit__(self, *exc):
+        self._arret.set()
+        self._thread.join()
+        self.pic = max(self.pic, rss_mo())
+
+# --- Profileur par échantillonnage ---
+
+class Echantillonneur:
+    """Profileur par échantillonnage (stdlib) : la pile du thread appelant est relevée
+    toutes les `intervalle` secondes. Les piles gardent les numéros de ligne, ce qui
+    sépare les règles écrites dans une même fonction. Même interface que cProfile.Profile.
+    """
+
+    def __init__(self, intervalle=0.001):
+        self.intervalle = intervalle
+        self.piles = collections.Counter()
+
+    def enable(self):
+        self._cible = threading.get_ident()
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._boucle, daemon=True)
+        self._thread.start()
+
+    def _boucle(self):
+        while not self._arret.wait(self.intervalle):
+            frame = sys._current_frames().get(self._cible)
+            pile = []
+            while frame is not None:
+                code = frame.f_code
+                pile.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.piles[";".join(reversed(pile))] += 1
+
+    def disable(self):
+        self._arret.set()
+        self._thread.join()
+
+    def dump_stats(self, chemin):
+        """Écrit les piles au format « collapsed » (flamegraph.pl, speedscope)."""
+        with open(chemin, "w", encoding="utf-8") as f:
+            for pile, nb in self.piles.most_common():
+                f.write(f"{pile} {nb}\n")
+
+PROFILEURS = {
+    'cprofile': ".prof",
+    'echantillons': ".collapsed",
+}
+
+# --- Étapes instrumentées ---
+
+class Mesure:
+    """Étape en cours : le code instrumenté renseigne lignes_sortie."""
+
+    def __init__(self, nom, lignes_entree=None):
+        self.nom = nom
+        self.lignes_entree = lignes_entree
+        self.lignes_sortie = None
+        self.pic = 0.0
+
+class _Etat:
+    def __init__(self):
+        self.actif = False
+        self.agregats = {}
+        # Étapes en cours, tous threads confondus : l'échantillonneur met à jour leur pic
+        self.en_cours = set()
+        self.verrou = threading.Lock()
+        self.arret = None
+        self.profil = None
+        self.etapes_profilees = None
+        self.dossier_profils = None
+        self.profil_en_cours = False
+
+_ETAT = _Etat()
+
+# Pile des étapes en cours, propre à chaque thread (étages du pipeline, voir pipeline_flux.py)
+_LOCAL = threading.local()
+
+def _pile():
+    if not hasattr(_LOCAL, "pile"):
+        _LOCAL.pile = []
+    return _LOCAL.pile
+
+def pile_courante():
+    """Chemin de l'étape en cours dans ce thread (à transmettre aux threads qu'il lance)."""
+    return list(_pile())
+
+@contextlib.contextmanager
+def sous_etape_de(pile):
+    """Rattache les étapes mesurées dans ce thread au chemin pile d'un autre thread."""
+    ancienne, _LOCAL.pile = _pile(), list(pile)
+    try:
+        yield
+    finally:
+        _LOCAL.pile = ancienne
+
+def _echantillonner_rss(arret, intervalle):
+    while not arret.wait(intervalle):
+        rss = rss_mo()
+        with _ETAT.verrou:
+            for mesure in _ETAT.en_cours:
+                mesure.pic = max(mesure.pic, rss)
+
+def activer(sortie=None, profil=None, etapes_profilees=None, dossier_profils="profils", intervalle=0.005):
+    """Active l'instrumentation (et remet les mesures à zéro).
+
+    sortie           : fichier écrit à la fin du programme (.prom : texte Prometheus, sinon JSON)
+    profil           : 'cprofile' ou 'echantillons' pour profiler les étapes
+    etapes_profilees : noms complets des étapes à profiler (défaut : étapes de premier niveau)
+    dossier_profils  : un fichier de profil par étape (.prof ou .collapsed)
+    """
+    desactiver()
+    _ETAT.actif = True
+    _LOCAL.pile = []
+    _ETAT.agregats = {}
+    _ETAT.en_cours = set()
+    _ETAT.profil = profil
+    _ETAT.etapes_profilees = set(etapes_profilees) if etapes_profilees else None
+    _ETAT.dossier_profils = dossier_profils
+    _ETAT.profil_en_cours = False
+    if profil:
+        os.makedirs(dossier_profils, exist_ok=True)
+    _ETAT.arret = threading.Event()
+    threading.Thread(target=_echantillonner_rss, args=(_ETAT.arret, intervalle), daemon=True).start()
+    if sortie:
+        atexit.register(exporter, sortie)
+
+def desactiver():
+    """Arrête l'instrumentation (les mesures restent disponibles)."""
+    if _ETAT.arret is not None:
+        _ETAT.arret.set()
+        _ETAT.arret = None
+    _ETAT.actif = False
+
+def actif():
+    return _ETAT.actif
+
+def _profileur(nom_complet):
+    """Profileur à démarrer pour l'étape (None si pas de profil ou profil déjà en cours)."""
+    if not _ETAT.profil or _ETAT.profil_en_cours:
+        return None
+    if _ETAT.etapes_profilees is None:
+        if len(_pile()) > 1:
+            return None
+    elif nom_complet not in _ETAT.etapes_profilees:
+        return None
+    if _ETAT.profil == 'cprofile':
+        import cProfile
+
+        return cProfile.Profile()
+    return Echantillonneur()
+
+def _cumuler(nom, valeurs):
+    """Ajoute une exécution à l'agrégat de l'étape (appelé sous _ETAT.verrou)."""
+    agregat = _ETAT.agregats.setdefault(nom, {
+        "etape": nom, "appels": 0, "secondes": 0.0, "cpu_s": 0.0, "pic_rss_mo": 0.0,
+        "lignes_entree": None, "lignes_sortie": None,
+    })
+    agregat["appels"] += valeurs.get("appels", 1)
+    agregat["secondes"] += valeurs["secondes"]
+    agregat["cpu_s"] += valeurs["cpu_s"]
+    agregat["pic_rss_mo"] = max(agregat["pic_rss_mo"], valeurs["pic_rss_mo"])
+    for cle in ("lignes_entree", "lignes_sortie"):
+        if valeurs.get(cle) is not None:
+            agregat[cle] = (agregat[cle] or 0) + valeurs[cle]
+
+@contextlib.contextmanager
+def etape(nom, lignes=None):
+    """Mesure une étape : temps mur, temps CPU, pic de RSS, lignes en entrée / sortie.
+
+    Les étapes imbriquées sont nommées par leur chemin (ex: nettoyage/dates) et les
+    appels répétés (blocs, partitions) sont cumulés. Sans activer(), ne fait rien.
+    Hors du thread principal, le temps CPU est celui du thread seul.
+    """
+    mesure = Mesure(nom, lignes)
+    if not _ETAT.actif:
+        yield mesure
+        return
+    pile = _pile()
+    pile.append(nom)
+    nom_complet = "/".join(pile)
+    mesure.pic = rss_mo()
+    with _ETAT.verrou:
+        _ETAT.en_cours.add(mesure)
+    profileur = _profileur(nom_complet)
+    if profileur is not None:
+        _ETAT.profil_en_cours = True
+        profileur.enable()
+    horloge_cpu = time.process_time if threading.current_thread() is threading.main_thread() else time.thread_time
+    debut, debut_cpu = time.perf_counter(), horloge_cpu()
+    try:
+        yield mesure
+    finally:
+        secondes, cpu = time.perf_counter() - debut, horloge_cpu() - debut_cpu
+        if profileur is not None:
+            profileur.disable()
+            _ETAT.profil_en_cours = False
+            fichier = nom_complet.replace("/", "__") + PROFILEURS[_ETAT.profil]
+            profileur.dump_stats(os.path.join(_ETAT.dossier_profils, fichier))
+        rss = rss_mo()
+        pile.pop()
+        with _ETAT.verrou:
+            _ETAT.en_cours.discard(mesure)
+            _cumuler(nom_complet, {"secondes": secondes, "cpu_s": cpu, "pic_rss_mo": max(mesure.pic, rss),
+                                   "lignes_entree": mesure.lignes_entree, "lignes_sortie": mesure.lignes_sortie})
+
+def instrumenter(nom, fonction, *args, **kwargs):
+    """Appelle fonction dans une étape ; les lignes viennent du premier argument et du résultat (DataFrame)."""
+    entree = args[0] if args else None
+    with etape(nom, lignes=len(entree) if hasattr(entree, "columns") else None) as mesure:
+        resultat = fonction(*args, **kwargs)
+        if hasattr(resultat, "columns"):
+            mesure.lignes_sortie = len(resultat)
+    return resultat
+
+def resultats():
+    """Mesures cumulées par étape, dans l'ordre de première fin d'étape."""
+    return [dict(agregat) for agregat in _ETAT.agregats.values()]
+
+def fusionner(mesures):
+    """Ajoute des mesures venues d'un autre processus (worker) sous l'étape courante."""
+    if not _ETAT.actif:
+        return
+    with _ETAT.verrou:
+        for valeurs in mesures:
+            _cumuler("/".join(_pile() + [valeurs["etape"]]), valeurs)
+
+def vers_prometheus(mesures, prefixe="crime_pipeline"):
+    """Format texte d'exposition Prometheus (une jauge par mesure, étiquette etape)."""
+    metriques = [
+        ("etape_secondes", "secondes", 1, "Temps mur cumulé de l'étape (s)"),
+        ("etape_cpu_secondes", "cpu_s", 1, "Temps CPU cumulé de l'étape (s)"),
+        ("etape_pic_rss_octets", "pic_rss_mo", 1e6, "Pic de mémoire résidente pendant l'étape (octets)"),
+        ("etape_lignes_entree", "lignes_entree", 1, "Lignes en entrée de l'étape"),
+        ("etape_lignes_sortie", "lignes_sortie", 1, "Lignes en sortie de l'étape"),
+        ("etape_appels", "appels", 1, "Nombre d'exécutions de l'étape"),
+    ]
+    lignes = []
+    for nom, cle, facteur, aide in metriques:
+        lignes.append(f"# HELP {prefixe}_{nom} {aide}")
+        lignes.append(f"# TYPE {prefixe}_{nom} gauge")
+        for valeurs in mesures:
+            if valeurs.get(cle) is not None:
+                lignes.append(f'{prefixe}_{nom}{{etape="{valeurs["etape"]}"}} {valeurs[cle] * facteur:g}')
+    return "\n".join(lignes) + "\n"
+
+def exporter(chemin):
+    """Écrit les mesures : texte Prometheus si chemin finit par .prom, JSON sinon ('-' : sortie standard)."""
+    mesures = resultats()
+    if chemin.endswith(".prom"):
+        contenu = vers_prometheus(mesures)
+    else:
+        contenu = json.dumps({
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commande": sys.argv,
+            "etapes": mesures,
+        }, ensure_ascii=False, indent=2) + "\n"
+    if chemin == "-":
+        sys.stdout.write(contenu)
+    else:
+        with open(chemin, "w", encoding="utf-8") as f:
+            f.write(contenu)
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+from chemins import GEOJSON_FILE
+
+# Colonnes de coordonnées attendues dans le flux (WGS84, comme le GeoJSON)
+COLONNES_COORDONNEES = ('Longitude', 'Latitude')
+
+# Noms officiels du GeoJSON -> noms utilisés dans les rapports (VALID_NEIGHBORHOODS)
+NOMS_RAPPORTS = {
+    "The Port": "Area 4",
+    "Neighborhood Nine": "Peabody",
+    "Wellington-Harrington": "Inman/Harrington",
+    "Cambridge Highlands": "Highlands",
+    "Area 2/MIT": "MIT",
+    "Baldwin": "Agassiz",
+}
+
+class IndexQuartiers:
+    """Polygones des quartiers + index STRtree, construit une seule fois.
+
+    Peut porter une table d'adresses pour géocoder Location quand le flux n'a pas
+    de coordonnées. L'arbre n'est pas sérialisé : il est reconstruit à la demande,
+    ce qui permet de passer l'index aux workers d'un pool de processus.
+    """
+
+    def __init__(self, geometries, noms, table_adresses=None):
+        self.geometries = np.asarray(geometries)
+        self.noms = np.asarray(noms, dtype=object)
+        self.table_adresses = table_adresses
+        self._arbre = None
+
+    @property
+    def arbre(self):
+        if self._arbre is None:
+            import shapely
+
+            # Géométries préparées : intersects_xy est évalué bien plus vite
+            shapely.prepare(self.geometries)
+            self._arbre = shapely.STRtree(self.geometries)
+        return self._arbre
+
+    def __getstate__(self):
+        etat = dict(self.__dict__)
+        etat['_arbre'] = None
+        return etat
+
+def charger_index_quartiers(chemin=GEOJSON_FILE, colonne_nom='NAME', chemin_adresses=None):
+    """Lit le GeoJSON des quartiers et prépare l'index (noms convertis en noms des rapports)."""
+    import geopandas as gpd
+
+    gdf = gpd.read_file(chemin).to_crs("EPSG:4326")
+    noms = gdf[colonne_nom].map(lambda nom: NOMS_RAPPORTS.get(nom, nom))
+    table_adresses = charger_table_adresses(chemin_adresses) if chemin_adresses else None
+    return IndexQuartiers(gdf.geometry.to_numpy(), noms.to_numpy(), table_adresses)
+
+def assigner_quartiers(longitudes, latitudes, index):
+    """Quartier contenant chaque point (None si hors de tous les polygones ou coordonnées nulles).
+
+    Deux passes vectorisées, sans boucle Python par ligne : requête groupée sur le
+    STRtree (boîtes englobantes), puis test exact intersects_xy sur les seuls candidats
+    de chaque polygone préparé (boucle sur les ~13 polygones, pas sur les points).
+    Un point sur une frontière appartient au polygone (contains_xy l'exclurait).
+    """
+    import shapely
+
+    lon = np.asarray(longitudes, dtype=float)
+    lat = np.asarray(latitudes, dtype=float)
+    resultat = np.full(len(lon), None, dtype=object)
+    valides = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    if len(valides) == 0:
+        return resultat
+    idx_points, idx_polygones = index.arbre.query(shapely.points(lon[valides], lat[valides]))
+    trouve = np.full(len(valides), -1)
+    # Ordre décroissant : un point sur une frontière garde le premier polygone
+    for polygone in np.unique(idx_polygones)[::-1]:
+        candidats = idx_points[idx_polygones == polygone]
+        dedans = shapely.intersects_xy(index.geometries[polygone], lon[valides[candidats]], lat[valides[candidats]])
+        trouve[candidats[dedans]] = polygone
+    assignes = trouve >= 0
+    resultat[valides[assignes]] = index.noms[trouve[assignes]]
+    return resultat
+
+def normaliser_adresse(serie):
+    """Normalise Location pour la jointure avec la table d'adresses (majuscules, espaces)."""
+    return serie.str.upper().str.replace(r"\s+", " ", regex=True).str.strip()
+
+def charger_table_adresses(chemin):
+    """Table locale de géocodage : colonnes Location, Longitude, Latitude."""
+    table = pd.read_csv(chemin, usecols=['Location', *COLONNES_COORDONNEES])
+    table['Location'] = normaliser_adresse(table['Location'])
+    return table.drop_duplicates(subset=['Location']).set_index('Location')
+
+def geocoder_locations(locations, table_adresses):
+    """Coordonnées (lon, lat) de chaque Location par jointure sur la table d'adresses."""
+    coords = table_adresses.reindex(normaliser_adresse(locations).to_numpy())
+    return coords[COLONNES_COORDONNEES[0]].to_numpy(), coords[COLONNES_COORDONNEES[1]].to_numpy()
+
+def recuperer_quartiers(df, index, quartiers_valides):
+    """Remplace les Neighborhood invalides par le quartier trouvé par jointure spatiale.
+
+    Les coordonnées viennent des colonnes Longitude / Latitude si elles existent,
+    sinon du géocodage de Location via la table d'adresses de l'index. Les quartiers déjà
+    valides ne sont pas modifiés. Retourne le DataFrame et le nombre de lignes récupérées.
+    """
+    invalides = ~df['Neighborhood'].isin(quartiers_valides).to_numpy()
+    if not invalides.any():
+        return df, 0
+    a_traiter = df[invalides]
+    lon_col, lat_col = COLONNES_COORDONNEES
+    if lon_col in df.columns and lat_col in df.columns:
+        lon = pd.to_numeric(a_traiter[lon_col], errors='coerce').to_numpy()
+        lat = pd.to_numeric(a_traiter[lat_col], errors='coerce').to_numpy()
+    elif index.table_adresses is not None and 'Location' in df.columns:
+        lon, lat = geocoder_locations(a_traiter['Location'], index.table_adresses)
+    else:
+        return df, 0
+
+    trouves = assigner_quartiers(lon, lat, index)
+    recuperes = pd.notna(trouves)
+    if not recuperes.any():
+        return df, 0
+    positions = np.flatnonzero(invalides)[recuperes]
+    neighborhood = df['Neighborhood'].astype(object).to_numpy(copy=True)
+    neighborhood[positions] = trouves[recuperes]
+    df = df.assign(Neighborhood=pd.Series(neighborhood, index=df.index, dtype=df['Neighborhood'].dtype))
+    return df, int(recuperes.sum())
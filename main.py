@@ -1,10 +1,20 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
 import pandas as pd
 import os
 
-def charger_donnees_crime():
-    # Construction du chemin absolu vers le fichier de données (../../TP1/crime_reports_broken.csv)
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    nom_fichier = os.path.join(base_dir, "..", "..", "TP1", "crime_reports_broken.csv")
+from chemins import CSV_FILE, PARQUET_FILE, STORE_DIR, entree_par_defaut
+from cube_crime import chemin_cube, construire_cube, fusionner_cubes
+from jointure_spatiale import charger_index_quartiers, recuperer_quartiers
+from quasi_doublons import marquer_quasi_doublons, rapport_groupes
+import instrumentation
+from instrumentation import etape, instrumenter
+
+def charger_donnees_crime(nom_fichier=None, compact=False):
+    if nom_fichier is None:
+        nom_fichier = entree_par_defaut()
     
     # 1. Vérification si le fichier existe
     if not os.path.exists(nom_fichier):
@@ -14,7 +24,11 @@ def charger_donnees_crime():
     try:
         # 2. Chargement du fichier
         # On utilise low_memory=False pour éviter les avertissements sur les colonnes mixtes
-        df = pd.read_csv(nom_fichier, low_memory=False)
+        # (compact : catégories et clés entières, voir compacter_donnees)
+        if compact:
+            df = lire_csv_compact(nom_fichier)
+        else:
+            df = pd.read_csv(nom_fichier, low_memory=False)
         
         print(f"✅ Chargement réussi : {nom_fichier}")
         print(f"📊 Taille du jeu de données : {df.shape[0]} lignes et {df.shape[1]} colonnes\n")
@@ -78,126 +92,192 @@ def afficher_dictionnaire():
     print(df_meta)
     print("-" * 50)
 
-# --- Fonctions d'indicateurs de qualité ---
+# Formats des dates du fichier brut
+# (Crime Date Time peut aussi être un intervalle, voir parser_intervalle_crime)
+FMT_REPORT = '%m/%d/%Y %I:%M:%S %p'
+FMT_CRIME = '%m/%d/%Y %H:%M'
 
-def indicateur_completude(df, colonnes):
-    """Calcule le % de valeurs non nulles pour une liste de colonnes."""
-    resultats = {}
-    for col in colonnes:
-        if col in df.columns:
-            taux = (1 - df[col].isnull().mean()) * 100
-            resultats[col] = taux
-        else:
-            resultats[col] = 0.0
-    return pd.Series(resultats)
+# Format d'export des dates (explicite pour que l'export par blocs soit identique)
+FMT_EXPORT = '%Y-%m-%d %H:%M:%S'
 
-def indicateur_unicite(df, colonne):
-    """Calcule le % de valeurs uniques (proportion par rapport au total)."""
-    if colonne not in df.columns: return 0.0
-    return (df[colonne].nunique() / len(df)) * 100
+# --- Parsing vectorisé des dates (largeur fixe, octet par octet) ---
 
-def indicateur_doublons(df):
-    """Calcule le % de lignes strictement identiques."""
-    return (df.duplicated().sum() / len(df)) * 100
+class _Octets:
+    """Accès vectorisé aux octets UTF-8 d'une colonne texte, via les buffers Arrow.
 
-def indicateur_date_valide(df, colonne):
-    """Calcule le % de dates parsables."""
-    if colonne not in df.columns: return 0.0
-    
-    # Format spécifique pour 'Date of Report' et 'Crime Date Time'
-    fmt = None
-    if colonne == 'Date of Report':
-        fmt = '%m/%d/%Y %I:%M:%S %p'
-    elif colonne == 'Crime Date Time':
-        fmt = '%m/%d/%Y %H:%M'
-        
-    # On force la conversion
-    # Si fmt est fourni, c'est plus rapide et sans warning. Sinon on tente 'mixed'
-    if fmt:
-        dates_valides = pd.to_datetime(df[colonne], format=fmt, errors='coerce').notna().sum()
-    else:
-        dates_valides = pd.to_datetime(df[colonne], errors='coerce').notna().sum()
-        
-    return (dates_valides / len(df)) * 100
+    octet(p) renvoie pour chaque ligne l'octet à la position p (0 au-delà de la fin),
+    sans boucle Python par ligne ni copie de la colonne en matrice.
+    """
 
-def indicateur_coherence_temporelle(df, col_report, col_crime):
-    """Calcule le % de lignes où Date of Report >= Crime Date Time."""
-    if col_report not in df.columns or col_crime not in df.columns: return 0.0
-    
-    # Formats spécifiques connus
-    fmt_report = '%m/%d/%Y %I:%M:%S %p'
-    fmt_crime = '%m/%d/%Y %H:%M'
-    
-    dt_report = pd.to_datetime(df[col_report], format=fmt_report, errors='coerce')
-    dt_crime = pd.to_datetime(df[col_crime], format=fmt_crime, errors='coerce')
-    
-    # On ne garde que les lignes où les deux dates sont valides
-    valid_mask = dt_report.notna() & dt_crime.notna()
-    if valid_mask.sum() == 0: return 0.0
-    
-    # Cohérent si Report >= Crime
-    nb_coherents = (dt_report[valid_mask] >= dt_crime[valid_mask]).sum()
-    
-    return (nb_coherents / len(df)) * 100
+    def __init__(self, serie):
+        import pyarrow as pa
 
-def indicateur_conformite_area(df, colonne):
-    """Calcule le % de valeurs numériques dans Reporting Area."""
-    if colonne not in df.columns: return 0.0
-    # On essaie de convertir en numérique
-    conformes = pd.to_numeric(df[colonne], errors='coerce').notna().sum()
-    return (conformes / len(df)) * 100
+        tableau = pa.array(serie, type=pa.large_string(), from_pandas=True)
+        if isinstance(tableau, pa.ChunkedArray):
+            tableau = tableau.combine_chunks()
+        _, buf_offsets, buf_donnees = tableau.buffers()
+        offsets = np.frombuffer(buf_offsets, dtype=np.int64)[tableau.offset:tableau.offset + len(tableau) + 1]
+        self.debut = offsets[:-1]
+        self.longueur = np.diff(offsets)
+        self.longueur[np.asarray(tableau.is_null())] = 0
+        donnees = np.frombuffer(buf_donnees, dtype=np.uint8) if buf_donnees is not None else np.zeros(0, np.uint8)
+        # Un octet nul en fin de buffer sert de valeur par défaut hors chaîne
+        self.donnees = np.append(donnees, np.uint8(0))
 
-def auditer_qualite(df):
-    """Fonction principale regroupant les indicateurs."""
-    print("\n📊 --- AUDIT DE QUALITÉ --- 📊")
-    
-    stats = {}
-    
-    # 1. Complétude
-    completude = indicateur_completude(df, ['File Number', 'Crime', 'Neighborhood'])
-    for col, val in completude.items():
-        stats[f"Complétude [{col}]"] = val
-        
-    # 2. Unicité
-    stats["Unicité [File Number]"] = indicateur_unicite(df, 'File Number')
-    
-    # 3. Doublons
-    stats["Taux Doublons Exacts"] = indicateur_doublons(df)
-    
-    # 4. Validité Dates
-    stats["Validité Date [Date of Report]"] = indicateur_date_valide(df, 'Date of Report')
-    
-    # 5. Cohérence Temporelle
-    stats["Cohérence Temporelle (Report >= Crime)"] = indicateur_coherence_temporelle(df, 'Date of Report', 'Crime Date Time')
-    
-    # 6. Conformité Reporting Area
-    stats["Conformité [Reporting Area]"] = indicateur_conformite_area(df, 'Reporting Area')
-    
-    # Affichage avec seuils
-    seuils = {
-        "Complétude": 95.0, # Doit être >
-        "Unicité [File Number]": 100.0, # Doit être proche de
-        "Taux Doublons Exacts": 0.0, # Doit être proches de 0 (attention logique inverse)
-        "Validité Date": 95.0, 
-        "Cohérence": 98.0,
-        "Conformité": 95.0
-    }
-    
-    resultats_series = pd.Series(stats)
-    
-    for indicateur, valeur in stats.items():
-        status = "✅"
-        # Logique simplifiée de seuil (adaptable)
-        if "Doublons" in indicateur:
-            if valeur > 0: status = "❌ (> 0%)"
-        else:
-            if valeur < 95.0: status = "❌ (< 95%)" # Seuil générique 95% pour l'exemple
-            
-        print(f"{indicateur:<40} : {valeur:.2f}% {status}")
-        
-    return resultats_series
+    def octet(self, p):
+        hors = p >= self.longueur
+        return np.where(hors, 0, self.donnees[np.where(hors, len(self.donnees) - 1, self.debut + p)])
 
-# --- Fonctions de Nettoyage et Enrichissement ---
+    def est(self, p, caracteres):
+        """Masque : l'octet à la position p (et suivantes) vaut la chaîne ASCII donnée."""
+        ok = np.ones(len(self.debut), dtype=bool)
+        for i, c in enumerate(caracteres.encode()):
+            ok &= self.octet(p + i) == c
+        return ok
+
+    def nombre(self, p, nb_chiffres):
+        """Lit un entier de nb_chiffres chiffres à la position p ; retourne (valeur, masque valide)."""
+        valeur = np.zeros(len(self.debut), dtype=np.int64)
+        ok = np.ones(len(self.debut), dtype=bool)
+        for i in range(nb_chiffres):
+            chiffre = self.octet(p + i).astype(np.int64) - 48
+            ok &= (chiffre >= 0) & (chiffre <= 9)
+            valeur = valeur * 10 + chiffre
+        return valeur, ok
+
+    def date(self, p):
+        """Lit MM/DD/YYYY à la position p ; retourne (jour en datetime64[D], masque valide)."""
+        mois, ok_m = self.nombre(p, 2)
+        jour, ok_j = self.nombre(p + 3, 2)
+        annee, ok_a = self.nombre(p + 6, 4)
+        ok = ok_m & ok_j & ok_a & self.est(p + 2, "/") & self.est(p + 5, "/")
+        ok &= (mois >= 1) & (mois <= 12) & (jour >= 1)
+        debut_mois = np.where(ok, (annee - 1970) * 12 + mois - 1, 0).astype('datetime64[M]')
+        date = debut_mois.astype('datetime64[D]') + np.where(ok, jour - 1, 0)
+        # Jour au-delà de la fin du mois (ex: 02/30)
+        ok &= date.astype('datetime64[M]') == debut_mois
+        return date, ok
+
+    def heure(self, p, secondes=False):
+        """Lit HH:MM (ou HH:MM:SS) à la position p ; retourne (secondes depuis minuit, masque valide)."""
+        h, ok_h = self.nombre(p, 2)
+        m, ok_m = self.nombre(p + 3, 2)
+        ok = ok_h & ok_m & self.est(p + 2, ":") & (h <= 23) & (m <= 59)
+        total = h * 3600 + m * 60
+        if secondes:
+            sec, ok_s = self.nombre(p + 6, 2)
+            ok &= ok_s & self.est(p + 5, ":") & (sec <= 59)
+            total = total + sec
+        return total, ok, h
+
+def _vers_datetime(jours, secondes, ok):
+    """Assemble jour + secondes en datetime64[ns] (NaT si invalide)."""
+    dt = jours.astype('datetime64[ns]') + secondes.astype('timedelta64[s]')
+    dt[~ok] = np.datetime64('NaT')
+    return dt
+
+def _parser_lent(valeurs, fmt):
+    """Repli : pd.to_datetime au format fmt (zéros de tête facultatifs, am/pm en minuscules...),
+    appliqué aux seules valeurs distinctes. Retourne un tableau datetime64[ns] (NaT si invalide)."""
+    codes, uniques = pd.factorize(valeurs)
+    dates = pd.to_datetime(pd.Series(np.asarray(uniques, dtype=object), dtype=object), format=fmt, errors='coerce')
+    return _par_ligne(dates.to_numpy(dtype='datetime64[ns]'), codes, np.datetime64('NaT'))
+
+def _octets_ou_none(serie):
+    """_Octets de la colonne, ou None si elle n'est pas du texte (nombres, types mêlés)."""
+    try:
+        return _Octets(serie)
+    except (TypeError, ValueError):
+        return None
+
+def parser_date_report(serie):
+    """Parse 'Date of Report' (MM/DD/YYYY HH:MM:SS AM/PM) sans boucle Python ; NaT si invalide.
+
+    Les valeurs hors de ce format strict (largeur fixe) repassent par pd.to_datetime.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    o = _octets_ou_none(serie)
+    if o is None:
+        return pd.Series(_parser_lent(serie, FMT_REPORT), index=serie.index, name=serie.name)
+    jours, ok_d = o.date(0)
+    secondes, ok_t, h = o.heure(11, secondes=True)
+    pm = o.est(20, "PM")
+    ok = ok_d & ok_t & o.est(10, " ") & o.est(19, " ") & (pm | o.est(20, "AM"))
+    ok &= (h >= 1) & (h <= 12) & (o.longueur == 22)
+    # 12 AM -> 00h, 12 PM -> 12h
+    secondes = secondes - np.where(h == 12, 12 * 3600, 0) + np.where(pm, 12 * 3600, 0)
+    dates = _vers_datetime(jours, secondes, ok)
+    # Ex : '4/1/2016 1:05:00 pm' (sans zéros, en minuscules)
+    refusees = ~ok & serie.notna().to_numpy()
+    if refusees.any():
+        dates[refusees] = _parser_lent(serie[refusees], FMT_REPORT)
+    return pd.Series(dates, index=serie.index, name=serie.name)
+
+def parser_intervalle_crime(serie):
+    """Parse 'Crime Date Time' en (crime_start, crime_end), sans boucle Python.
+
+    Formats acceptés (largeur fixe, repérés par la longueur) :
+      MM/DD/YYYY HH:MM                       instant (début = fin)
+      MM/DD/YYYY HH:MM - HH:MM               intervalle sur la journée (fin < début -> lendemain)
+      MM/DD/YYYY HH:MM - MM/DD/YYYY HH:MM    intervalle complet
+      MM/DD/YYYY                             journée entière
+      MM/DD/YYYY - MM/DD/YYYY                plage de journées entières
+    Les valeurs invalides, ou dont la fin précède le début, donnent NaT. Les valeurs hors
+    largeur fixe sont complétées de zéros ('4/1/2016 8:05' -> '04/01/2016 08:05') puis
+    reparsées ; celles qui échouent encore repassent par pd.to_datetime (instant).
+    """
+    o = _octets_ou_none(serie)
+    if o is None:
+        debut = _parser_lent(serie, FMT_CRIME)
+        return (pd.Series(debut, index=serie.index, name='crime_start'),
+                pd.Series(debut.copy(), index=serie.index, name='crime_end'))
+    debut, fin, ok = _intervalles_stricts(o)
+    refusees = ~ok & serie.notna().to_numpy()
+    if refusees.any():
+        valeurs = serie[refusees].astype(str)
+        completees = valeurs.str.replace(r'(?<!\d)(\d)(?=[/:])', r'0\1', regex=True)
+        debut_r, fin_r, ok_r = _intervalles_stricts(_Octets(completees))
+        instants = _parser_lent(valeurs[~ok_r], FMT_CRIME)
+        debut_r[~ok_r] = instants
+        fin_r[~ok_r] = instants
+        debut[refusees] = debut_r
+        fin[refusees] = fin_r
+    return (pd.Series(debut, index=serie.index, name='crime_start'),
+            pd.Series(fin, index=serie.index, name='crime_end'))
+
+def _intervalles_stricts(o):
+    """Parsing largeur fixe de parser_intervalle_crime : (début, fin, masque valide)."""
+    n = o.longueur
+    jour1, ok_d1 = o.date(0)
+    heure1, ok_h1, _ = o.heure(11)
+    heure2_court, ok_h2_court, _ = o.heure(19)
+    jour2_long, ok_d2_long = o.date(19)
+    heure2_long, ok_h2_long, _ = o.heure(30)
+    jour2_jours, ok_d2_jours = o.date(13)
+    fin_journee = 24 * 3600 - 60
+
+    instant = (n == 16) & ok_d1 & ok_h1 & o.est(10, " ")
+    court = (n == 24) & ok_d1 & ok_h1 & o.est(10, " ") & o.est(16, " - ") & ok_h2_court
+    long_ = (n == 35) & ok_d1 & ok_h1 & o.est(10, " ") & o.est(16, " - ") & ok_d2_long & o.est(29, " ") & ok_h2_long
+    journee = (n == 10) & ok_d1
+    jours = (n == 23) & ok_d1 & o.est(10, " - ") & ok_d2_jours
+
+    sec_debut = np.where(journee | jours, 0, heure1)
+    jour_fin = np.select([long_, jours], [jour2_long, jour2_jours], default=jour1)
+    sec_fin = np.select([instant, court, long_], [heure1, heure2_court, heure2_long], default=fin_journee)
+    # Intervalle sur la journée qui passe minuit (ex: 22:00 - 02:00)
+    jour_fin = jour_fin + np.where(court & (heure2_court < heure1), 1, 0)
+
+    ok = instant | court | long_ | journee | jours
+    debut = _vers_datetime(jour1, sec_debut, ok)
+    fin = _vers_datetime(jour_fin, sec_fin, ok)
+    ok &= fin >= debut
+    debut[~ok] = np.datetime64('NaT')
+    fin[~ok] = np.datetime64('NaT')
+    return debut, fin, ok
+
+# --- Règles de qualité déclaratives ---
 
 VALID_NEIGHBORHOODS = {
     "Cambridgeport",
@@ -215,138 +295,1069 @@ VALID_NEIGHBORHOODS = {
     "Strawberry Hill",
 }
 
-def nettoyer_donnees(df):
-    """Nettoie le dataset selon les règles métier."""
-    print("\n🧹 --- NETTOYAGE DES DONNÉES --- 🧹")
-    df_clean = df.copy()
-    initial_len = len(df_clean)
-    
-    # 1. Doublons
-    # Doublons exacts
-    df_clean = df_clean.drop_duplicates()
-    print(f"- Doublons exacts supprimés : {initial_len - len(df_clean)}")
-    
-    # Unicité ID (File Number) - on garde le premier
-    len_before = len(df_clean)
-    if 'File Number' in df_clean.columns:
-        df_clean = df_clean.drop_duplicates(subset=['File Number'], keep='first')
-    print(f"- Doublons d'ID supprimés   : {len_before - len(df_clean)}")
+def _numerique(valeurs):
+    """Convertit en numérique (sans re-convertir si c'est déjà le cas)."""
+    if pd.api.types.is_numeric_dtype(valeurs):
+        return pd.Series(valeurs)
+    return pd.Series(pd.to_numeric(valeurs, errors='coerce'))
+
+def _par_ligne(valeurs_uniques, codes, manquant):
+    """Reporte un résultat calculé sur les valeurs uniques vers chaque ligne (code -1 = nul)."""
+    return np.append(valeurs_uniques, [manquant])[codes]
+
+def _convertir_date_report(valeurs):
+    return (parser_date_report(valeurs).to_numpy(dtype='datetime64[ns]'),)
+
+def _convertir_intervalle_crime(valeurs):
+    if pd.api.types.is_datetime64_any_dtype(valeurs):
+        # crime_start, déjà parsé au nettoyage
+        return (valeurs.to_numpy(dtype='datetime64[ns]'),)
+    return tuple(serie.to_numpy(dtype='datetime64[ns]') for serie in parser_intervalle_crime(valeurs))
+
+def _convertir_numerique(valeurs):
+    return (_numerique(valeurs).to_numpy(dtype=float),)
+
+# Formats : conversion des valeurs distinctes d'une colonne en tableaux (NaT / NaN si
+# invalide) ; l'intervalle du crime a deux sorties, crime_start et crime_end
+FORMATS = {
+    'date_report': _convertir_date_report,
+    'intervalle_crime': _convertir_intervalle_crime,
+    'numerique': _convertir_numerique,
+}
+
+# Colonnes remplacées au nettoyage : une règle sur la colonne brute porte alors sur la convertie
+COLONNES_CONVERTIES = {'Crime Date Time': 'crime_start'}
+
+# Règles de qualité, déclarées une seule fois pour l'audit et le nettoyage.
+# Types : non_nul ; unique (première occurrence d'une valeur, ou de la ligne entière sans
+# colonne) ; format (FORMATS) ; regex (motif) ; ensemble (valeurs) ; plage (min / max
+# inclus, format numerique par défaut) ; ordre (colonnes[0] >= colonnes[1], selon formats).
+# indicateur / seuil : compteur d'audit et seuil d'alerte en % ; 'compter': 'violations'
+# pour un taux à garder sous le seuil. nettoyage : clé de suppression (ORDRE_NETTOYAGE).
+REGLES = [
+    {'nom': 'file_number_non_nul', 'type': 'non_nul', 'colonne': 'File Number',
+     'indicateur': 'Complétude [File Number]', 'seuil': 95.0},
+    {'nom': 'crime_non_nul', 'type': 'non_nul', 'colonne': 'Crime',
+     'indicateur': 'Complétude [Crime]', 'seuil': 95.0, 'nettoyage': 'crime_null'},
+    {'nom': 'neighborhood_non_nul', 'type': 'non_nul', 'colonne': 'Neighborhood',
+     'indicateur': 'Complétude [Neighborhood]', 'seuil': 95.0},
+    {'nom': 'doublons_id', 'type': 'unique', 'colonne': 'File Number',
+     'indicateur': 'Unicité [File Number]', 'seuil': 100.0, 'nettoyage': 'doublons_id'},
+    {'nom': 'doublons', 'type': 'unique',
+     'indicateur': 'Taux Doublons Exacts', 'seuil': 0.0, 'compter': 'violations', 'nettoyage': 'doublons'},
+    {'nom': 'date_report', 'type': 'format', 'colonne': 'Date of Report', 'format': 'date_report',
+     'indicateur': 'Validité Date [Date of Report]', 'seuil': 95.0, 'nettoyage': 'dates'},
+    {'nom': 'date_crime', 'type': 'format', 'colonne': 'Crime Date Time', 'format': 'intervalle_crime',
+     'nettoyage': 'dates'},
+    {'nom': 'coherence_temporelle', 'type': 'ordre', 'colonnes': ['Date of Report', 'Crime Date Time'],
+     'formats': ['date_report', 'intervalle_crime'],
+     'indicateur': 'Cohérence Temporelle (Report >= Crime)', 'seuil': 98.0, 'nettoyage': 'temporel'},
+    {'nom': 'area_numerique', 'type': 'format', 'colonne': 'Reporting Area', 'format': 'numerique',
+     'indicateur': 'Conformité [Reporting Area]', 'seuil': 95.0, 'nettoyage': 'area'},
+    {'nom': 'neighborhood_valide', 'type': 'ensemble', 'colonne': 'Neighborhood', 'valeurs': VALID_NEIGHBORHOODS,
+     'nettoyage': 'neighborhood'},
+]
+
+# Ordre d'application au nettoyage ; les deux dédoublonnages voient tout le fichier,
+# les autres règles ne dépendent que de la ligne
+DEDOUBLONNAGE = ('doublons', 'doublons_id')
+NETTOYAGE_LIGNES = ('crime_null', 'dates', 'temporel', 'area', 'neighborhood')
+ORDRE_NETTOYAGE = DEDOUBLONNAGE + NETTOYAGE_LIGNES
+
+def seuil_indicateur(indicateur):
+    """Seuil d'alerte (%) d'un indicateur et son sens (True : le taux doit rester sous le seuil)."""
+    for regle in REGLES:
+        if regle.get('indicateur') == indicateur:
+            return regle.get('seuil', 95.0), regle.get('compter') == 'violations'
+    return 95.0, False
+
+def _colonnes_regle(regle):
+    """Colonnes lues par une règle (aucune pour l'unicité de la ligne entière)."""
+    if 'colonnes' in regle:
+        return list(regle['colonnes'])
+    return [regle['colonne']] if regle.get('colonne') else []
+
+class Verification:
+    """Règles de qualité compilées pour un DataFrame : un masque booléen par règle.
+
+    Chaque colonne est factorisée une seule fois ; les conversions (FORMATS) et les
+    règles par valeur sont évaluées sur les valeurs distinctes, puis reportées sur les
+    lignes. Les masques sont calculés à la demande et mémorisés : l'audit et le nettoyage
+    d'un même DataFrame partagent codes, dates parsées et contrôles.
+    """
+
+    def __init__(self, df, regles=None):
+        self.df = df
+        self.regles = {regle['nom']: regle for regle in (REGLES if regles is None else regles)}
+        self._codes, self._uniques, self._conversions, self._masques = {}, {}, {}, {}
+
+    def colonne(self, col):
+        """Nom de la colonne dans df (ou de sa version convertie), None si absente."""
+        if col in self.df.columns:
+            return col
+        convertie = COLONNES_CONVERTIES.get(col)
+        return convertie if convertie in self.df.columns else None
+
+    def applicable(self, regle):
+        return all(self.colonne(col) is not None for col in _colonnes_regle(regle))
+
+    def regles_nettoyage(self, cle):
+        """Noms des règles applicables dont les violations sont supprimées sous la clé cle."""
+        return [nom for nom, regle in self.regles.items() if regle.get('nettoyage') == cle and self.applicable(regle)]
+
+    def codes(self, col):
+        """Codes entiers par ligne (-1 pour les nuls), factorisés une seule fois."""
+        if col not in self._codes:
+            self._codes[col], self._uniques[col] = pd.factorize(self.df[col])
+        return self._codes[col]
+
+    def conversion(self, col, fmt):
+        """Valeurs distinctes de col converties par FORMATS[fmt] (tuple de tableaux)."""
+        if (col, fmt) not in self._conversions:
+            self.codes(col)
+            self._conversions[col, fmt] = FORMATS[fmt](pd.Series(self._uniques[col]))
+        return self._conversions[col, fmt]
+
+    def valeurs(self, col, fmt, sortie=0):
+        """Valeurs converties par ligne (NaT / NaN si nulles ou invalides)."""
+        col = self.colonne(col)
+        converties = self.conversion(col, fmt)[sortie]
+        manquant = np.datetime64('NaT') if converties.dtype.kind == 'M' else np.nan
+        return _par_ligne(converties, self.codes(col), manquant)
+
+    def masque(self, nom):
+        """Masque des lignes conformes à la règle nom (évalué une seule fois)."""
+        if nom not in self._masques:
+            self._masques[nom] = self._evaluer(self.regles[nom])
+        return self._masques[nom]
+
+    def _evaluer(self, regle):
+        type_regle = regle['type']
+        if type_regle == 'unique':
+            if not regle.get('colonne'):
+                # Ligne entière : doublons sur les codes entiers plutôt que sur les objets
+                return ~pd.DataFrame({col: self.codes(col) for col in self.df.columns}).duplicated().to_numpy()
+            return ~pd.Series(self.codes(self.colonne(regle['colonne']))).duplicated().to_numpy()
+        if type_regle == 'ordre':
+            gauche, droite = (self.valeurs(col, fmt) for col, fmt in zip(regle['colonnes'], regle['formats']))
+            # NaT >= x vaut False
+            return gauche >= droite
+        col = self.colonne(regle['colonne'])
+        if type_regle == 'non_nul':
+            return self.codes(col) >= 0
+        # Règles par valeur : sur les valeurs distinctes, les nuls ne sont pas conformes
+        codes = self.codes(col)
+        uniques = pd.Series(self._uniques[col])
+        if type_regle == 'format':
+            conformes = pd.notna(self.conversion(col, regle['format'])[0])
+        elif type_regle == 'regex':
+            conformes = uniques.astype(str).str.fullmatch(regle['motif']).to_numpy(dtype=bool)
+        elif type_regle == 'ensemble':
+            conformes = uniques.isin(regle['valeurs']).to_numpy()
+        elif type_regle == 'plage':
+            valeurs = self.conversion(col, regle.get('format', 'numerique'))[0]
+            conformes = (valeurs >= regle.get('min', -np.inf)) & (valeurs <= regle.get('max', np.inf))
+        else:
+            raise ValueError(f"Type de règle inconnu : {type_regle}")
+        return _par_ligne(conformes, codes, False)
+
+    def compter(self, sans=()):
+        """Compteurs d'audit des règles à indicateur (lignes conformes, ou violations).
+
+        sans : règles à ne pas évaluer (compteur à 0, fourni par ailleurs).
+        """
+        stats = {}
+        for nom, regle in self.regles.items():
+            if 'indicateur' not in regle:
+                continue
+            if nom in sans or not self.applicable(regle):
+                stats[regle['indicateur']] = 0
+                continue
+            if regle['type'] == 'unique' and regle.get('colonne'):
+                # Premières occurrences non nulles : le nombre de valeurs distinctes (nunique)
+                col = self.colonne(regle['colonne'])
+                self.codes(col)
+                nb = len(self._uniques[col])
+            else:
+                nb = int(self.masque(nom).sum())
+            stats[regle['indicateur']] = len(self.df) - nb if regle.get('compter') == 'violations' else nb
+        return stats
+
+    def restreindre(self, garder, df=None):
+        """Vérification des seules lignes gardées (masque booléen), sans rien recalculer.
+
+        df : les lignes gardées, si elles sont déjà extraites. Les masques d'unicité
+        dépendent de toutes les lignes : ils sont réévalués si besoin. Les valeurs
+        distinctes (et leurs conversions) sont réduites à celles des lignes gardées,
+        codes renumérotés : compter() donne le nunique du sous-ensemble.
+        """
+        sous = Verification(self.df[garder] if df is None else df, list(self.regles.values()))
+        presentes = {}
+        for col, codes in self._codes.items():
+            codes = codes[garder]
+            valides = codes >= 0
+            presentes[col] = np.bincount(codes[valides], minlength=len(self._uniques[col])) > 0
+            renumeros = np.cumsum(presentes[col]) - 1
+            sous._codes[col] = np.where(valides, renumeros[np.where(valides, codes, 0)], -1)
+            sous._uniques[col] = self._uniques[col][presentes[col]]
+        sous._conversions = {(col, fmt): tuple(valeurs[presentes[col]] for valeurs in converties)
+                             for (col, fmt), converties in self._conversions.items()}
+        sous._masques = {nom: masque[garder] for nom, masque in self._masques.items()
+                         if self.regles[nom]['type'] != 'unique'}
+        return sous
+
+    def remplacer(self, df, colonne):
+        """df (mêmes lignes) dont colonne a changé : oublie ce qui en dépend."""
+        self.df = df
+        self._codes.pop(colonne, None)
+        self._uniques.pop(colonne, None)
+        self._conversions = {cle: v for cle, v in self._conversions.items() if cle[0] != colonne}
+        for nom, regle in self.regles.items():
+            if regle['type'] == 'unique' or colonne in map(self.colonne, _colonnes_regle(regle)):
+                self._masques.pop(nom, None)
+
+def compter_indicateurs(df, verification=None):
+    """Compte, en une seule passe sur les colonnes, les lignes conformes à chaque indicateur.
+
+    Les indicateurs sont ceux des REGLES (voir Verification) : chaque colonne est
+    factorisée une seule fois, le parsing des dates / Reporting Area ne se fait que
+    sur les valeurs distinctes et les colonnes déjà converties ne sont pas re-parsées.
+    verification : celle du nettoyage qui suit, pour lui laisser les masques calculés.
+    Les compteurs sont additifs (sauf unicité et doublons, qui dépendent de l'historique).
+    """
+    return (verification or Verification(df)).compter()
+
+def pourcentages(compteurs, n):
+    """Convertit les compteurs d'indicateurs en pourcentages du nombre de lignes."""
+    return {indicateur: (valeur / n) * 100 for indicateur, valeur in compteurs.items()}
+
+def calculer_indicateurs(df, verification=None):
+    """Calcule tous les indicateurs de qualité (en %) en une seule passe.
+
+    Les valeurs sont identiques à celles de l'audit historique par indicateur (benchmark.py).
+    """
+    return pourcentages(compter_indicateurs(df, verification), len(df))
+
+def auditer_qualite(df, verification=None):
+    """Fonction principale regroupant les indicateurs."""
+    # 1 à 6 : Complétude, Unicité, Doublons, Validité Dates, Cohérence, Conformité
+    return afficher_audit(calculer_indicateurs(df, verification))
+
+def afficher_audit(stats, erreurs=None):
+    """Affiche les indicateurs (en %) avec leur statut et les retourne en Series.
+
+    Chaque indicateur est comparé à son seuil, déclaré avec sa règle (seuil_indicateur).
+    erreurs : demi-largeur de l'intervalle à 95 % de chaque indicateur (audit approché) ;
+    un seuil compris dans l'intervalle est signalé comme incertain.
+    """
+    print("\n📊 --- AUDIT DE QUALITÉ --- 📊")
     
-    # 2. Crime null
-    if 'Crime' in df_clean.columns:
-        len_before = len(df_clean)
-        df_clean = df_clean.dropna(subset=['Crime'])
-        print(f"- Lignes 'Crime' null suppr : {len_before - len(df_clean)}")
-
-    # 3. Dates
-    fmt_report = '%m/%d/%Y %I:%M:%S %p'
-    fmt_crime = '%m/%d/%Y %H:%M'
+    resultats_series = pd.Series(stats)
     
-    # Conversion et suppression des invalides
-    len_before = len(df_clean)
-    if 'Date of Report' in df_clean.columns:
-        df_clean['Date of Report'] = pd.to_datetime(df_clean['Date of Report'], format=fmt_report, errors='coerce')
-        df_clean = df_clean.dropna(subset=['Date of Report'])
+    for indicateur, valeur in stats.items():
+        status = "✅"
+        erreur = erreurs.get(indicateur, 0.0) if erreurs else 0.0
+        seuil, maximum = seuil_indicateur(indicateur)
+        if maximum:
+            # Taux de violations (doublons) : doit rester sous le seuil
+            if valeur - erreur > seuil: status = f"❌ (> {seuil:g}%)"
+            elif valeur + erreur > seuil: status = f"⚠️ ({seuil:g}% dans l'intervalle)"
+        else:
+            if valeur + erreur < seuil: status = f"❌ (< {seuil:g}%)"
+            elif valeur - erreur < seuil: status = f"⚠️ ({seuil:g}% dans l'intervalle)"
+            
+        if erreurs:
+            print(f"{indicateur:<40} : {valeur:.2f}% ± {erreur:.2f} {status}")
+        else:
+            print(f"{indicateur:<40} : {valeur:.2f}% {status}")
         
+    return resultats_series
+
+# --- Représentation compacte en mémoire ---
+
+# Dictionnaire fixe des quartiers : les noms valides d'abord, les valeurs invalides observées ensuite
+CATEGORIES_QUARTIERS = sorted(VALID_NEIGHBORHOODS)
+
+# Colonnes texte à faible cardinalité, stockées en catégories (codes entiers + dictionnaire)
+COLONNES_CATEGORIELLES = ['Crime', 'Neighborhood', 'Reporting Area', 'Location']
+
+def encoder_file_number(serie):
+    """Encode File Number (YYYY-NNNNN) en clé entière Int64, sans perte.
+
+    clé = (année * 10 + nb de chiffres du numéro) * 10**9 + numéro : le nombre de
+    chiffres garde les zéros de tête. Retourne None si une valeur ne suit pas le format.
+    """
+    o = _Octets(serie)
+    annee, ok = o.nombre(0, 4)
+    largeur = o.longueur - 5
+    ok &= o.est(4, "-") & (largeur >= 1) & (largeur <= 9)
+    numero = np.zeros(len(serie), dtype=np.int64)
+    for i in range(9):
+        dans = i < largeur
+        chiffre = o.octet(5 + i).astype(np.int64) - 48
+        ok &= ~dans | ((chiffre >= 0) & (chiffre <= 9))
+        numero = np.where(dans, numero * 10 + chiffre, numero)
+    nuls = serie.isna().to_numpy()
+    if not (ok | nuls).all():
+        return None
+    cles = (annee * 10 + largeur) * 10**9 + numero
+    return pd.Series(pd.arrays.IntegerArray(cles, nuls), index=serie.index, name=serie.name)
+
+def decoder_file_number(cles):
+    """Inverse de encoder_file_number : restitue le texte YYYY-NNNNN."""
+    valeurs = cles.to_numpy(dtype=np.int64, na_value=0)
+    annees = pd.Series(valeurs // 10**10, index=cles.index).astype(str)
+    largeurs = (valeurs // 10**9) % 10
+    numeros = pd.Series(valeurs % 10**9, index=cles.index).astype(str)
+    for largeur in np.unique(largeurs):
+        masque = largeurs == largeur
+        numeros[masque] = numeros[masque].str.zfill(int(largeur))
+    texte = annees + "-" + numeros
+    return texte.where(cles.notna().to_numpy())
+
+def compacter_donnees(df):
+    """Représentation compacte et sans perte du DataFrame brut.
+
+    Crime, Neighborhood, Reporting Area et Location deviennent des catégories
+    (Neighborhood avec le dictionnaire fixe CATEGORIES_QUARTIERS) et File Number une
+    clé entière : isin, drop_duplicates et value_counts travaillent sur des codes.
+    Reporting Area passe au plus petit entier au nettoyage.
+    """
+    df = df.copy(deep=False)
+    for col in COLONNES_CATEGORIELLES:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    if 'Neighborhood' in df.columns:
+        autres = sorted(set(df['Neighborhood'].cat.categories) - VALID_NEIGHBORHOODS)
+        df['Neighborhood'] = df['Neighborhood'].cat.set_categories(CATEGORIES_QUARTIERS + autres)
+    if 'File Number' in df.columns and not pd.api.types.is_integer_dtype(df['File Number']):
+        cles = encoder_file_number(df['File Number'])
+        if cles is not None:
+            df['File Number'] = cles
+    return df
+
+# Colonnes réduites au plus petit entier en représentation compacte (int64 sinon)
+COLONNES_ENTIERES = ['Reporting Area', 'reporting_area_group']
+
+def decompacter_donnees(df):
+    """Remet File Number en texte et les entiers réduits en int64 pour l'export.
+
+    Les catégories s'écrivent telles quelles : le schéma exporté (Parquet, cube, CSV) est
+    celui du mode par défaut.
+    """
+    colonnes = {}
+    if 'File Number' in df.columns and pd.api.types.is_integer_dtype(df['File Number']):
+        colonnes['File Number'] = decoder_file_number(df['File Number'])
+    for col in COLONNES_ENTIERES:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]) and df[col].dtype.itemsize < 8:
+            colonnes[col] = df[col].astype(np.int64)
+    return df.assign(**colonnes) if colonnes else df
+
+def lire_csv_compact(nom_fichier):
+    """Lit le CSV brut directement en représentation compacte."""
+    dtypes = {col: 'category' for col in COLONNES_CATEGORIELLES}
+    dtypes.update({'File Number': str, 'Date of Report': str, 'Crime Date Time': str})
+    # Moteur pyarrow (multi-thread) : même résultat que le moteur C, bien plus rapide
+    return compacter_donnees(pd.read_csv(nom_fichier, dtype=dtypes, engine='pyarrow'))
+
+# --- Fonctions de Nettoyage et Enrichissement ---
+
+def appliquer_regles_lignes(df_clean, index_quartiers=None, verification=None):
+    """Applique les règles qui ne dépendent que de la ligne (NETTOYAGE_LIGNES, voir REGLES).
+
+    Les masques des règles (ceux de l'audit si verification est fournie) sont combinés
+    dans l'ordre pour compter les suppressions de chaque règle ; le DataFrame n'est
+    filtré qu'une fois, puis typé à partir des valeurs déjà parsées (convertir_colonnes).
+    Avec un index_quartiers (jointure_spatiale), les Neighborhood invalides sont
+    d'abord récupérés à partir des coordonnées au lieu d'être supprimés.
+    Retourne le DataFrame filtré et le nombre de lignes supprimées par règle.
+    """
+    verification = verification or Verification(df_clean)
+    gardees = np.ones(len(df_clean), dtype=bool)
+    suppressions = {}
+
+    # 2 à 5. Crime null, dates, incohérence temporelle, Reporting Area, Neighborhood
+    for cle in NETTOYAGE_LIGNES:
+        noms = verification.regles_nettoyage(cle)
+        if not noms:
+            continue
+        with etape(cle, lignes=int(gardees.sum())) as mesure:
+            if cle == 'neighborhood' and index_quartiers is not None:
+                # La jointure spatiale ne porte que sur les lignes restantes
+                df_clean = df_clean[gardees]
+                verification = verification.restreindre(gardees, df_clean)
+                gardees = gardees[gardees]
+                with etape('jointure_spatiale'):
+                    df_clean, nb_recuperes = recuperer_quartiers(df_clean, index_quartiers, VALID_NEIGHBORHOODS)
+                verification.remplacer(df_clean, 'Neighborhood')
+                suppressions['neighborhood_recuperes'] = nb_recuperes
+            for nom in noms:
+                gardees &= verification.masque(nom)
+            mesure.lignes_sortie = int(gardees.sum())
+        suppressions[cle] = mesure.lignes_entree - mesure.lignes_sortie
+
+    with etape('conversion', lignes=int(gardees.sum())):
+        df_clean = convertir_colonnes(df_clean[gardees], verification, gardees)
+    return df_clean, suppressions
+
+def convertir_colonnes(df_clean, verification, gardees):
+    """Type les colonnes des lignes gardées à partir des valeurs converties de la vérification.
+
+    Date of Report devient une date, Crime Date Time (instant ou intervalle) est remplacée
+    par crime_start / crime_end et Reporting Area passe en entier (le plus petit entier en
+    représentation compacte). Rien n'est re-parsé : les conversions sont celles des règles.
+    """
+    if 'Date of Report' in df_clean.columns:
+        df_clean['Date of Report'] = verification.valeurs('Date of Report', 'date_report')[gardees]
+
     if 'Crime Date Time' in df_clean.columns:
-        df_clean['Crime Date Time'] = pd.to_datetime(df_clean['Crime Date Time'], format=fmt_crime, errors='coerce')
-        df_clean = df_clean.dropna(subset=['Crime Date Time'])
-    print(f"- Dates invalides suppr     : {len_before - len(df_clean)}")
-    
-    # Incohérence temporelle (Report < Crime)
-    len_before = len(df_clean)
-    if 'Date of Report' in df_clean.columns and 'Crime Date Time' in df_clean.columns:
-        df_clean = df_clean[df_clean['Date of Report'] >= df_clean['Crime Date Time']]
-    print(f"- Incohérences temp. suppr  : {len_before - len(df_clean)}")
+        debut, fin = (verification.valeurs('Crime Date Time', 'intervalle_crime', sortie)[gardees] for sortie in (0, 1))
+        position = df_clean.columns.get_loc('Crime Date Time')
+        df_clean = df_clean.drop(columns=['Crime Date Time'])
+        df_clean.insert(position, 'crime_start', debut)
+        df_clean.insert(position + 1, 'crime_end', fin)
 
-    # 4. Reporting Area invalide
     if 'Reporting Area' in df_clean.columns:
-        len_before = len(df_clean)
-        # On force en numérique, les erreurs deviennent NaN, puis on drop
-        df_clean['Reporting Area'] = pd.to_numeric(df_clean['Reporting Area'], errors='coerce')
-        df_clean = df_clean.dropna(subset=['Reporting Area'])
-        # On cast en int pour être propre
-        df_clean['Reporting Area'] = df_clean['Reporting Area'].astype(int)
-        print(f"- Reporting Area invalides  : {len_before - len(df_clean)}")
-
-    # 5. Neighborhood invalide
-    if 'Neighborhood' in df_clean.columns:
-        len_before = len(df_clean)
-        df_clean = df_clean[df_clean['Neighborhood'].isin(VALID_NEIGHBORHOODS)]
-        print(f"- Neighborhood invalides    : {len_before - len(df_clean)}")
+        compacte = isinstance(df_clean['Reporting Area'].dtype, pd.CategoricalDtype)
+        zone = verification.valeurs('Reporting Area', 'numerique')[gardees].astype(int)
+        if compacte:
+            zone = pd.to_numeric(zone, downcast='integer')
+        df_clean['Reporting Area'] = zone
+    return df_clean
+
+def afficher_suppressions(suppressions):
+    """Affiche le nombre de lignes supprimées par règle."""
+    libelles = [
+        ('doublons', "- Doublons exacts supprimés : "),
+        ('doublons_id', "- Doublons d'ID supprimés   : "),
+        ('crime_null', "- Lignes 'Crime' null suppr : "),
+        ('dates', "- Dates invalides suppr     : "),
+        ('temporel', "- Incohérences temp. suppr  : "),
+        ('area', "- Reporting Area invalides  : "),
+        ('neighborhood_recuperes', "- Neighborhood récupérés    : "),
+        ('neighborhood', "- Neighborhood invalides    : "),
+        ('quasi_doublons', "- Quasi-doublons fusionnés  : "),
+    ]
+    for cle, libelle in libelles:
+        if cle in suppressions:
+            print(f"{libelle}{suppressions[cle]}")
+
+def _regles_partition(partition, index_quartiers=None, instrumenter=False):
+    """Règles ligne à ligne d'une partition (dans un worker), avec ses mesures si demandé."""
+    if not instrumenter:
+        return (*appliquer_regles_lignes(partition, index_quartiers), [])
+    instrumentation.activer()
+    df_partition, suppressions = appliquer_regles_lignes(partition, index_quartiers)
+    instrumentation.desactiver()
+    return df_partition, suppressions, instrumentation.resultats()
+
+def appliquer_regles_en_parallele(df_clean, workers, index_quartiers=None, pool=None):
+    """Applique les règles ligne à ligne sur des partitions contiguës, dans un pool de processus.
+
+    Les partitions sont recollées dans l'ordre : le résultat est identique au mode série.
+    Les mesures des workers sont cumulées (temps additionnés sur les partitions).
+    pool : pool déjà ouvert, réutilisé d'un appel à l'autre (sinon un pool par appel).
+    """
+    partitions = [df_clean.iloc[idx] for idx in np.array_split(np.arange(len(df_clean)), workers)]
+    suppressions = {}
+    regles = partial(_regles_partition, index_quartiers=index_quartiers, instrumenter=instrumentation.actif())
+    if pool is not None:
+        resultats = list(pool.map(regles, partitions))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            resultats = list(pool.map(regles, partitions))
+    for _, suppr_partition, mesures in resultats:
+        for cle, nb in suppr_partition.items():
+            suppressions[cle] = suppressions.get(cle, 0) + nb
+        instrumentation.fusionner(mesures)
+    return pd.concat([partition for partition, _, _ in resultats]), suppressions
+
+def nettoyer_donnees(df, workers=1, index_quartiers=None, quasi_doublons=False, rapport_quasi_doublons=None,
+                     verification=None):
+    """Nettoie le dataset selon les règles métier (REGLES, dans l'ordre ORDRE_NETTOYAGE).
+
+    Les deux dédoublonnages voient toutes les lignes et restent en série ; avec
+    workers > 1, les règles ligne à ligne sont réparties sur un pool de processus.
+    verification : celle de l'audit avant nettoyage, dont les masques sont réutilisés.
+    quasi_doublons : fusionne aussi les rapports d'un même incident (voir quasi_doublons.py),
+    groupes fusionnés exportés en CSV vers rapport_quasi_doublons si donné.
+    """
+    print("\n🧹 --- NETTOYAGE DES DONNÉES --- 🧹")
+    verification = verification or Verification(df)
+    initial_len = len(df)
+    gardees = np.ones(initial_len, dtype=bool)
+    suppressions = {}
+
+    # 1. Doublons exacts, puis unicité ID (File Number) - on garde le premier
+    for cle in DEDOUBLONNAGE:
+        with etape(cle, lignes=int(gardees.sum())) as mesure:
+            for nom in verification.regles_nettoyage(cle):
+                gardees &= verification.masque(nom)
+            mesure.lignes_sortie = int(gardees.sum())
+        suppressions[cle] = mesure.lignes_entree - mesure.lignes_sortie
+    df_clean = df[gardees]
+
+    # 2 à 5. Règles ligne à ligne
+    if workers > 1:
+        df_clean, suppressions_lignes = appliquer_regles_en_parallele(df_clean, workers, index_quartiers)
+    else:
+        df_clean, suppressions_lignes = appliquer_regles_lignes(df_clean, index_quartiers,
+                                                                verification.restreindre(gardees, df_clean))
+    suppressions.update(suppressions_lignes)
+
+    # 6. Quasi-doublons : après les règles, dates et Reporting Area sont typées
+    if quasi_doublons:
+        with etape('quasi_doublons', lignes=len(df_clean)) as mesure:
+            groupes, a_supprimer = marquer_quasi_doublons(df_clean)
+            if rapport_quasi_doublons:
+                rapport_groupes(df_clean, groupes, a_supprimer).to_csv(rapport_quasi_doublons, index=False)
+            df_clean = df_clean[~a_supprimer]
+            mesure.lignes_sortie = len(df_clean)
+        suppressions['quasi_doublons'] = mesure.lignes_entree - mesure.lignes_sortie
+    afficher_suppressions(suppressions)
+    if quasi_doublons and rapport_quasi_doublons:
+        print(f"✅ Groupes de quasi-doublons exportés vers : {rapport_quasi_doublons}")
 
     print(f"Assignation finale : {len(df_clean)} lignes (Total supprimé : {initial_len - len(df_clean)})")
     return df_clean
 
-def enrichir_donnees(df):
-    """Ajoute des colonnes dérivées."""
-    print("\n✨ --- ENRICHISSEMENT --- ✨")
-    df_enrich = df.copy()
-    
-    # 1. Reporting Area Group
+def ajouter_colonnes_derivees(df_enrich):
+    """Ajoute les colonnes dérivées (sans copie). Retourne le DataFrame et le nombre de lignes écartées."""
+    nb_aberrantes = 0
     if 'Reporting Area' in df_enrich.columns:
         # Groupe de centaines (ex: 602 -> 6)
         # Attention, Reporting Area est int maintenant
         df_enrich['reporting_area_group'] = df_enrich['Reporting Area'] // 100
-        
+        if df_enrich['Reporting Area'].dtype.itemsize < 8:
+            # Représentation compacte : le groupe tient aussi dans le plus petit entier
+            df_enrich['reporting_area_group'] = pd.to_numeric(df_enrich['reporting_area_group'], downcast='integer')
+
         # Validation
-        valeurs_aberrantes = df_enrich[df_enrich['reporting_area_group'] < 0]
-        if not valeurs_aberrantes.empty:
-            print(f"⚠️ Attention : {len(valeurs_aberrantes)} valeurs négatives détectées dans le groupe.")
-            # On pourrait décider de les supprimer ou de prendre la valeur absolue.
-            # Pour l'exercice, on filtre.
-            df_enrich = df_enrich[df_enrich['reporting_area_group'] >= 0]
-            
+        # On pourrait décider de les supprimer ou de prendre la valeur absolue.
+        # Pour l'exercice, on filtre.
+        masque = df_enrich['reporting_area_group'] >= 0
+        nb_aberrantes = int((~masque).sum())
+        if nb_aberrantes:
+            df_enrich = df_enrich[masque]
+    return df_enrich, nb_aberrantes
+
+def enrichir_donnees(df):
+    """Ajoute des colonnes dérivées."""
+    print("\n✨ --- ENRICHISSEMENT --- ✨")
+    # Copie superficielle : les colonnes ajoutées ne touchent pas df, les données ne sont pas dupliquées
+    df_enrich, nb_aberrantes = ajouter_colonnes_derivees(df.copy(deep=False))
+
+    if 'reporting_area_group' in df_enrich.columns:
+        if nb_aberrantes:
+            print(f"⚠️ Attention : {nb_aberrantes} valeurs négatives détectées dans le groupe.")
         print("Colonnes ajoutées : ['reporting_area_group']")
-        
+
     return df_enrich
 
-if __name__ == "__main__":
+# --- Export colonnaire (Parquet) ---
+
+# Colonnes stockées en dictionnaire (catégorielles à la relecture)
+COLONNES_DICTIONNAIRE = ['Crime', 'Neighborhood']
+
+def vers_table_arrow(df):
+    """Convertit le DataFrame nettoyé en table Arrow au schéma stable.
+
+    Crime / Neighborhood sont encodés en dictionnaire (index int32) et les dates
+    gardées en timestamps natifs, pour que tous les blocs aient le même schéma.
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(decompacter_donnees(df), preserve_index=False).replace_schema_metadata(None)
+    for i, champ in enumerate(table.schema):
+        if champ.name in COLONNES_DICTIONNAIRE:
+            colonne = table.column(i).cast(pa.string()).dictionary_encode()
+            table = table.set_column(i, champ.name, colonne)
+        elif pa.types.is_dictionary(champ.type):
+            # Autres catégories de la représentation compacte : texte simple
+            table = table.set_column(i, champ.name, table.column(i).cast(champ.type.value_type))
+        elif pa.types.is_timestamp(champ.type):
+            table = table.set_column(i, champ.name, table.column(i).cast(pa.timestamp('us')))
+    return table
+
+def exporter_parquet(df, chemin):
+    """Écrit le DataFrame nettoyé au format Parquet."""
+    import pyarrow.parquet as pq
+
+    pq.write_table(vers_table_arrow(df), chemin)
+
+def exporter_cube(cube, chemin):
+    """Écrit le cube pré-agrégé (quartier x crime x groupe x jour x heure) à côté des données."""
+    if cube is None:
+        return
+    exporter_parquet(cube, chemin)
+    print(f"🧊 Cube pré-agrégé exporté vers : {chemin} ({len(cube)} cellules)")
+
+# --- Mode flux (par blocs, mémoire bornée) ---
+
+class EnsembleCles:
+    """Ensemble compact de clés uint64 (8 octets par clé).
+
+    Les clés sont stockées dans des tableaux triés dont la taille double
+    d'un niveau à l'autre (fusion façon LSM), ce qui évite la surcharge
+    d'un set Python tout en gardant des insertions amorties en O(log n).
+    """
+
+    def __init__(self):
+        self.niveaux = []
+
+    def __len__(self):
+        return sum(len(n) for n in self.niveaux)
+
+    def contient(self, cles):
+        """Retourne un masque booléen : True si la clé a déjà été vue."""
+        vues = np.zeros(len(cles), dtype=bool)
+        for niveau in self.niveaux:
+            pos = np.searchsorted(niveau, cles)
+            pos[pos == len(niveau)] = 0
+            vues |= niveau[pos] == cles
+        return vues
+
+    def tableau(self):
+        """Retourne toutes les clés dans un seul tableau trié."""
+        if not self.niveaux:
+            return np.zeros(0, dtype=np.uint64)
+        return np.sort(np.concatenate(self.niveaux))
+
+    def ajouter(self, cles):
+        """Ajoute des clés (supposées absentes de l'ensemble)."""
+        nouveau = np.sort(np.asarray(cles, dtype=np.uint64))
+        nouveau = nouveau[np.r_[True, nouveau[1:] != nouveau[:-1]]] if len(nouveau) else nouveau
+        if len(nouveau) == 0:
+            return
+        # On fusionne avec les niveaux plus petits ou de même taille : deux suites triées
+        # sans clé commune, que le tri stable (timsort) fusionne en temps linéaire
+        while self.niveaux and len(self.niveaux[-1]) <= len(nouveau):
+            nouveau = np.sort(np.concatenate([self.niveaux.pop(), nouveau]), kind='stable')
+        self.niveaux.append(nouveau)
+
+def marquer_doublons_bloc(bloc, vues_lignes, vues_id):
+    """Masques des doublons exacts et d'ID d'un bloc, en tenant compte des blocs précédents."""
+    # Hash 64 bits de la ligne complète (équivalent à df.duplicated())
+    cles_lignes = pd.util.hash_pandas_object(bloc, index=False).to_numpy()
+    doublons = vues_lignes.contient(cles_lignes) | pd.Series(cles_lignes).duplicated().to_numpy()
+    vues_lignes.ajouter(cles_lignes[~doublons])
+
+    doublons_id = np.zeros(len(bloc), dtype=bool)
+    if 'File Number' in bloc.columns:
+        # Le contrôle d'ID ne porte que sur les lignes qui ont survécu au dédoublonnage exact
+        cles_id = pd.util.hash_pandas_object(bloc['File Number'], index=False).to_numpy()
+        restants = ~doublons
+        doublons_id[restants] = (vues_id.contient(cles_id[restants])
+                                 | pd.Series(cles_id[restants]).duplicated().to_numpy())
+        vues_id.ajouter(cles_id[restants & ~doublons_id])
+    return doublons, doublons_id
+
+def compteurs_avant_bloc(bloc, doublons, doublons_id, verification=None):
+    """Compteurs d'audit du bloc brut, additifs d'un bloc à l'autre.
+
+    Doublons et unicité viennent des masques de marquer_doublons_bloc (qui tiennent
+    compte des blocs précédents) : la somme sur les blocs est celle du fichier entier.
+    verification : celle du bloc, réutilisée ensuite par le nettoyage.
+    """
+    compteurs = (verification or Verification(bloc)).compter(sans=DEDOUBLONNAGE)
+    compteurs["Taux Doublons Exacts"] = int(doublons.sum())
+    if 'File Number' in bloc.columns:
+        # Chaque ID qui passe le contrôle d'unicité est un nouvel ID distinct
+        ids_non_nuls = bloc['File Number'].notna().to_numpy()
+        compteurs["Unicité [File Number]"] = int((~doublons & ~doublons_id & ids_non_nuls).sum())
+    return compteurs
+
+class ExportBlocs:
+    """Écriture au fil de l'eau : un row group Parquet par bloc, cube cumulé, CSV optionnel."""
+
+    def __init__(self, chemin_parquet, chemin_csv=None):
+        self.chemin_parquet = chemin_parquet
+        self.chemin_csv = chemin_csv
+        self.writer = None
+        self.cubes = []
+        self.nb_blocs = 0
+
+    def ecrire(self, bloc):
+        import pyarrow.parquet as pq
+
+        table = vers_table_arrow(bloc)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.chemin_parquet, table.schema)
+        self.writer.write_table(table)
+        # Cubes partiels, compactés régulièrement pour borner la mémoire
+        self.cubes.append(construire_cube(bloc))
+        if len(self.cubes) >= 16:
+            self.cubes = [fusionner_cubes(self.cubes)]
+        if self.chemin_csv:
+            premier = self.nb_blocs == 0
+            bloc.to_csv(self.chemin_csv, mode='w' if premier else 'a', header=premier,
+                        index=False, date_format=FMT_EXPORT)
+        self.nb_blocs += 1
+
+    def fermer(self, complet=True):
+        """Ferme le Parquet et, si complet, écrit le cube agrégé de tous les blocs.
+
+        complet=False (arrêt sur erreur) : le Parquet est refermé, aucun cube partiel écrit.
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if complet:
+            exporter_cube(fusionner_cubes(self.cubes), chemin_cube(self.chemin_parquet))
+
+def nettoyer_donnees_par_blocs(nom_fichier, chemin_parquet, taille_bloc=100_000, chemin_csv=None, index_quartiers=None):
+    """Nettoie et enrichit le CSV bloc par bloc, en écrivant au fil de l'eau.
+
+    La mémoire reste bornée par la taille d'un bloc (plus l'ensemble des clés vues).
+    Chaque bloc devient un row group du Parquet ; le CSV optionnel est identique
+    à celui du mode en mémoire.
+    """
+    print("\n🧹 --- NETTOYAGE PAR BLOCS --- 🧹")
+    vues_lignes = EnsembleCles()
+    vues_id = EnsembleCles()
+    suppressions = {}
+    nb_lus = 0
+    nb_ecrits = 0
+    nb_aberrantes = 0
+    export = ExportBlocs(chemin_parquet, chemin_csv)
+
+    # dtype=str : les doublons sont comparés sur le texte brut, quel que soit le bloc
+    lecteur = pd.read_csv(nom_fichier, dtype=str, chunksize=taille_bloc)
+    for bloc in lecteur:
+        nb_lus += len(bloc)
+        with etape('doublons', lignes=len(bloc)) as mesure:
+            doublons, doublons_id = marquer_doublons_bloc(bloc, vues_lignes, vues_id)
+            mesure.lignes_sortie = int((~(doublons | doublons_id)).sum())
+        suppressions['doublons'] = suppressions.get('doublons', 0) + int(doublons.sum())
+        suppressions['doublons_id'] = suppressions.get('doublons_id', 0) + int(doublons_id.sum())
+
+        bloc, suppr_bloc = appliquer_regles_lignes(bloc[~(doublons | doublons_id)], index_quartiers)
+        for cle, nb in suppr_bloc.items():
+            suppressions[cle] = suppressions.get(cle, 0) + nb
+        with etape('enrichissement', lignes=len(bloc)) as mesure:
+            bloc, nb = ajouter_colonnes_derivees(bloc)
+            mesure.lignes_sortie = len(bloc)
+        nb_aberrantes += nb
+
+        with etape('export', lignes=len(bloc)):
+            export.ecrire(bloc)
+        nb_ecrits += len(bloc)
+    export.fermer()
+
+    afficher_suppressions(suppressions)
+    if nb_aberrantes:
+        print(f"⚠️ Attention : {nb_aberrantes} valeurs négatives détectées dans le groupe.")
+    print(f"Assignation finale : {nb_ecrits} lignes (Total supprimé : {nb_lus - nb_ecrits})")
+    print(f"✅ Fichier nettoyé exporté vers : {chemin_parquet}")
+    if chemin_csv:
+        print(f"✅ Copie CSV exportée vers : {chemin_csv}")
+    return nb_ecrits
+
+# --- Mode incrémental (seulement les nouveaux rapports) ---
+
+ETAT_FICHIER = "_etat.npz"
+
+def charger_etat(chemin):
+    """Charge l'état persistant du mode incrémental (ou un état vide)."""
+    etat = {
+        'lignes': EnsembleCles(),
+        'id': EnsembleCles(),
+        'watermark': None,
+        'nb_lignes': 0,
+        'nb_parts': 0,
+        'avant': {'n': 0, 'compteurs': {}},
+        'apres': {'n': 0, 'compteurs': {}},
+    }
+    if os.path.exists(chemin):
+        with np.load(chemin) as fichier:
+            etat['lignes'].ajouter(fichier['lignes'])
+            etat['id'].ajouter(fichier['id'])
+            etat.update(json.loads(str(fichier['meta'])))
+    return etat
+
+def sauver_etat(chemin, etat):
+    """Écrit l'état de façon atomique (fichier temporaire puis renommage)."""
+    meta = {cle: etat[cle] for cle in ('watermark', 'nb_lignes', 'nb_parts', 'avant', 'apres')}
+    tmp = chemin + ".tmp.npz"
+    np.savez(tmp, lignes=etat['lignes'].tableau(), id=etat['id'].tableau(), meta=np.array(json.dumps(meta)))
+    os.replace(tmp, chemin)
+
+def _cumuler(audit, compteurs, n):
+    """Ajoute les compteurs d'un bloc aux compteurs cumulés."""
+    audit['n'] += n
+    for indicateur, valeur in compteurs.items():
+        audit['compteurs'][indicateur] = audit['compteurs'].get(indicateur, 0) + valeur
+
+def nettoyer_incremental(nom_fichier, dossier_store, taille_bloc=100_000, index_quartiers=None):
+    """Ne nettoie que les rapports absents des exécutions précédentes.
+
+    L'export cumulatif est supposé en ajout seul : les nb_lignes premières lignes
+    ont déjà été traitées et sont ignorées avant tout parsing (on vérifie tout de
+    même leur hash). Les nouvelles lignes sont dédoublonnées contre l'historique
+    (lignes et File Number), nettoyées, enrichies puis ajoutées au store Parquet
+    dans un nouveau fichier part-NNNNN.parquet. Les compteurs d'audit sont cumulés
+    dans l'état pour ne jamais recalculer tout l'historique.
+    """
+    import pyarrow.parquet as pq
+
+    print("\n🧹 --- NETTOYAGE INCRÉMENTAL --- 🧹")
+    os.makedirs(dossier_store, exist_ok=True)
+    chemin_etat = os.path.join(dossier_store, ETAT_FICHIER)
+    etat = charger_etat(chemin_etat)
+    watermark = pd.Timestamp(etat['watermark']) if etat['watermark'] else None
+
+    suppressions = {}
+    nb_lus = nb_anciens = nb_modifies = nb_ecrits = nb_retard = 0
+    chemin_part = os.path.join(dossier_store, f"part-{etat['nb_parts']:05d}.parquet")
+    writer = None
+    cubes = []
+
+    lecteur = pd.read_csv(nom_fichier, dtype=str, chunksize=taille_bloc)
+    for bloc in lecteur:
+        # Les lignes déjà traitées : position dans la partie déjà lue et hash connu
+        with etape('historique', lignes=len(bloc)) as mesure:
+            positions = nb_lus + np.arange(len(bloc))
+            nb_lus += len(bloc)
+            dans_historique = positions < etat['nb_lignes']
+            cles_lignes = pd.util.hash_pandas_object(bloc[dans_historique], index=False).to_numpy()
+            connus = etat['lignes'].contient(cles_lignes)
+            anciens = np.zeros(len(bloc), dtype=bool)
+            anciens[dans_historique] = connus
+            nb_anciens += int(connus.sum())
+            nb_modifies += int((~connus).sum())
+            bloc = bloc[~anciens]
+            mesure.lignes_sortie = len(bloc)
+        if bloc.empty:
+            continue
+
+        # Audit avant nettoyage : seuls les compteurs du delta sont calculés
+        with etape('doublons', lignes=len(bloc)) as mesure:
+            doublons, doublons_id = marquer_doublons_bloc(bloc, etat['lignes'], etat['id'])
+            mesure.lignes_sortie = int((~(doublons | doublons_id)).sum())
+        with etape('audit_avant', lignes=len(bloc)):
+            verification = Verification(bloc)
+            _cumuler(etat['avant'], compteurs_avant_bloc(bloc, doublons, doublons_id, verification), len(bloc))
+        suppressions['doublons'] = suppressions.get('doublons', 0) + int(doublons.sum())
+        suppressions['doublons_id'] = suppressions.get('doublons_id', 0) + int(doublons_id.sum())
+
+        # Les masques de l'audit servent au nettoyage des lignes restantes
+        garder = ~(doublons | doublons_id)
+        bloc = bloc[garder]
+        bloc, suppr_bloc = appliquer_regles_lignes(bloc, index_quartiers, verification.restreindre(garder, bloc))
+        for cle, nb in suppr_bloc.items():
+            suppressions[cle] = suppressions.get(cle, 0) + nb
+        with etape('enrichissement', lignes=len(bloc)) as mesure:
+            bloc, _ = ajouter_colonnes_derivees(bloc)
+            mesure.lignes_sortie = len(bloc)
+
+        # Audit après nettoyage : le store ne contient ni doublon ni ID répété,
+        # les compteurs du bloc s'additionnent donc directement
+        with etape('audit_apres', lignes=len(bloc)):
+            _cumuler(etat['apres'], compter_indicateurs(bloc), len(bloc))
+
+        if 'Date of Report' in bloc.columns and not bloc.empty:
+            if watermark is not None:
+                nb_retard += int((bloc['Date of Report'] <= watermark).sum())
+            max_bloc = bloc['Date of Report'].max()
+            if etat['watermark'] is None or max_bloc > pd.Timestamp(etat['watermark']):
+                etat['watermark'] = max_bloc.isoformat()
+
+        with etape('export', lignes=len(bloc)):
+            table = vers_table_arrow(bloc)
+            if writer is None:
+                writer = pq.ParquetWriter(chemin_part, table.schema)
+            writer.write_table(table)
+            cubes.append(construire_cube(bloc))
+        nb_ecrits += len(bloc)
+
+    if writer is not None:
+        writer.close()
+        etat['nb_parts'] += 1
+        # Le cube est additif : cube existant + cube du delta
+        fichier_cube = chemin_cube(dossier_store)
+        cube_existant = pd.read_parquet(fichier_cube) if os.path.exists(fichier_cube) else None
+        exporter_cube(fusionner_cubes([cube_existant] + cubes), fichier_cube)
+    etat['nb_lignes'] = max(etat['nb_lignes'], nb_lus)
+    sauver_etat(chemin_etat, etat)
+
+    print(f"Lignes lues : {nb_lus} (déjà traitées : {nb_anciens}, nouvelles : {nb_lus - nb_anciens})")
+    if nb_modifies:
+        print(f"⚠️ {nb_modifies} lignes déjà lues ont changé : l'export n'est pas en ajout seul, elles sont retraitées")
+    afficher_suppressions(suppressions)
+    if nb_retard:
+        print(f"⚠️ {nb_retard} nouveaux rapports sont antérieurs au watermark précédent ({watermark})")
+    print(f"Ajoutées au store : {nb_ecrits} lignes -> {dossier_store}")
+    print(f"Watermark [Date of Report] : {etat['watermark']}")
+    return etat
+
+def audit_depuis_etat(etat, cle):
+    """Pourcentages d'audit de tout l'historique, à partir des compteurs cumulés."""
+    audit = etat[cle]
+    if audit['n'] == 0:
+        return {}
+    return pourcentages(audit['compteurs'], audit['n'])
+
+def executer_audit(args):
+    """Sous-commande audit (voir crime.py) : indicateurs de qualité du fichier brut, sans nettoyage."""
+    nom_fichier = args.entree or entree_par_defaut()
+    if not os.path.exists(nom_fichier):
+        print(f"❌ Erreur : Le fichier '{nom_fichier}' est introuvable.")
+        return 1
+    resultat = {"fichier": nom_fichier}
+    if args.approx:
+        # Lecture en flux, mémoire bornée : esquisses + échantillon (voir audit_approx.py)
+        import audit_approx
+
+        stats, erreurs, nb_lignes = instrumenter('audit', audit_approx.auditer_approx, nom_fichier,
+                                                 taille_echantillon=args.echantillon)
+        print(f"✅ Lecture en flux : {nom_fichier} ({nb_lignes} lignes, "
+              f"échantillon de {min(nb_lignes, args.echantillon)} lignes)")
+        afficher_audit(stats, erreurs)
+        resultat.update(lignes=nb_lignes, mode="approx", indicateurs=stats, erreurs_95=erreurs)
+    else:
+        lecture = lire_csv_compact if args.compact else partial(pd.read_csv, low_memory=False)
+        data = instrumenter('chargement', lecture, nom_fichier)
+        print(f"✅ Chargement réussi : {nom_fichier} ({len(data)} lignes)")
+        stats = instrumenter('audit', auditer_qualite, data)
+        resultat.update(lignes=len(data), indicateurs=stats.to_dict())
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            json.dump(resultat, f, ensure_ascii=False, indent=2)
+        print(f"✅ Audit exporté vers : {args.sortie}")
+    return 0
+
+def comparer_audits(stats_avant, stats_apres):
+    """Tableau de monitoring : indicateurs avant / après et évolutions significatives."""
+    print("\n📈 --- MONITORING DE LA QUALITÉ (AVANT vs APRÈS) --- 📈")
+    comparison = pd.DataFrame({
+        'Avant (%)': stats_avant,
+        'Après (%)': stats_apres
+    })
+    comparison['Evolution'] = comparison['Après (%)'] - comparison['Avant (%)']
+    
+    # On ajuste l'affichage
+    pd.set_option('display.float_format', '{:.2f}'.format)
+    print(comparison)
+    
+    print("\n--- Évolutions Significatives (> 1%) ---")
+    sig_changes = comparison[comparison['Evolution'].abs() > 1.0]
+    if not sig_changes.empty:
+        print(sig_changes[['Avant (%)', 'Après (%)', 'Evolution']])
+    else:
+        print("Aucune évolution majeure détectée.")
+    return comparison
+
+def exporter_audit(chemin, nom_fichier, lignes_avant, lignes_apres, stats_avant, stats_apres):
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump({"fichier": nom_fichier, "lignes_avant": lignes_avant, "lignes_apres": lignes_apres,
+                   "avant": stats_avant.to_dict(), "apres": stats_apres.to_dict()},
+                  f, ensure_ascii=False, indent=2)
+
+def executer_nettoyage(args):
+    """Sous-commande clean (voir crime.py) : audit, nettoyage, enrichissement et export."""
+    # Export par défaut dans le même dossier que le script (voir chemins.py)
+    output_path = args.sortie or PARQUET_FILE
+    csv_path = None
+    if args.csv is not None:
+        csv_path = args.csv or CSV_FILE
+    index_quartiers = None
+    if args.quartiers_geo or args.adresses:
+        index_quartiers = charger_index_quartiers(chemin_adresses=args.adresses)
+
+    if args.incremental:
+        nom_fichier = args.entree or entree_par_defaut()
+        dossier_store = args.sortie or STORE_DIR
+        if not os.path.exists(nom_fichier):
+            print(f"❌ Erreur : Le fichier '{nom_fichier}' est introuvable.")
+        else:
+            with etape('nettoyage_incremental'):
+                etat = nettoyer_incremental(nom_fichier, dossier_store, taille_bloc=args.blocs or 100_000,
+                                            index_quartiers=index_quartiers)
+            print("\n--- AVANT NETTOYAGE (historique cumulé) ---")
+            afficher_audit(audit_depuis_etat(etat, 'avant'))
+            print("\n--- APRÈS NETTOYAGE (historique cumulé) ---")
+            afficher_audit(audit_depuis_etat(etat, 'apres'))
+            return 0
+        return 1
+
+    if args.pipeline:
+        nom_fichier = args.entree or entree_par_defaut()
+        if not os.path.exists(nom_fichier):
+            print(f"❌ Erreur : Le fichier '{nom_fichier}' est introuvable.")
+            return 1
+        # Lecture, audits, nettoyage et écriture en parallèle (voir pipeline_flux.py)
+        import pipeline_flux
+
+        with etape('nettoyage_pipeline'):
+            resultat = pipeline_flux.nettoyer_en_pipeline(
+                nom_fichier, output_path, taille_bloc=args.blocs or 100_000, chemin_csv=csv_path,
+                index_quartiers=index_quartiers, workers=args.workers, profondeur=args.profondeur)
+        print("\n--- AVANT NETTOYAGE ---")
+        stats_avant = afficher_audit(resultat['avant'])
+        print("\n--- APRÈS NETTOYAGE ---")
+        stats_apres = afficher_audit(resultat['apres'])
+        comparer_audits(stats_avant, stats_apres)
+        if args.audit:
+            exporter_audit(args.audit, nom_fichier, resultat['lignes_avant'], resultat['lignes_apres'],
+                           stats_avant, stats_apres)
+        return 0
+
+    if args.blocs:
+        nom_fichier = args.entree or entree_par_defaut()
+        if not os.path.exists(nom_fichier):
+            print(f"❌ Erreur : Le fichier '{nom_fichier}' est introuvable.")
+        else:
+            with etape('nettoyage_par_blocs'):
+                nettoyer_donnees_par_blocs(nom_fichier, output_path, taille_bloc=args.blocs, chemin_csv=csv_path,
+                                           index_quartiers=index_quartiers)
+            return 0
+        return 1
+
     # 0. Afficher le dictionnaire des données
     afficher_dictionnaire()
 
     # 1. Charger et analyser les données
-    data = charger_donnees_crime()
-    
+    data = instrumenter('chargement', charger_donnees_crime, args.entree, compact=args.compact)
     if data is not None:
         # 2. Lancer l'audit complet (Avant nettoyage)
         print("\n--- AVANT NETTOYAGE ---")
-        stats_avant = auditer_qualite(data)
+        # (règles compilées une fois : le nettoyage réutilise les masques de l'audit)
+        verification = Verification(data)
+        stats_avant = instrumenter('audit_avant', auditer_qualite, data, verification)
         
         # 3. Nettoyer les données
-        data_clean = nettoyer_donnees(data)
+        data_clean = instrumenter('nettoyage', nettoyer_donnees, data, workers=args.workers,
+                                  index_quartiers=index_quartiers, quasi_doublons=args.quasi_doublons is not None,
+                                  rapport_quasi_doublons=args.quasi_doublons or None, verification=verification)
+        del verification
         
         # 4. Enrichir les données
-        data_enriched = enrichir_donnees(data_clean)
+        data_enriched = instrumenter('enrichissement', enrichir_donnees, data_clean)
         
         # 5. Audit final (Après nettoyage)
         print("\n--- APRÈS NETTOYAGE ---")
-        stats_apres = auditer_qualite(data_enriched)
+        stats_apres = instrumenter('audit_apres', auditer_qualite, data_enriched)
         
         # 6. Comparaison et Monitoring
-        print("\n📈 --- MONITORING DE LA QUALITÉ (AVANT vs APRÈS) --- 📈")
-        comparison = pd.DataFrame({
-            'Avant (%)': stats_avant,
-            'Après (%)': stats_apres
-        })
-        comparison['Evolution'] = comparison['Après (%)'] - comparison['Avant (%)']
-        
-        # On ajuste l'affichage
-        pd.set_option('display.float_format', '{:.2f}'.format)
-        print(comparison)
-        
-        print("\n--- Évolutions Significatives (> 1%) ---")
-        sig_changes = comparison[comparison['Evolution'].abs() > 1.0]
-        if not sig_changes.empty:
-            print(sig_changes[['Avant (%)', 'Après (%)', 'Evolution']])
-        else:
-            print("Aucune évolution majeure détectée.")
+        comparer_audits(stats_avant, stats_apres)
+        if args.audit:
+            exporter_audit(args.audit, args.entree or entree_par_defaut(), len(data), len(data_enriched),
+                           stats_avant, stats_apres)
 
         # 7. Export
-        # Export dans le même dossier que le script (tp1-crime/tp1-crime/)
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        output_file = "crime_reports_clean.csv"
-        output_path = os.path.join(base_dir, output_file)
-        
-        data_enriched.to_csv(output_path, index=False)
-        print(f"\n✅ Fichier nettoyé exporté vers : {output_path}")
\ No newline at end of file
+        with etape('export', lignes=len(data_enriched)):
+            exporter_parquet(data_enriched, output_path)
+            print(f"\n✅ Fichier nettoyé exporté vers : {output_path}")
+            exporter_cube(construire_cube(data_enriched), chemin_cube(output_path))
+            if csv_path:
+                decompacter_donnees(data_enriched).to_csv(csv_path, index=False, date_format=FMT_EXPORT)
+                print(f"✅ Copie CSV exportée vers : {csv_path}")
+    return 0 if data is not None else 1
+
+if __name__ == "__main__":
+    import sys
+
+    import crime
+
+    # Compatibilité : mêmes options que « python crime.py clean »
+    sys.exit(crime.principal(["clean", *sys.argv[1:]]))
@@ -1,159 +1,409 @@
-import pandas as pd
-import geopandas as gpd
-import matplotlib.pyplot as plt
-import os
-
-# Configuration
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CSV_FILE = os.path.join(BASE_DIR, "crime_reports_clean.csv")
-GEOJSON_FILE = os.path.join(BASE_DIR, "BOUNDARY_CDDNeighborhoods.geojson")
-OUTPUT_MAP = os.path.join(BASE_DIR, "map.html")
-
-def generer_carte():
-    print("🗺️ --- GÉNÉRATION DE LA CARTE --- 🗺️")
-    
-    # 1. Chargement des données
-    if not os.path.exists(CSV_FILE):
-        print(f"❌ Erreur : Fichier CSV introuvable : {CSV_FILE}")
-        return
-    if not os.path.exists(GEOJSON_FILE):
-        print(f"❌ Erreur : Fichier GeoJSON introuvable : {GEOJSON_FILE}")
-        return
-        
-    df = pd.read_csv(CSV_FILE)
-    print(f"Données chargées : {len(df)} crimes")
-    
-    gdf = gpd.read_file(GEOJSON_FILE)
-    print(f"Quartiers chargés : {len(gdf)}")
-    print(f"Colonnes GeoJSON : {gdf.columns.tolist()}")
-    
-    # 2. Agrégation par quartier
-    # On compte le nombre d'occurrences par quartier
-    # La colonne dans le CSV est 'Neighborhood'
-    crimes_by_neighborhood = df['Neighborhood'].value_counts().reset_index()
-    crimes_by_neighborhood.columns = ['Neighborhood', 'Crime_Count']
-    
-    print("\n--- Top 3 Quartiers (Crimes) ---")
-    print(crimes_by_neighborhood.head(3))
-    
-    # Vérification somme
-    total_aggregated = crimes_by_neighborhood['Crime_Count'].sum()
-    print(f"Total crimes agrégés : {total_aggregated} (sur {len(df)} lignes)")
-    
-    # 3. Jointure
-    # On doit trouver la colonne commune. 
-    # SOUVENT dans ce fichier c'est 'NAME' ou 'Name' ou 'SV_NEIGHBORHOOD'
-    # On va essayer de détecter automatiquement ou utiliser une convention.
-    # Pour Cambridge, c'est souvent 'NAME'.
-    
-    geo_col = None
-    possible_cols = ['NAME', 'Name', 'neighborhood', 'NEIGHBORHOOD']
-    for col in possible_cols:
-        if col in gdf.columns:
-            geo_col = col
-            break
-            
-    if not geo_col:
-        print("❌ Impossible de trouver la colonne de nom de quartier dans le GeoJSON.")
-        # Fallback sur la première colonne texte ou objet
-        return
-
-    print(f"Jointure sur la colonne GeoJSON : {geo_col}")
-    
-    # On uniformise pour la jointure (maj/min)
-    # df['Neighborhood'] est souvent en Title Case ou Upper.
-    # On tente une jointure directe d'abord.
-    
-    # Jointure
-    gdf_joined = gdf.merge(crimes_by_neighborhood, left_on=geo_col, right_on='Neighborhood', how='left')
-    
-    # Remplir les NaN par 0 (quartiers sans crimes)
-    gdf_joined['Crime_Count'] = gdf_joined['Crime_Count'].fillna(0)
-    
-    # Vérification orphelins
-    orphans = gdf_joined[gdf_joined['Crime_Count'] == 0]
-    if not orphans.empty:
-        print(f"⚠️ Quartiers sans crimes correspondants (0 crimes): {orphans[geo_col].tolist()}")
-    else:
-        print("✅ Tous les quartiers ont des crimes associés.")
-        
-    # 4. Carte Choroplèthe (Interactive avec folium/explore)
-    # geopandas.explore() nécessite folium et mapclassify
-    try:
-        m = gdf_joined.explore(
-            column="Crime_Count", # Colonne à colorier
-            tooltip=[geo_col, "Crime_Count"], # Info-bulle
-            scheme="naturalbreaks", # Ou quantiles
-            k=5,
-            cmap="RdYlGn_r", # Rouge à Vert (renversé car Rouge = Danger ?) non, RdYlGn_r c'est Vert(High) -> Rouge(Low) ? 
-                             # RdYlGn : Rouge(Low) -> Vert(High). On veut Vert(Low crime) -> Rouge(High Crime).
-                             # Donc "RdYlGn_r" (Red-Yellow-Green reversed) : Vert -> Rouge.
-            legend=True,
-            tiles="CartoDB positron"
-        )
-        
-        m.save(OUTPUT_MAP)
-        print(f"\n✅ Carte interactive générée : {OUTPUT_MAP}")
-        
-        print("🌍 Ouverture automatique dans le navigateur...")
-        # Détection environnement (WSL ou Autre)
-        try:
-            with open('/proc/version', 'r') as f:
-                is_wsl = 'microsoft' in f.read().lower()
-        except:
-            is_wsl = False
-
-        if is_wsl:
-            # Sur WSL, il faut convertir le chemin Linux en chemin Windows pour explorer.exe
-            import subprocess
-            try:
-                # On utilise wslpath -w pour obtenir le chemin Windows (ex: C:\Users\...)
-                result = subprocess.run(['wslpath', '-w', OUTPUT_MAP], capture_output=True, text=True)
-                if result.returncode == 0:
-                    windows_path = result.stdout.strip()
-                    print(f"Chemin Windows détecté : {windows_path}")
-                    
-                    # Méthode 1 : wslview (si installé)
-                    # if shutil.which("wslview"):
-                    #     os.system(f"wslview '{OUTPUT_MAP}'")
-                    #     return
-
-                    # Méthode 2 : cmd.exe /C start (plus robuste pour les accents et associations)
-                    # Le premier "" est pour le titre de la fenêtre (bizarrerie de start)
-                    print("Tentative ouverture via cmd.exe start...")
-                    # On double-escape les backslashes pour python, mais ici f-string c'est ok.
-                    # Attention aux caractères spéciaux.
-                    import shlex
-                    # escaping pour shell linux qui appelle cmd.exe... c'est complexe.
-                    # On va faire simple : appel direct via subprocess sans shell=True si possible, 
-                    # mais on appelle un exe windows depuis linux.
-                    
-                    # On tente os.system avec quotes.
-                    cmd = f'cmd.exe /C start "" "{windows_path}"'
-                    ret = os.system(cmd)
-                    
-                    if ret != 0:
-                        print("⚠️ 'start' a échoué, tentative via explorer.exe...")
-                        os.system(f'explorer.exe "{windows_path}"')
-                        
-                else:
-                    print(f"⚠️ Échec de wslpath : {result.stderr}")
-                    folder = os.path.dirname(OUTPUT_MAP)
-                    os.system(f'explorer.exe "{folder}"')
-            except Exception as wsl_e:
-                 print(f"⚠️ Erreur lors de l'ouverture WSL : {wsl_e}")
-        else:
-            import webbrowser
-            webbrowser.open('file://' + os.path.realpath(OUTPUT_MAP))
-
-    except Exception as e:
-        print(f"❌ Erreur lors de la génération de la carte interactive : {e}")
-        print("Tentative de carte statique (matplotlib)...")
-        fig, ax = plt.subplots(1, 1, figsize=(10, 10))
-        gdf_joined.plot(column='Crime_Count', ax=ax, legend=True, cmap='OrRd')
-        plt.title("Crimes par Quartier - Cambridge")
-        plt.savefig(os.path.join(BASE_DIR, "map.png"))
-        print("Carte statique sauvegardée : map.png")
-
-if __name__ == "__main__":
-    generer_carte()
+import pandas as pd
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from chemins import CSV_FILE, GEOJSON_FILE, OUTPUT_MAP, PARQUET_FILE, chemin_donnees_propres
+from cube_crime import MESURE, charger_cube, chemin_cube, compter_par_quartier, construire_cube, decrire_filtres
+from jointure_spatiale import NOMS_RAPPORTS
+from instrumentation import etape
+
+DATE_COLUMNS = ['Date of Report', 'crime_start', 'crime_end']
+
+# Colonnes nécessaires pour reconstruire le cube si le fichier de cube est absent
+CUBE_COLUMNS = ['Neighborhood', 'Crime', 'reporting_area_group', 'crime_start']
+
+def charger_crimes(colonnes=None, chemin=None):
+    """Charge les données nettoyées en ne lisant que les colonnes demandées.
+
+    Le Parquet (fichier ou dossier du store incrémental) est lu par projection
+    de colonnes et memory-mapping (dates et catégories conservées) ; le CSV
+    n'est qu'une solution de repli.
+    """
+    chemin = chemin or chemin_donnees_propres()
+    if os.path.isdir(chemin) or chemin.endswith(".parquet"):
+        return pd.read_parquet(chemin, columns=colonnes, memory_map=True)
+    dates = [c for c in DATE_COLUMNS if colonnes is None or c in colonnes]
+    return pd.read_csv(chemin, usecols=colonnes, parse_dates=dates)
+
+# Tolérance de simplification des polygones (en degrés, ~10 m) pour le rendu par lot
+TOLERANCE_LOT = 0.0001
+
+def trouver_colonne_nom(gdf):
+    """Colonne du GeoJSON contenant le nom du quartier (None si introuvable)."""
+    # On doit trouver la colonne commune. 
+    # SOUVENT dans ce fichier c'est 'NAME' ou 'Name' ou 'SV_NEIGHBORHOOD'
+    # On va essayer de détecter automatiquement ou utiliser une convention.
+    # Pour Cambridge, c'est souvent 'NAME'.
+    possible_cols = ['NAME', 'Name', 'neighborhood', 'NEIGHBORHOOD']
+    for col in possible_cols:
+        if col in gdf.columns:
+            return col
+    return None
+
+def joindre_comptes(gdf, geo_col, crimes_by_neighborhood):
+    """Jointure des comptes par quartier sur les polygones (0 pour les quartiers sans crime)."""
+    # Les rapports n'utilisent pas toujours le nom officiel du GeoJSON (The Port -> Area 4...)
+    noms_rapports = gdf[geo_col].map(lambda nom: NOMS_RAPPORTS.get(nom, nom))
+    gdf_joined = gdf.merge(crimes_by_neighborhood, left_on=noms_rapports, right_on='Neighborhood', how='left')
+    
+    # Remplir les NaN par 0 (quartiers sans crimes)
+    gdf_joined['Crime_Count'] = gdf_joined['Crime_Count'].fillna(0)
+    return gdf_joined
+
+def carte_interactive(gdf_joined, geo_col):
+    """Carte choroplèthe interactive (folium via explore)."""
+    # geopandas.explore() nécessite folium et mapclassify
+    # naturalbreaks a besoin d'au moins autant de valeurs distinctes que de classes
+    nb_valeurs = gdf_joined['Crime_Count'].nunique()
+    return gdf_joined.explore(
+        column="Crime_Count", # Colonne à colorier
+        tooltip=[geo_col, "Crime_Count"], # Info-bulle
+        scheme="naturalbreaks" if nb_valeurs > 5 else None, # Ou quantiles
+        k=5,
+        cmap="RdYlGn_r", # Rouge à Vert (renversé car Rouge = Danger ?) non, RdYlGn_r c'est Vert(High) -> Rouge(Low) ? 
+                         # RdYlGn : Rouge(Low) -> Vert(High). On veut Vert(Low crime) -> Rouge(High Crime).
+                         # Donc "RdYlGn_r" (Red-Yellow-Green reversed) : Vert -> Rouge.
+        legend=True,
+        tiles="CartoDB positron"
+    )
+
+def carte_statique(gdf_joined, titre, sortie_png):
+    """Carte choroplèthe statique (matplotlib)."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(1, 1, figsize=(10, 10))
+    gdf_joined.plot(column='Crime_Count', ax=ax, legend=True, cmap='OrRd')
+    ax.set_title(f"Crimes par Quartier - Cambridge\n{titre}")
+    fig.savefig(sortie_png)
+    plt.close(fig)
+
+def ouvrir_carte(sortie):
+    """Ouvre la carte HTML dans le navigateur (WSL ou autre)."""
+    print("🌍 Ouverture automatique dans le navigateur...")
+    # Détection environnement (WSL ou Autre)
+    try:
+        with open('/proc/version', 'r') as f:
+            is_wsl = 'microsoft' in f.read().lower()
+    except:
+        is_wsl = False
+
+    if is_wsl:
+        # Sur WSL, il faut convertir le chemin Linux en chemin Windows pour explorer.exe
+        import subprocess
+        try:
+            # On utilise wslpath -w pour obtenir le chemin Windows (ex: C:\Users\...)
+            result = subprocess.run(['wslpath', '-w', sortie], capture_output=True, text=True)
+            if result.returncode == 0:
+                windows_path = result.stdout.strip()
+                print(f"Chemin Windows détecté : {windows_path}")
+                
+                # Méthode 1 : wslview (si installé)
+                # if shutil.which("wslview"):
+                #     os.system(f"wslview '{sortie}'")
+                #     return
+
+                # Méthode 2 : cmd.exe /C start (plus robuste pour les accents et associations)
+                # Le premier "" est pour le titre de la fenêtre (bizarrerie de start)
+                print("Tentative ouverture via cmd.exe start...")
+                # On double-escape les backslashes pour python, mais ici f-string c'est ok.
+                # Attention aux caractères spéciaux.
+                import shlex
+                # escaping pour shell linux qui appelle cmd.exe... c'est complexe.
+                # On va faire simple : appel direct via subprocess sans shell=True si possible, 
+                # mais on appelle un exe windows depuis linux.
+                
+                # On tente os.system avec quotes.
+                cmd = f'cmd.exe /C start "" "{windows_path}"'
+                ret = os.system(cmd)
+                
+                if ret != 0:
+                    print("⚠️ 'start' a échoué, tentative via explorer.exe...")
+                    os.system(f'explorer.exe "{windows_path}"')
+                    
+            else:
+                print(f"⚠️ Échec de wslpath : {result.stderr}")
+                folder = os.path.dirname(sortie)
+                os.system(f'explorer.exe "{folder}"')
+        except Exception as wsl_e:
+             print(f"⚠️ Erreur lors de l'ouverture WSL : {wsl_e}")
+    else:
+        import webbrowser
+        webbrowser.open('file://' + os.path.realpath(sortie))
+
+def charger_cube_crimes(chemin=None):
+    """Charge le cube pré-agrégé (ou le reconstruit depuis les données ligne à ligne)."""
+    chemin = chemin or chemin_donnees_propres()
+    if chemin is None:
+        print(f"❌ Erreur : Fichier de données nettoyées introuvable : {PARQUET_FILE} / {CSV_FILE}")
+        return None
+    # Le cube pré-agrégé évite de relire les données ligne à ligne
+    cube = charger_cube(chemin_cube(chemin))
+    if cube is None:
+        print("Cube absent : agrégation depuis les données ligne à ligne")
+        cube = construire_cube(charger_crimes(CUBE_COLUMNS, chemin))
+    if cube is None:
+        print("❌ Erreur : Colonnes manquantes pour agréger les crimes (relancer main.py)")
+    return cube
+
+def generer_carte(filtres=None, sortie=None, chemin=None, ouvrir=True):
+    """Génère la carte choroplèthe des crimes par quartier ; retourne le fichier écrit (None en cas d'erreur).
+
+    filtres : critères de cube_crime.filtrer_cube (crime, debut, fin, heures, groupes),
+    par exemple {'crime': 'Larceny from MV', 'debut': '2016-01-01', 'fin': '2016-12-31', 'heures': (20, 6)}.
+    chemin  : données nettoyées à lire (défaut : chemin_donnees_propres())
+    ouvrir  : ouvre la carte dans le navigateur
+    """
+    with etape('imports'):
+        import geopandas as gpd
+
+    filtres = filtres or {}
+    sortie = sortie or OUTPUT_MAP
+    print("🗺️ --- GÉNÉRATION DE LA CARTE --- 🗺️")
+    
+    # 1. Chargement des données
+    if not os.path.exists(GEOJSON_FILE):
+        print(f"❌ Erreur : Fichier GeoJSON introuvable : {GEOJSON_FILE}")
+        return
+    with etape('chargement') as mesure:
+        cube = charger_cube_crimes(chemin)
+        if cube is None:
+            return
+        total_crimes = cube[MESURE].sum()
+        print(f"Données chargées : {total_crimes} crimes ({len(cube)} cellules de cube)")
+
+        gdf = gpd.read_file(GEOJSON_FILE)
+        mesure.lignes_sortie = len(cube)
+    print(f"Quartiers chargés : {len(gdf)}")
+    print(f"Colonnes GeoJSON : {gdf.columns.tolist()}")
+    
+    # 2. Agrégation par quartier (sur le cube, avec les filtres éventuels)
+    titre = decrire_filtres(**filtres)
+    print(f"Filtre : {titre}")
+    with etape('agregation', lignes=len(cube)) as mesure:
+        crimes_by_neighborhood = compter_par_quartier(cube, **filtres)
+        mesure.lignes_sortie = len(crimes_by_neighborhood)
+    
+    print("\n--- Top 3 Quartiers (Crimes) ---")
+    print(crimes_by_neighborhood.head(3))
+    
+    # Vérification somme
+    total_aggregated = crimes_by_neighborhood['Crime_Count'].sum()
+    print(f"Total crimes agrégés : {total_aggregated} (sur {total_crimes} crimes)")
+    
+    # 3. Jointure
+    geo_col = trouver_colonne_nom(gdf)
+    if not geo_col:
+        print("❌ Impossible de trouver la colonne de nom de quartier dans le GeoJSON.")
+        # Fallback sur la première colonne texte ou objet
+        return
+
+    print(f"Jointure sur la colonne GeoJSON : {geo_col}")
+    with etape('jointure', lignes=len(crimes_by_neighborhood)) as mesure:
+        gdf_joined = joindre_comptes(gdf, geo_col, crimes_by_neighborhood)
+        mesure.lignes_sortie = len(gdf_joined)
+    
+    # Vérification orphelins
+    orphans = gdf_joined[gdf_joined['Crime_Count'] == 0]
+    if not orphans.empty:
+        print(f"⚠️ Quartiers sans crimes correspondants (0 crimes): {orphans[geo_col].tolist()}")
+    else:
+        print("✅ Tous les quartiers ont des crimes associés.")
+        
+    # 4. Carte Choroplèthe (Interactive avec folium/explore)
+    try:
+        with etape('rendu', lignes=len(gdf_joined)):
+            m = carte_interactive(gdf_joined, geo_col)
+            m.save(sortie)
+        print(f"\n✅ Carte interactive générée : {sortie}")
+        if ouvrir:
+            ouvrir_carte(sortie)
+        return sortie
+
+    except Exception as e:
+        print(f"❌ Erreur lors de la génération de la carte interactive : {e}")
+        print("Tentative de carte statique (matplotlib)...")
+        sortie_png = os.path.splitext(sortie)[0] + ".png"
+        with etape('rendu_statique', lignes=len(gdf_joined)):
+            carte_statique(gdf_joined, titre, sortie_png)
+        print(f"Carte statique sauvegardée : {sortie_png}")
+        return sortie_png
+
+# --- Rendu par lot (sans navigateur) ---
+
+# Données partagées par les workers : chargées une seule fois par processus
+_LOT = {}
+
+def _initialiser_lot(gdf, geo_col, cube):
+    import matplotlib.pyplot as plt
+
+    # Rendu sans affichage dans les workers
+    plt.switch_backend('Agg')
+    _LOT.update(gdf=gdf, geo_col=geo_col, cube=cube)
+
+def nom_carte(filtres):
+    """Nom de fichier (sans extension) dérivé d'un filtre : libellé lisible + empreinte.
+
+    Le libellé perd la ponctuation ('Larceny from MV' et 'Larceny-from-MV' donnent le
+    même) : les 8 caractères de hash du filtre d'origine distinguent les fichiers.
+    """
+    nom = decrire_filtres(**filtres)
+    lisible = "".join(c if c.isalnum() else "_" for c in nom).strip("_") or "tous"
+    cle = json.dumps(filtres, sort_keys=True, default=str, ensure_ascii=False)
+    return f"{lisible}_{hashlib.sha1(cle.encode('utf-8')).hexdigest()[:8]}"
+
+def _rendre_tranche(tache):
+    """Rend une carte (HTML et/ou PNG) pour un filtre ; retourne les fichiers écrits."""
+    filtres, dossier, formats = tache
+    comptes = compter_par_quartier(_LOT['cube'], **filtres)
+    gdf_joined = joindre_comptes(_LOT['gdf'], _LOT['geo_col'], comptes)
+    base = os.path.join(dossier, nom_carte(filtres))
+    fichiers = []
+    if 'html' in formats:
+        try:
+            carte_interactive(gdf_joined, _LOT['geo_col']).save(base + ".html")
+            fichiers.append(base + ".html")
+        except ImportError as e:
+            print(f"⚠️ HTML impossible ({e}), PNG uniquement")
+            formats = set(formats) | {'png'}
+    if 'png' in formats:
+        carte_statique(gdf_joined, decrire_filtres(**filtres), base + ".png")
+        fichiers.append(base + ".png")
+    return fichiers
+
+def tranches_par_crime_mois(cube):
+    """Un filtre par type de crime et par mois présents dans le cube."""
+    mois = cube['jour'].dt.to_period('M')
+    paires = pd.DataFrame({'crime': cube['Crime'].astype(str), 'mois': mois}).drop_duplicates()
+    return [
+        {'crime': crime, 'debut': str(m.start_time.date()), 'fin': str(m.end_time.date())}
+        for crime, m in sorted(paires.itertuples(index=False, name=None))
+    ]
+
+def generer_cartes_lot(liste_filtres, dossier, workers=1, formats=('html', 'png'), tolerance=TOLERANCE_LOT, chemin=None):
+    """Rend une carte par filtre dans `dossier`, sans ouvrir de navigateur.
+
+    Les polygones et le cube ne sont chargés qu'une fois ; les polygones sont
+    simplifiés une seule fois et réduits à la colonne de nom, ce qui allège
+    chaque fichier HTML. Avec workers > 1, le rendu se fait dans un pool de
+    processus qui reçoivent ces données à l'initialisation.
+    """
+    with etape('imports'):
+        import geopandas as gpd
+
+    print(f"🗺️ --- RENDU PAR LOT : {len(liste_filtres)} cartes --- 🗺️")
+    if not os.path.exists(GEOJSON_FILE):
+        print(f"❌ Erreur : Fichier GeoJSON introuvable : {GEOJSON_FILE}")
+        return []
+    with etape('chargement'):
+        cube = charger_cube_crimes(chemin)
+        if cube is None:
+            return []
+        gdf = gpd.read_file(GEOJSON_FILE)
+        geo_col = trouver_colonne_nom(gdf)
+        if not geo_col:
+            print("❌ Impossible de trouver la colonne de nom de quartier dans le GeoJSON.")
+            return []
+        gdf = gdf[[geo_col, 'geometry']].copy()
+        if tolerance:
+            gdf['geometry'] = gdf.geometry.simplify(tolerance, preserve_topology=True)
+
+    # Deux filtres du même nom s'écraseraient l'un l'autre : on refuse le lot
+    noms = [nom_carte(filtres) for filtres in liste_filtres]
+    en_double = sorted({nom for nom in noms if noms.count(nom) > 1})
+    if en_double:
+        print(f"❌ Erreur : filtres en double dans le lot ({', '.join(en_double)})")
+        return []
+
+    os.makedirs(dossier, exist_ok=True)
+    taches = [(filtres, dossier, tuple(formats)) for filtres in liste_filtres]
+    # Rendu dans les workers : seul le temps total du lot est mesuré
+    with etape('rendu_lot', lignes=len(taches)) as mesure:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_initialiser_lot,
+                                     initargs=(gdf, geo_col, cube)) as pool:
+                resultats = list(pool.map(_rendre_tranche, taches))
+        else:
+            _initialiser_lot(gdf, geo_col, cube)
+            resultats = [_rendre_tranche(tache) for tache in taches]
+        mesure.lignes_sortie = sum(len(r) for r in resultats)
+
+    fichiers = [f for r in resultats for f in r]
+    print(f"✅ {len(fichiers)} fichiers écrits dans {dossier}")
+    return fichiers
+
+def exporter_carte_web(dossier, liste_filtres=None, chemin=None):
+    """Export web (voir carte_web.py) : topologie des quartiers + un JSON de comptes par tranche.
+
+    liste_filtres : filtres du cube (défaut : tous les crimes, puis chaque crime par mois).
+    Retourne les fichiers écrits.
+    """
+    with etape('imports'):
+        import geopandas as gpd
+
+        import carte_web
+
+    print("🗺️ --- EXPORT WEB (TopoJSON + tranches) --- 🗺️")
+    if not os.path.exists(GEOJSON_FILE):
+        print(f"❌ Erreur : Fichier GeoJSON introuvable : {GEOJSON_FILE}")
+        return []
+    with etape('chargement'):
+        cube = charger_cube_crimes(chemin)
+        if cube is None:
+            return []
+        gdf = gpd.read_file(GEOJSON_FILE)
+        geo_col = trouver_colonne_nom(gdf)
+        if not geo_col:
+            print("❌ Impossible de trouver la colonne de nom de quartier dans le GeoJSON.")
+            return []
+    with etape('export_web', lignes=len(cube)) as mesure:
+        try:
+            fichiers = carte_web.exporter_web(gdf, geo_col, cube, dossier, liste_filtres)
+        except ValueError as e:
+            print(f"❌ Erreur : {e}")
+            return []
+        mesure.lignes_sortie = len(fichiers)
+
+    taille = sum(os.path.getsize(f) for f in fichiers[:3])
+    print(f"✅ {len(fichiers) - 3} tranches et la topologie écrites dans {dossier} "
+          f"(page + topologie + index : {taille / 1024:.1f} Ko)")
+    print(f"   Consultation : python -m http.server --directory {dossier}")
+    return fichiers
+
+def executer_carte(args, fichiers=None):
+    """Sous-commande map (voir crime.py) : carte filtrée ou rendu par lot.
+
+    fichiers : liste complétée par les fichiers écrits (mise en cache par crime.py)
+    """
+    fichiers = [] if fichiers is None else fichiers
+    if args.web:
+        liste_filtres = None
+        if args.tranches:
+            with open(args.tranches, encoding="utf-8") as f:
+                liste_filtres = json.load(f)
+        fichiers.extend(exporter_carte_web(args.web, liste_filtres, chemin=args.donnees))
+        return 0 if fichiers else 1
+    if args.lot:
+        if args.tranches:
+            with open(args.tranches, encoding="utf-8") as f:
+                liste_filtres = json.load(f)
+        else:
+            cube = charger_cube_crimes(args.donnees)
+            liste_filtres = tranches_par_crime_mois(cube) if cube is not None else []
+        fichiers.extend(generer_cartes_lot(liste_filtres, args.lot, workers=args.workers, formats=args.formats,
+                                           chemin=args.donnees))
+        return 0 if fichiers or not liste_filtres else 1
+    filtres = {cle: getattr(args, cle) for cle in ('crime', 'debut', 'fin', 'heures') if getattr(args, cle) is not None}
+    sortie = generer_carte(filtres, args.sortie, chemin=args.donnees, ouvrir=args.ouvrir)
+    if sortie:
+        fichiers.append(sortie)
+    return 0 if sortie else 1
+
+if __name__ == "__main__":
+    import sys
+
+    import crime
+
+    # Compatibilité : mêmes options que « python crime.py map », carte ouverte dans le navigateur
+    sys.exit(crime.principal(["map", "--ouvrir", *sys.argv[1:]]))
@@ -0,0 +1,244 @@
+"""Nettoyage par blocs en pipeline (crime.py clean --pipeline).
+
+Lecture, dédoublonnage, audit avant, nettoyage + enrichissement, audit après et écriture
+tournent chacun dans un thread, reliés par des files bornées : pendant que le bloc n est
+écrit, le bloc n+1 est nettoyé et le bloc n+2 parsé. Le parsing CSV (pandas), les calculs
+NumPy et l'écriture Parquet (pyarrow) relâchent le GIL : le temps total tend vers celui de
+l'étage le plus lent plutôt que vers la somme des étages (s'il y a assez de cœurs).
+
+Contre-pression : un étage en avance se bloque dès que la file suivante est pleine, d'où
+au plus nb_etages x (profondeur + 1) blocs en mémoire, quelle que soit la taille du fichier.
+Chaque étage traite les blocs dans l'ordre : les sorties sont celles de --blocs.
+Avec --workers N, un seul pool de processus (contexte « spawn ») est créé avant les
+threads et sert à tous les blocs : aucun fork d'un processus déjà multi-threadé.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import instrumentation
+from instrumentation import etape
+from main import (EnsembleCles, ExportBlocs, Verification, _cumuler, afficher_suppressions,
+                  ajouter_colonnes_derivees, appliquer_regles_en_parallele, appliquer_regles_lignes,
+                  compter_indicateurs, compteurs_avant_bloc, marquer_doublons_bloc, pourcentages)
+
+# Blocs en attente entre deux étages
+PROFONDEUR = 2
+
+# Fin du flux, transmise d'étage en étage
+_FIN = object()
+
+def executer_pipeline(source, etages, profondeur=PROFONDEUR):
+    """Fait passer chaque élément de source par les étages [(nom, fonction)], dans l'ordre.
+
+    Un thread lit la source (étage « lecture »), un thread par étage applique sa fonction ;
+    ils sont reliés par des queue.Queue(maxsize=profondeur). La première exception d'un
+    étage arrête tout le pipeline et est relancée ici. Avec profondeur=0, les étages
+    s'exécutent en série dans le thread appelant (même travail, sans parallélisme).
+    Retourne, par étage : temps actif, temps CPU du thread, temps bloqué sur les files
+    et nombre de blocs.
+    """
+    bilan = {nom: {"actif_s": 0.0, "cpu_s": 0.0, "attente_s": 0.0, "blocs": 0}
+             for nom in ["lecture"] + [n for n, _ in etages]}
+
+    def chronometrer(stats, nom, fonction, *args):
+        debut, debut_cpu = time.perf_counter(), time.thread_time()
+        with etape(nom):
+            resultat = fonction(*args)
+        stats["actif_s"] += time.perf_counter() - debut
+        stats["cpu_s"] += time.thread_time() - debut_cpu
+        return resultat
+
+    if profondeur == 0:
+        elements = iter(source)
+        while (element := chronometrer(bilan["lecture"], "lecture", next, elements, _FIN)) is not _FIN:
+            bilan["lecture"]["blocs"] += 1
+            for nom, fonction in etages:
+                element = chronometrer(bilan[nom], nom, fonction, element)
+                bilan[nom]["blocs"] += 1
+        return bilan
+
+    arret = threading.Event()
+    erreurs = []
+    files = [queue.Queue(maxsize=profondeur) for _ in etages]
+    pile = instrumentation.pile_courante()
+
+    def mettre(file, element, stats):
+        debut = time.perf_counter()
+        while not arret.is_set():
+            try:
+                file.put(element, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stats["attente_s"] += time.perf_counter() - debut
+
+    def prendre(file, stats):
+        debut = time.perf_counter()
+        element = _FIN
+        while not arret.is_set():
+            try:
+                element = file.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        stats["attente_s"] += time.perf_counter() - debut
+        return element
+
+    def lire(sortie):
+        stats = bilan["lecture"]
+        elements = iter(source)
+        while not arret.is_set():
+            element = chronometrer(stats, "lecture", next, elements, _FIN)
+            if element is _FIN:
+                break
+            stats["blocs"] += 1
+            mettre(sortie, element, stats)
+        mettre(sortie, _FIN, stats)
+
+    def transformer(nom, fonction, entree, sortie):
+        stats = bilan[nom]
+        while (element := prendre(entree, stats)) is not _FIN:
+            resultat = chronometrer(stats, nom, fonction, element)
+            stats["blocs"] += 1
+            if sortie is not None:
+                mettre(sortie, resultat, stats)
+        if sortie is not None:
+            mettre(sortie, _FIN, stats)
+
+    def lancer(cible, *args):
+        try:
+            # Les mesures de l'étage sont rattachées à l'étape qui a lancé le pipeline
+            with instrumentation.sous_etape_de(pile):
+                cible(*args)
+        except BaseException as exc:
+            erreurs.append(exc)
+            arret.set()
+
+    threads = [threading.Thread(target=lancer, args=(lire, files[0]), name="lecture", daemon=True)]
+    for i, (nom, fonction) in enumerate(etages):
+        sortie = files[i + 1] if i + 1 < len(etages) else None
+        threads.append(threading.Thread(target=lancer, args=(transformer, nom, fonction, files[i], sortie),
+                                        name=nom, daemon=True))
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except BaseException:
+        # Interruption (Ctrl+C) : les étages s'arrêtent au prochain bloc
+        arret.set()
+        raise
+    if erreurs:
+        raise erreurs[0]
+    return bilan
+
+def afficher_bilan(bilan, secondes):
+    """Temps CPU et bloqué de chaque étage ; l'étage le plus coûteux borne le temps total.
+
+    Le temps actif (mur) d'un étage compte aussi les moments où d'autres threads
+    occupent le CPU : c'est le temps CPU du thread qui mesure son coût propre.
+    """
+    print(f"\n⏱️ Pipeline : {secondes:.2f}s (somme des étages : {sum(s['cpu_s'] for s in bilan.values()):.2f}s CPU)")
+    for nom, stats in bilan.items():
+        print(f"  {nom:<14} : {stats['cpu_s']:6.2f}s CPU, {stats['actif_s']:6.2f}s actif, "
+              f"{stats['attente_s']:6.2f}s en attente ({stats['blocs']} blocs)")
+    plus_lent = max(bilan, key=lambda nom: bilan[nom]["cpu_s"])
+    print(f"  Étage le plus lent : {plus_lent}")
+
+def nettoyer_en_pipeline(nom_fichier, chemin_parquet, taille_bloc=100_000, chemin_csv=None, index_quartiers=None,
+                         workers=1, profondeur=PROFONDEUR):
+    """Même résultat que nettoyer_donnees_par_blocs, étages en parallèle, avec les audits avant / après.
+
+    Les compteurs d'audit sont cumulés bloc par bloc (compteurs_avant_bloc, puis compteurs
+    du fichier nettoyé, sans doublon) : les indicateurs sont ceux du fichier entier.
+    Retourne les indicateurs avant / après (en %), les nombres de lignes et le bilan des étages.
+    """
+    print("\n🧹 --- NETTOYAGE EN PIPELINE --- 🧹")
+    vues_lignes = EnsembleCles()
+    vues_id = EnsembleCles()
+    suppressions_doublons = {'doublons': 0, 'doublons_id': 0}
+    suppressions_lignes = {}
+    audit_avant = {'n': 0, 'compteurs': {}}
+    audit_apres = {'n': 0, 'compteurs': {}}
+    nb_aberrantes = 0
+    export = ExportBlocs(chemin_parquet, chemin_csv)
+
+    # Chaque cumul n'est écrit que par le thread d'un seul étage (suppressions_doublons,
+    # audit_avant, suppressions_lignes et nb_aberrantes, audit_apres) : pas de verrou,
+    # les suppressions sont fusionnées une fois les threads terminés
+    def dedoublonner(bloc):
+        doublons, doublons_id = marquer_doublons_bloc(bloc, vues_lignes, vues_id)
+        suppressions_doublons['doublons'] += int(doublons.sum())
+        suppressions_doublons['doublons_id'] += int(doublons_id.sum())
+        return bloc, doublons, doublons_id
+
+    def auditer_avant(lot):
+        bloc, doublons, doublons_id = lot
+        verification = Verification(bloc)
+        _cumuler(audit_avant, compteurs_avant_bloc(bloc, doublons, doublons_id, verification), len(bloc))
+        # Les masques de l'audit passent à l'étage de nettoyage avec les lignes restantes
+        garder = ~(doublons | doublons_id)
+        restant = bloc[garder]
+        return restant, verification.restreindre(garder, restant)
+
+    def nettoyer(lot):
+        nonlocal nb_aberrantes
+        bloc, verification = lot
+        if workers > 1:
+            bloc, suppr_bloc = appliquer_regles_en_parallele(bloc, workers, index_quartiers, pool)
+        else:
+            bloc, suppr_bloc = appliquer_regles_lignes(bloc, index_quartiers, verification)
+        for cle, nb in suppr_bloc.items():
+            suppressions_lignes[cle] = suppressions_lignes.get(cle, 0) + nb
+        bloc, nb = ajouter_colonnes_derivees(bloc)
+        nb_aberrantes += nb
+        return bloc
+
+    def auditer_apres(bloc):
+        # Le fichier nettoyé ne contient ni doublon ni ID répété : les compteurs s'additionnent
+        _cumuler(audit_apres, compter_indicateurs(bloc), len(bloc))
+        return bloc
+
+    # dtype=str : les doublons sont comparés sur le texte brut, quel que soit le bloc
+    lecteur = pd.read_csv(nom_fichier, dtype=str, chunksize=taille_bloc)
+    pool = (ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            if workers > 1 else None)
+    termine = False
+    debut = time.perf_counter()
+    try:
+        bilan = executer_pipeline(lecteur, [
+            ("doublons", dedoublonner),
+            ("audit_avant", auditer_avant),
+            ("nettoyage", nettoyer),
+            ("audit_apres", auditer_apres),
+            ("export", export.ecrire),
+        ], profondeur=profondeur)
+        termine = True
+    finally:
+        lecteur.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        # Sur erreur, le Parquet est refermé sans écrire de cube partiel
+        export.fermer(complet=termine)
+    secondes = time.perf_counter() - debut
+
+    afficher_suppressions({**suppressions_doublons, **suppressions_lignes})
+    if nb_aberrantes:
+        print(f"⚠️ Attention : {nb_aberrantes} valeurs négatives détectées dans le groupe.")
+    print(f"Assignation finale : {audit_apres['n']} lignes (Total supprimé : {audit_avant['n'] - audit_apres['n']})")
+    print(f"✅ Fichier nettoyé exporté vers : {chemin_parquet}")
+    if chemin_csv:
+        print(f"✅ Copie CSV exportée vers : {chemin_csv}")
+    afficher_bilan(bilan, secondes)
+    return {
+        'avant': pourcentages(audit_avant['compteurs'], audit_avant['n']) if audit_avant['n'] else {},
+        'apres': pourcentages(audit_apres['compteurs'], audit_apres['n']) if audit_apres['n'] else {},
+        'lignes_avant': audit_avant['n'],
+        'lignes_apres': audit_apres['n'],
+        'bilan': bilan,
+    }
@@ -0,0 +1,144 @@
+"""Quasi-doublons : un même incident saisi plusieurs fois sous des File Number différents.
+
+Crime et Location sont normalisés (casse, ponctuation, abréviations de voies, ordre des
+rues d'un carrefour) sur leurs valeurs distinctes, par opérations vectorisées. Les
+rapports sont ensuite répartis en blocs Reporting Area et triés par type de crime
+normalisé puis début du crime : chaque rapport n'est comparé qu'à ses VOISINS suivants du
+même bloc et du même type (voisinage trié), soit O(n x VOISINS) comparaisons au lieu de
+O(n²). La fenêtre glisse sur le temps continu : deux rapports de part et d'autre de
+minuit restent voisins. Deux rapports sont des quasi-doublons si leurs débuts de crime sont à
+moins de TOLERANCE et leurs adresses normalisées identiques, ou proches (même numéro,
+similarité >= SIMILARITE_MIN). Les paires forment des groupes (composantes connexes) ;
+le premier rapport de chaque groupe est gardé, comme drop_duplicates.
+"""
+import difflib
+import re
+
+import numpy as np
+import pandas as pd
+
+VOISINS = 5
+TOLERANCE = pd.Timedelta(hours=2)
+SIMILARITE_MIN = 0.85
+
+# Abréviations USPS des types de voies (Location est en majuscules après normalisation)
+ABREVIATIONS = {
+    'AVENUE': 'AVE', 'STREET': 'ST', 'ROAD': 'RD', 'DRIVE': 'DR', 'PLACE': 'PL', 'SQUARE': 'SQ',
+    'BOULEVARD': 'BLVD', 'PARKWAY': 'PKWY', 'TERRACE': 'TER', 'COURT': 'CT', 'LANE': 'LN',
+    'HIGHWAY': 'HWY', 'CIRCLE': 'CIR', 'PARK': 'PK',
+}
+
+def _codes_normalises(serie, normaliser):
+    """Codes entiers par ligne (-1 pour les nuls) de la valeur normalisée.
+
+    La normalisation ne s'applique qu'aux valeurs distinctes (quelques milliers, même
+    pour des dizaines de millions de lignes), puis est reportée sur chaque ligne.
+    """
+    codes, uniques = pd.factorize(serie)
+    normalisees = normaliser(pd.Series(np.asarray(uniques, dtype=object), dtype=str))
+    codes_uniques, valeurs = pd.factorize(normalisees)
+    return np.append(codes_uniques, -1)[codes], np.asarray(valeurs, dtype=object)
+
+def normaliser_crime(serie):
+    """'LARCENY/THEFT', 'Larceny / Theft ' -> 'larceny theft'."""
+    serie = serie.str.lower().str.replace(r'[^a-z0-9]+', ' ', regex=True)
+    return serie.str.replace(r'\band\b', ' ', regex=True).str.split().str.join(' ')
+
+def normaliser_location(serie):
+    """'100 Harvard Street, Cambridge, MA' -> '100 HARVARD ST' ; 'B ST & A ST' -> 'A ST & B ST'."""
+    serie = serie.str.upper().str.replace(r',\s*CAMBRIDGE\s*,\s*MA\s*$', '', regex=True)
+    serie = serie.str.replace(r'[^A-Z0-9&]+', ' ', regex=True)
+    for mot, abreviation in ABREVIATIONS.items():
+        serie = serie.str.replace(rf'\b{mot}\b', abreviation, regex=True)
+    serie = serie.str.split().str.join(' ')
+    # Carrefour : les deux rues dans l'ordre alphabétique
+    rues = serie.str.partition(' & ')
+    inverser = (rues[2] != '') & (rues[0] > rues[2])
+    return serie.where(~inverser, rues[2] + ' & ' + rues[0])
+
+def _adresses_proches(a, b):
+    """Même numéro de voie et libellés presque identiques (faute de frappe)."""
+    if re.findall(r'\d+', a) != re.findall(r'\d+', b):
+        return False
+    return difflib.SequenceMatcher(None, a, b).ratio() >= SIMILARITE_MIN
+
+def _composantes(nb, gauche, droite):
+    """Étiquette de groupe de chaque ligne : plus petit indice de sa composante connexe."""
+    etiquettes = np.arange(nb)
+    while True:
+        minimum = np.minimum(etiquettes[gauche], etiquettes[droite])
+        suivantes = etiquettes.copy()
+        np.minimum.at(suivantes, gauche, minimum)
+        np.minimum.at(suivantes, droite, minimum)
+        # Saut de pointeurs : chaque ligne prend l'étiquette de son représentant
+        suivantes = suivantes[suivantes]
+        if np.array_equal(suivantes, etiquettes):
+            return etiquettes
+        etiquettes = suivantes
+
+def marquer_quasi_doublons(df, voisins=VOISINS, tolerance=TOLERANCE):
+    """Groupe de quasi-doublons de chaque ligne (-1 si aucun) et masque des lignes à supprimer.
+
+    df doit contenir crime_start, Reporting Area, Crime et Location (après les règles de
+    dates et de Reporting Area). Lignes sans date, zone, type ou adresse : jamais comparées.
+    """
+    nb = len(df)
+    crimes, _ = _codes_normalises(df['Crime'], normaliser_crime)
+    adresses, libelles = _codes_normalises(df['Location'], normaliser_location)
+    debut = df['crime_start'].to_numpy(dtype='datetime64[ns]')
+    zone = pd.to_numeric(df['Reporting Area'], errors='coerce').to_numpy(dtype=float)
+    comparables = (crimes >= 0) & (adresses >= 0) & ~np.isnat(debut) & ~np.isnan(zone)
+
+    # Blocs Reporting Area, puis type normalisé et début : les candidats sont contigus
+    lignes = np.flatnonzero(comparables)
+    minutes = debut[lignes].astype('datetime64[m]').astype(np.int64)
+    decalees = minutes - minutes.min(initial=0)
+    bloc = pd.factorize(zone[lignes])[0]
+    # Une seule clé entière (bloc, type, minute) : un argsort au lieu d'un lexsort à 3 clés
+    nb_crimes = int(crimes.max(initial=0)) + 1
+    etendue = int(decalees.max(initial=0)) + 1
+    if (int(bloc.max(initial=0)) + 1) * nb_crimes * etendue < 2 ** 62:
+        ordre = np.argsort((bloc * nb_crimes + crimes[lignes]) * etendue + decalees, kind='stable')
+    else:
+        ordre = np.lexsort((decalees, crimes[lignes], bloc))
+    # Colonnes triées : les comparaisons entre voisins portent sur des tranches contiguës
+    lignes, bloc, type_crime, minutes = lignes[ordre], bloc[ordre], crimes[lignes][ordre], minutes[ordre]
+
+    tolerance_min = tolerance // pd.Timedelta(minutes=1)
+    gauche, droite = [], []
+    for d in range(1, voisins + 1):
+        candidats = ((bloc[:-d] == bloc[d:]) & (type_crime[:-d] == type_crime[d:])
+                     & (minutes[d:] - minutes[:-d] <= tolerance_min))
+        positions = np.flatnonzero(candidats)
+        gauche.append(lignes[positions])
+        droite.append(lignes[positions + d])
+    gauche, droite = np.concatenate(gauche), np.concatenate(droite)
+
+    # Adresses : égales après normalisation, sinon comparées une fois par paire distincte
+    paires = adresses[gauche].astype(np.int64) * len(libelles) + adresses[droite]
+    egales = adresses[gauche] == adresses[droite]
+    distinctes = np.unique(paires[~egales])
+    proches = [p for p in distinctes if _adresses_proches(libelles[p // len(libelles)], libelles[p % len(libelles)])]
+    similaires = egales | np.isin(paires, proches)
+    gauche, droite = gauche[similaires], droite[similaires]
+
+    groupes = np.full(nb, -1)
+    if len(gauche) == 0:
+        return groupes, np.zeros(nb, dtype=bool)
+    etiquettes = _composantes(nb, gauche, droite)
+    dans_groupe = np.zeros(nb, dtype=bool)
+    dans_groupe[gauche] = dans_groupe[droite] = True
+    groupes[dans_groupe] = etiquettes[dans_groupe]
+    # Le représentant (plus petit indice) est la première ligne du groupe : on la garde
+    a_supprimer = dans_groupe & (etiquettes != np.arange(nb))
+    return groupes, a_supprimer
+
+def rapport_groupes(df, groupes, a_supprimer):
+    """Une ligne par rapport fusionné : groupe, rapport gardé ou supprimé, champs utiles."""
+    dans_groupe = groupes >= 0
+    colonnes = [c for c in ('File Number', 'Date of Report', 'crime_start', 'Crime', 'Reporting Area', 'Location')
+                if c in df.columns]
+    rapport = df.loc[dans_groupe, colonnes].reset_index(drop=True)
+    rapport.insert(0, 'groupe', pd.factorize(groupes[dans_groupe])[0])
+    rapport.insert(1, 'garde', ~a_supprimer[dans_groupe])
+    return rapport.sort_values(['groupe', 'garde'], ascending=[True, False], kind='stable', ignore_index=True)
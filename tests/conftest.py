@@ -0,0 +1,18 @@
+"""Tests de non-régression : les modules du projet sont à la racine du dépôt."""
+import os
+import sys
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+# Extrait du fichier brut livré avec le dépôt
+ECHANTILLON = os.path.join(RACINE, "crime_reports.csv")
+
+@pytest.fixture
+def brut():
+    """Fichier brut d'exemple (~10 000 rapports), lu comme par le mode en mémoire."""
+    import pandas as pd
+
+    return pd.read_csv(ECHANTILLON, low_memory=False)
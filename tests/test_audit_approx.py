@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import audit_approx
+import main
+from conftest import ECHANTILLON
+
+# Plusieurs blocs lus en flux sur l'échantillon (~1 Mo)
+OCTETS_BLOC = 200_000
+
+@pytest.fixture(scope="module")
+def exact():
+    return main.calculer_indicateurs(pd.read_csv(ECHANTILLON, dtype=str))
+
+def test_approx_exact_si_tout_est_echantillonne(exact):
+    stats, erreurs, nb_lignes = audit_approx.auditer_approx(ECHANTILLON, octets_bloc=OCTETS_BLOC)
+    assert nb_lignes == len(pd.read_csv(ECHANTILLON, dtype=str))
+    assert stats.keys() == exact.keys()
+    for indicateur, valeur in exact.items():
+        if indicateur in ("Unicité [File Number]", "Taux Doublons Exacts"):
+            # Estimations restantes : l'esquisse HyperLogLog et le filtre de Bloom
+            assert 0 < erreurs[indicateur] < 1, indicateur
+            assert stats[indicateur] == pytest.approx(valeur, abs=erreurs[indicateur]), indicateur
+        else:
+            assert erreurs[indicateur] == 0.0, indicateur
+            assert stats[indicateur] == pytest.approx(valeur, abs=1e-9), indicateur
+
+def test_approx_dans_les_intervalles(exact):
+    stats, erreurs, _ = audit_approx.auditer_approx(ECHANTILLON, taille_echantillon=2_000,
+                                                    octets_bloc=OCTETS_BLOC, graine=0)
+    for indicateur, valeur in exact.items():
+        assert 0 < erreurs[indicateur] < 5, indicateur
+        assert abs(stats[indicateur] - valeur) <= erreurs[indicateur], indicateur
+
+def _hll(precision, nb, graine):
+    hll = audit_approx.HyperLogLog(precision)
+    hll.ajouter(np.random.default_rng(graine).integers(0, 2**64 - 1, nb, dtype=np.uint64))
+    return hll.estimer()
+
+@pytest.mark.parametrize("nb", [2_600, 3_000, 4_000])
+def test_hll_sans_biais_apres_le_comptage_lineaire(nb):
+    # 2^10 registres : l'estimation brute prenait le relais à 2.5 x 1024 valeurs, biaisée de ~+1 %
+    estimations = [_hll(10, nb, graine) for graine in range(200)]
+    relatifs = np.array([estimation / nb - 1 for estimation, _ in estimations])
+    couvertes = [abs(estimation - nb) <= audit_approx.Z_95 * ecart * estimation for estimation, ecart in estimations]
+    assert abs(relatifs.mean()) < 0.005
+    assert np.mean(couvertes) >= 0.9
+
+@pytest.mark.parametrize("nb", [170_000, 200_000])
+def test_hll_intervalle_couvre_a_pleine_precision(nb):
+    for graine in range(3):
+        estimation, ecart = _hll(audit_approx.PRECISION_HLL, nb, graine)
+        assert ecart == pytest.approx(1.04 / math.sqrt(2 ** audit_approx.PRECISION_HLL))
+        assert abs(estimation - nb) <= audit_approx.Z_95 * ecart * estimation
+
+def test_bloom_dimensionne_sur_le_nombre_de_lignes():
+    bloom = audit_approx.FiltreBloom.pour(100_000, 0.01)
+    # ~9.6 bits et 7 hash par élément à 1 % de faux positifs
+    assert bloom.bits.nbytes == pytest.approx(100_000 * 9.6 / 8, rel=0.01)
+    assert bloom.nb_hashs == 7
+    hashes = np.random.default_rng(0).integers(0, 2**64 - 1, 110_000, dtype=np.uint64)
+    bloom.ajouter(hashes[:100_000])
+    nb_avant = bloom.doublons
+    bloom.ajouter(hashes[100_000:])
+    # Hash jamais vus : ~1 % signalés présents, corrigés en ~0 doublon
+    assert abs(bloom.doublons - nb_avant) <= audit_approx.Z_95 * math.sqrt(bloom.variance) + 1
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+import cache_resultats
+import crime
+from conftest import ECHANTILLON
+
+SERVI = "résultat servi par le cache"
+
+@pytest.fixture
+def nettoyer(tmp_path, capsys):
+    """Lance « crime.py clean » sur l'échantillon ; retourne (servi par le cache ?, Parquet écrit)."""
+    def lancer(*options):
+        sortie = tmp_path / "propre.parquet"
+        code = crime.principal(["clean", "--entree", ECHANTILLON, "--sortie", str(sortie),
+                                "--cache", str(tmp_path / "cache"), *options])
+        assert code == 0
+        return SERVI in capsys.readouterr().out, pd.read_parquet(sortie)
+    return lancer
+
+def test_relance_identique_servie_par_le_cache(nettoyer):
+    servi, premier = nettoyer()
+    assert not servi
+    servi, second = nettoyer()
+    assert servi
+    assert second.equals(premier)
+
+@pytest.mark.parametrize("options", [("--compact",), ("--workers", "2"), ("--blocs", "4000"),
+                                     ("--blocs", "4000", "--pipeline", "--profondeur", "3")])
+def test_options_dans_la_cle(nettoyer, options):
+    _, defaut = nettoyer()
+    servi, donnees = nettoyer(*options)
+    assert not servi
+    # Mêmes données (ces options ne changent que la façon de calculer), puis servi par le cache
+    assert donnees.equals(defaut)
+    servi, _ = nettoyer(*options)
+    assert servi
+
+def test_taille_des_blocs_dans_la_cle(nettoyer):
+    nettoyer("--blocs", "4000")
+    servi, _ = nettoyer("--blocs", "5000")
+    assert not servi
+
+def test_sources_de_la_cli_dans_la_cle():
+    assert {"crime.py", "instrumentation.py"} <= set(cache_resultats.MODULES_PIPELINE)
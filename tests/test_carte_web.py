@@ -0,0 +1,50 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chemins import GEOJSON_FILE
+from cube_crime import MESURE, construire_cube
+from main import VALID_NEIGHBORHOODS
+
+gpd = pytest.importorskip("geopandas")
+carte_web = pytest.importorskip("carte_web")
+
+def _donnees_nettoyees():
+    """Quelques crimes dans chacun des 13 quartiers des rapports, sur deux mois."""
+    quartiers = sorted(VALID_NEIGHBORHOODS)
+    n = 4 * len(quartiers)
+    return pd.DataFrame({
+        'Neighborhood': quartiers * 4,
+        'Crime': ['Larceny from MV', 'Hit and Run'] * (n // 2),
+        'reporting_area_group': np.arange(n) % 7,
+        'crime_start': pd.date_range('2016-01-20', periods=n, freq='17h'),
+    })
+
+def test_tranche_tous_les_crimes_couvre_le_cube(tmp_path):
+    gdf = gpd.read_file(GEOJSON_FILE)
+    cube = construire_cube(_donnees_nettoyees())
+    carte_web.exporter_web(gdf, 'NAME', cube, str(tmp_path))
+
+    index = json.loads((tmp_path / "tranches.json").read_text(encoding="utf-8"))
+    tous = json.loads((tmp_path / "tranches" / "0.json").read_text(encoding="utf-8"))
+    assert tous['titre'] == "Tous les crimes"
+    # Les 6 quartiers aux noms officiels différents (The Port, Baldwin...) ne sont pas à 0
+    assert sum(tous['comptes']) == cube[MESURE].sum()
+    assert all(nb == 4 for nb in tous['comptes'])
+    assert index[0]['tranches'][0][1] == cube[MESURE].sum()
+
+    # Chaque tranche crime x mois est comptée une fois
+    totaux = [total for groupe in index[1:] for _, total in groupe['tranches']]
+    assert sum(totaux) == cube[MESURE].sum()
+    nb_tranches = sum(len(groupe['tranches']) for groupe in index)
+    assert len(os.listdir(tmp_path / "tranches")) == nb_tranches
+
+def test_quartier_sans_polygone_refuse(tmp_path):
+    gdf = gpd.read_file(GEOJSON_FILE)
+    donnees = _donnees_nettoyees()
+    donnees.loc[0, 'Neighborhood'] = "Atlantis"
+    with pytest.raises(ValueError, match="Atlantis"):
+        carte_web.exporter_web(gdf, 'NAME', construire_cube(donnees), str(tmp_path))
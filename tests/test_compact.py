@@ -0,0 +1,29 @@
+import pyarrow as pa
+
+import main
+from conftest import ECHANTILLON
+from cube_crime import construire_cube
+
+def _nettoyer(df):
+    return main.enrichir_donnees(main.nettoyer_donnees(df))
+
+def test_export_compact_identique(brut):
+    defaut = _nettoyer(brut)
+    compact = _nettoyer(main.lire_csv_compact(ECHANTILLON))
+    # En mémoire : petits entiers et catégories...
+    assert compact['Reporting Area'].dtype.itemsize < 8
+    # ... mais le même schéma et les mêmes valeurs à l'export
+    table_defaut, table_compacte = main.vers_table_arrow(defaut), main.vers_table_arrow(compact)
+    assert table_compacte.schema.equals(table_defaut.schema)
+    assert table_compacte.equals(table_defaut)
+    assert table_compacte.schema.field('Reporting Area').type == pa.int64()
+
+    cube_defaut = main.vers_table_arrow(construire_cube(defaut))
+    cube_compact = main.vers_table_arrow(construire_cube(compact))
+    assert cube_compact.equals(cube_defaut)
+
+def test_csv_compact_identique(brut):
+    defaut = main.decompacter_donnees(_nettoyer(brut))
+    compact = main.decompacter_donnees(_nettoyer(main.lire_csv_compact(ECHANTILLON)))
+    options = dict(index=False, date_format=main.FMT_EXPORT)
+    assert compact.to_csv(**options) == defaut.to_csv(**options)
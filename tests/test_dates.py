@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from main import FMT_CRIME, FMT_REPORT, parser_date_report, parser_intervalle_crime
+
+REPORTS = [
+    '04/21/2016 09:05:00 AM', '04/21/2016 12:00:00 AM', '04/21/2016 12:30:00 PM',
+    '12/31/2016 11:59:59 PM', '02/29/2016 01:00:00 PM',
+    # Hors largeur fixe : acceptés par pd.to_datetime
+    '4/1/2016 1:05:00 pm', '4/21/2016 9:05:00 am', '04/21/2016 09:05:00 pm',
+    # Invalides
+    '02/30/2016 01:00:00 PM', '13/01/2016 01:00:00 PM', '04/21/2016 13:05:00 PM', 'pas une date', '',
+]
+
+def _reference(valeurs, fmt):
+    return pd.to_datetime(pd.Series(valeurs, dtype=object), format=fmt, errors='coerce')
+
+def test_date_report_comme_to_datetime():
+    serie = pd.Series(REPORTS + [None], dtype='str')
+    resultat = parser_date_report(serie)
+    attendu = _reference(REPORTS + [None], FMT_REPORT)
+    np.testing.assert_array_equal(resultat.to_numpy(dtype='datetime64[ns]'), attendu.to_numpy(dtype='datetime64[ns]'))
+    assert resultat.iloc[5] == pd.Timestamp('2016-04-01 13:05:00')
+
+def test_date_report_colonne_non_textuelle():
+    serie = pd.Series([20160421, '04/21/2016 09:05:00 AM', None], dtype=object)
+    resultat = parser_date_report(serie)
+    assert resultat.isna().tolist() == [True, False, True]
+    assert resultat.iloc[1] == pd.Timestamp('2016-04-21 09:05:00')
+
+def test_instants_comme_to_datetime():
+    instants = ['04/14/2016 18:00', '4/14/2016 18:00', '04/14/2016 8:05', '4/1/2016 0:00', '04/31/2016 18:00', 'x']
+    debut, fin = parser_intervalle_crime(pd.Series(instants, dtype='str'))
+    attendu = _reference(instants, FMT_CRIME).to_numpy(dtype='datetime64[ns]')
+    np.testing.assert_array_equal(debut.to_numpy(dtype='datetime64[ns]'), attendu)
+    np.testing.assert_array_equal(fin.to_numpy(dtype='datetime64[ns]'), attendu)
+
+def test_intervalles():
+    valeurs = {
+        '04/13/2016 20:00 - 04/14/2016 06:30': ('2016-04-13 20:00', '2016-04-14 06:30'),
+        '04/21/2016 12:15 - 13:00': ('2016-04-21 12:15', '2016-04-21 13:00'),
+        '04/21/2016 22:00 - 02:00': ('2016-04-21 22:00', '2016-04-22 02:00'),
+        '04/21/2016': ('2016-04-21 00:00', '2016-04-21 23:59'),
+        '04/21/2016 - 04/23/2016': ('2016-04-21 00:00', '2016-04-23 23:59'),
+        # Sans zéros de tête
+        '4/21/2016 8:15 - 9:00': ('2016-04-21 08:15', '2016-04-21 09:00'),
+        '4/1/2016 - 4/3/2016': ('2016-04-01 00:00', '2016-04-03 23:59'),
+    }
+    debut, fin = parser_intervalle_crime(pd.Series(list(valeurs), dtype='str'))
+    assert debut.tolist() == [pd.Timestamp(d) for d, _ in valeurs.values()]
+    assert fin.tolist() == [pd.Timestamp(f) for _, f in valeurs.values()]
+
+def test_intervalles_invalides():
+    valeurs = ['04/14/2016 06:30 - 04/13/2016 20:00', '04/21/2016 25:00', 'inconnu', None]
+    debut, fin = parser_intervalle_crime(pd.Series(valeurs, dtype='str'))
+    assert debut.isna().all() and fin.isna().all()
+
+def test_intervalle_colonne_non_textuelle():
+    debut, fin = parser_intervalle_crime(pd.Series([3.5, None]))
+    assert debut.isna().all() and fin.isna().all()
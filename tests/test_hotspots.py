@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube_crime import MESURE
+from hotspots_crime import detecter_pics, ligne_de_base
+
+@pytest.fixture
+def comptes():
+    return np.random.default_rng(0).poisson(3.0, size=(4, 60)).astype(np.float64)
+
+def _reference(comptes, fenetre, methode):
+    """Référence pandas : statistiques des points précédents (décalage d'un pas)."""
+    series = pd.DataFrame(comptes.T)
+    if methode == 'moyenne':
+        fenetres = series.rolling(fenetre, min_periods=1)
+        moyenne, ecart = fenetres.mean(), fenetres.std(ddof=0)
+    else:
+        lissees = series.ewm(alpha=2 / (fenetre + 1), adjust=False)
+        moyenne, ecart = lissees.mean(), lissees.std(bias=True)
+    return moyenne.shift(1).fillna(0.0).to_numpy().T, ecart.shift(1).fillna(0.0).to_numpy().T
+
+@pytest.mark.parametrize("methode", ["moyenne", "ewma"])
+@pytest.mark.parametrize("fenetre", [1, 7, 28, 100])
+def test_ligne_de_base_egale_a_pandas(comptes, methode, fenetre):
+    moyenne, ecart, nb_points = ligne_de_base(comptes, fenetre, methode)
+    moyenne_ref, ecart_ref = _reference(comptes, fenetre, methode)
+    np.testing.assert_allclose(moyenne, moyenne_ref, atol=1e-9)
+    np.testing.assert_allclose(ecart, ecart_ref, atol=1e-6)
+    pas = np.arange(comptes.shape[1])
+    np.testing.assert_array_equal(nb_points, np.minimum(pas, fenetre) if methode == 'moyenne' else pas)
+
+def _cube(pic_jour, pic_crimes):
+    """Deux quartiers sur 60 jours, 1 puis 2 crimes en alternance, un pic injecté dans Riverside."""
+    jours = pd.date_range("2024-01-01", periods=60, freq="D")
+    cube = pd.DataFrame({
+        'Neighborhood': np.repeat(["Riverside", "Cambridgeport"], len(jours)),
+        'jour': np.tile(jours, 2),
+        'heure': 12,
+        MESURE: np.tile(np.arange(len(jours)) % 2 + 1, 2),
+    })
+    cube.loc[pic_jour, MESURE] = pic_crimes
+    return cube, jours
+
+@pytest.mark.parametrize("methode", ["moyenne", "ewma"])
+def test_pic_injecte_detecte(methode):
+    cube, jours = _cube(45, 20)
+    pics = detecter_pics(cube, fenetre=14, methode=methode)
+    assert len(pics) == 1
+    pic = pics.iloc[0]
+    assert (pic['Neighborhood'], pic['debut'], pic[MESURE]) == ("Riverside", jours[45], 20)
+    assert pic['z'] > 10
+
+def test_pic_sans_historique_complet_ignore():
+    cube, _ = _cube(10, 20)
+    assert detecter_pics(cube, fenetre=14).empty
+    assert len(detecter_pics(cube, fenetre=7)) == 1
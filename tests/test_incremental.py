@@ -0,0 +1,78 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import main
+from conftest import ECHANTILLON
+from cube_crime import chemin_cube, construire_cube
+
+TAILLE_BLOC = 2_000
+
+def _lire_store(dossier):
+    return pa.concat_tables([pq.read_table(part) for part in sorted(glob.glob(os.path.join(dossier, "part-*.parquet")))])
+
+def _decoder(table):
+    """Colonnes dictionnaire décodées : chaque part a son propre dictionnaire."""
+    return pa.table({nom: colonne.cast(colonne.type.value_type) if pa.types.is_dictionary(colonne.type) else colonne
+                     for nom, colonne in zip(table.column_names, table.columns)})
+
+@pytest.fixture
+def exports(tmp_path):
+    """Export cumulatif en ajout seul : un premier export partiel, puis le fichier complet."""
+    with open(ECHANTILLON, encoding="utf-8") as f:
+        lignes = f.readlines()
+    partiel = tmp_path / "export_1.csv"
+    partiel.write_text("".join(lignes[:5_501]), encoding="utf-8")
+    return str(partiel), ECHANTILLON
+
+@pytest.fixture
+def en_memoire(brut):
+    return main.enrichir_donnees(main.nettoyer_donnees(brut))
+
+def test_deux_executions_egales_au_mode_en_memoire(tmp_path, exports, brut, en_memoire):
+    store = str(tmp_path / "store")
+    premier = main.nettoyer_incremental(exports[0], store, taille_bloc=TAILLE_BLOC)
+    assert premier['nb_parts'] == 1 and premier['nb_lignes'] == 5_500
+    etat = main.nettoyer_incremental(exports[1], store, taille_bloc=TAILLE_BLOC)
+    assert etat['nb_parts'] == 2 and etat['nb_lignes'] == len(brut)
+
+    assert _decoder(_lire_store(store)).equals(_decoder(main.vers_table_arrow(en_memoire)))
+    cube = pd.read_parquet(chemin_cube(store))
+    assert main.vers_table_arrow(cube).equals(main.vers_table_arrow(construire_cube(en_memoire)))
+
+    # Audits cumulés dans l'état : ceux du fichier entier, avant et après nettoyage
+    for cle, attendus in (('avant', main.calculer_indicateurs(brut)), ('apres', main.calculer_indicateurs(en_memoire))):
+        stats = main.audit_depuis_etat(etat, cle)
+        assert stats.keys() == attendus.keys()
+        for indicateur, valeur in attendus.items():
+            assert stats[indicateur] == pytest.approx(valeur), (cle, indicateur)
+
+    # L'état rechargé depuis le disque est celui retourné
+    recharge = main.charger_etat(os.path.join(store, main.ETAT_FICHIER))
+    for cle in ('watermark', 'nb_lignes', 'nb_parts', 'avant', 'apres'):
+        assert recharge[cle] == etat[cle], cle
+    np.testing.assert_array_equal(recharge['lignes'].tableau(), etat['lignes'].tableau())
+
+def test_reexecution_sans_nouvelle_ligne(tmp_path, exports, capsys):
+    store = str(tmp_path / "store")
+    main.nettoyer_incremental(exports[1], store, taille_bloc=TAILLE_BLOC)
+    avant = _lire_store(store)
+    fichiers = sorted(os.listdir(store))
+    capsys.readouterr()
+
+    etat = main.nettoyer_incremental(exports[1], store, taille_bloc=TAILLE_BLOC)
+    sortie = capsys.readouterr().out
+
+    assert "Ajoutées au store : 0 lignes" in sortie
+    assert "ont changé" not in sortie
+    assert etat['nb_parts'] == 1
+    assert sorted(os.listdir(store)) == fichiers
+    assert _lire_store(store).equals(avant)
+    # Ni les lignes ni les audits de l'historique ne sont comptés deux fois
+    assert etat['avant']['n'] == etat['nb_lignes'] == len(pd.read_csv(ECHANTILLON, dtype=str))
+    assert etat['apres']['n'] == avant.num_rows
@@ -0,0 +1,68 @@
+import pickle
+
+import numpy as np
+import pytest
+import shapely
+
+import main
+from jointure_spatiale import IndexQuartiers, assigner_quartiers, charger_index_quartiers
+
+@pytest.fixture
+def carres():
+    """Deux quartiers carrés côte à côte, frontière commune x = 1."""
+    return IndexQuartiers([shapely.box(0, 0, 1, 1), shapely.box(1, 0, 2, 1)], ["Ouest", "Est"])
+
+POINTS = {
+    "dedans ouest": ((0.5, 0.5), "Ouest"),
+    "dedans est": ((1.5, 0.25), "Est"),
+    "dehors": ((3.0, 3.0), None),
+    "dans la boîte, hors polygone": ((1.0, 1.5), None),
+    "bord extérieur": ((0.0, 0.5), "Ouest"),
+    "frontière commune": ((1.0, 0.5), "Ouest"),
+    "coordonnées nulles": ((np.nan, 0.5), None),
+}
+
+def _assigner(index):
+    lon, lat = zip(*(point for point, _ in POINTS.values()))
+    return dict(zip(POINTS, assigner_quartiers(lon, lat, index)))
+
+def test_points_dedans_dehors_et_sur_les_frontieres(carres):
+    assert _assigner(carres) == {nom: attendu for nom, (_, attendu) in POINTS.items()}
+
+def test_index_serialise_reconstruit_son_arbre(carres):
+    attendu = _assigner(carres)
+    assert carres._arbre is not None
+    copie = pickle.loads(pickle.dumps(carres))
+    # L'arbre ne voyage pas : il est reconstruit à la première requête
+    assert copie._arbre is None
+    assert _assigner(copie) == attendu
+    assert copie._arbre is not None
+
+@pytest.fixture(scope="module")
+def quartiers():
+    return charger_index_quartiers()
+
+def test_quartiers_du_geojson(quartiers):
+    # Un point intérieur de chaque polygone retrouve son quartier, au nom des rapports
+    points = shapely.point_on_surface(quartiers.geometries)
+    trouves = assigner_quartiers(shapely.get_x(points), shapely.get_y(points), quartiers)
+    np.testing.assert_array_equal(trouves, quartiers.noms)
+    assert set(quartiers.noms) <= main.VALID_NEIGHBORHOODS
+
+def test_recuperation_par_les_workers(brut, quartiers):
+    df = brut.head(3_000).copy()
+    points = shapely.point_on_surface(quartiers.geometries)
+    polygone = np.arange(len(df)) % len(points)
+    df['Longitude'] = shapely.get_x(points)[polygone]
+    df['Latitude'] = shapely.get_y(points)[polygone]
+    invalides = np.arange(len(df)) % 4 == 0
+    df.loc[invalides, 'Neighborhood'] = "Inconnu"
+
+    serie = main.nettoyer_donnees(df.copy(), index_quartiers=quartiers)
+    parallele = main.nettoyer_donnees(df.copy(), workers=2, index_quartiers=quartiers)
+    assert parallele.equals(serie)
+    # Les lignes invalides gardées ont reçu le quartier de leur point
+    recuperees = serie.index[invalides[serie.index]]
+    assert len(recuperees) > 0
+    np.testing.assert_array_equal(serie.loc[recuperees, 'Neighborhood'].to_numpy(dtype=object),
+                                  quartiers.noms[polygone[recuperees]])
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chemins import GEOJSON_FILE
+from cube_crime import MESURE, compter_par_quartier, construire_cube
+from main import VALID_NEIGHBORHOODS
+
+gpd = pytest.importorskip("geopandas")
+mapping_crime = pytest.importorskip("mapping_crime")
+
+def test_jointure_comptes_sur_les_noms_des_rapports():
+    quartiers = sorted(VALID_NEIGHBORHOODS)
+    donnees = pd.DataFrame({
+        'Neighborhood': [q for i, q in enumerate(quartiers) for _ in range(i + 1)],
+        'Crime': 'Hit and Run',
+        'reporting_area_group': 1,
+        'crime_start': pd.Timestamp('2016-04-14 18:00'),
+    })
+    cube = construire_cube(donnees)
+    gdf = gpd.read_file(GEOJSON_FILE)
+    joint = mapping_crime.joindre_comptes(gdf, 'NAME', compter_par_quartier(cube))
+
+    # Un polygone par quartier, aucun à 0 (The Port = Area 4, Baldwin = Agassiz...)
+    assert len(joint) == len(gdf)
+    assert (joint['Crime_Count'] > 0).all()
+    assert joint['Crime_Count'].sum() == cube[MESURE].sum()
+    comptes = dict(zip(joint['NAME'], joint['Crime_Count']))
+    assert comptes['The Port'] == quartiers.index('Area 4') + 1
+    assert comptes['Baldwin'] == quartiers.index('Agassiz') + 1
+    assert np.isclose(comptes['Area 2/MIT'], quartiers.index('MIT') + 1)
+
+def test_nom_carte_distingue_la_ponctuation():
+    noms = [mapping_crime.nom_carte(filtres) for filtres in
+            ({'crime': 'Larceny from MV'}, {'crime': 'Larceny-from-MV'}, {'crime': 'Larceny from MV', 'heures': (20, 6)}, {})]
+    assert len(set(noms)) == len(noms)
+    assert noms[0].startswith("Larceny_from_MV_") and noms[1].startswith("Larceny_from_MV_")
+    assert noms[3].startswith("Tous_les_crimes_")
+    # Nom stable d'une exécution à l'autre (cache, liens)
+    assert mapping_crime.nom_carte({'heures': (20, 6), 'crime': 'Larceny from MV'}) == noms[2]
+
+@pytest.fixture(scope="module")
+def donnees_propres(tmp_path_factory):
+    import main
+    from conftest import ECHANTILLON
+
+    chemin = str(tmp_path_factory.mktemp("propres") / "propres.parquet")
+    main.nettoyer_donnees_par_blocs(ECHANTILLON, chemin)
+    return chemin
+
+def test_lot_sans_ecrasement(tmp_path, donnees_propres):
+    pytest.importorskip("folium")
+    liste = [{'crime': 'Larceny from MV'}, {'crime': 'Larceny-from-MV'}]
+    fichiers = mapping_crime.generer_cartes_lot(liste, str(tmp_path), formats=('html',), chemin=donnees_propres)
+    assert len(set(fichiers)) == 2
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(f) for f in fichiers)
+
+def test_lot_refuse_les_filtres_en_double(tmp_path, donnees_propres, capsys):
+    liste = [{'crime': 'Larceny from MV'}, {'crime': 'Larceny from MV'}]
+    dossier = tmp_path / "lot"
+    assert mapping_crime.generer_cartes_lot(liste, str(dossier), formats=('html',), chemin=donnees_propres) == []
+    assert "filtres en double" in capsys.readouterr().out
+    assert not dossier.exists()
@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import main
+import pipeline_flux
+from conftest import ECHANTILLON
+
+TAILLE_BLOC = 3_000
+
+@pytest.fixture
+def par_blocs(tmp_path):
+    """Sortie de référence : nettoyage par blocs, en série."""
+    chemin = str(tmp_path / "blocs.parquet")
+    nb = main.nettoyer_donnees_par_blocs(ECHANTILLON, chemin, taille_bloc=TAILLE_BLOC)
+    return chemin, nb
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_pipeline_identique_aux_blocs(tmp_path, par_blocs, capsys, workers):
+    chemin_blocs, nb = par_blocs
+    capsys.readouterr()
+    chemin = str(tmp_path / "pipeline.parquet")
+    resultat = pipeline_flux.nettoyer_en_pipeline(ECHANTILLON, chemin, taille_bloc=TAILLE_BLOC, workers=workers)
+    sortie = capsys.readouterr().out
+
+    assert resultat['lignes_apres'] == nb
+    assert pq.read_table(chemin).equals(pq.read_table(chemin_blocs))
+    assert pd.read_parquet(main.chemin_cube(chemin)).equals(pd.read_parquet(main.chemin_cube(chemin_blocs)))
+    # Suppressions des deux étages (doublons et règles ligne à ligne) réunies dans le bilan
+    assert resultat['lignes_avant'] - resultat['lignes_apres'] > 0
+    assert f"Total supprimé : {resultat['lignes_avant'] - resultat['lignes_apres']}" in sortie
+
+def test_pipeline_ferme_les_exports_sur_erreur(tmp_path, monkeypatch):
+    enrichir = pipeline_flux.ajouter_colonnes_derivees
+    appels = []
+
+    def enrichir_puis_echouer(bloc):
+        appels.append(len(bloc))
+        if len(appels) == 2:
+            raise RuntimeError("étage en échec")
+        return enrichir(bloc)
+
+    monkeypatch.setattr(pipeline_flux, "ajouter_colonnes_derivees", enrichir_puis_echouer)
+    chemin = str(tmp_path / "pipeline.parquet")
+    with pytest.raises(RuntimeError, match="étage en échec"):
+        pipeline_flux.nettoyer_en_pipeline(ECHANTILLON, chemin, taille_bloc=TAILLE_BLOC)
+
+    # Parquet refermé (pied de fichier écrit) avec le seul bloc traité, pas de cube partiel
+    assert pq.read_table(chemin).num_rows > 0
+    assert pq.ParquetFile(chemin).num_row_groups == 1
+    assert not os.path.exists(main.chemin_cube(chemin))
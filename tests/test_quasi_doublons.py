@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+from quasi_doublons import marquer_quasi_doublons, normaliser_location
+
+def _ressaisir(location):
+    """Même adresse, saisie autrement : voies en toutes lettres, carrefour inversé."""
+    adresse = location.removesuffix(', Cambridge, MA').replace(' ST', ' Street').replace(' AVE', ' Avenue')
+    gauche, _, droite = adresse.partition(' & ')
+    return f"{droite} & {gauche}" if droite else adresse.lower()
+
+@pytest.fixture
+def avec_copies(brut):
+    """Échantillon brut + 20 rapports ressaisis sous un autre File Number (en fin de fichier)."""
+    gardes = main.nettoyer_donnees(brut.copy())['File Number']
+    candidats = brut[brut['File Number'].isin(gardes)
+                     & brut['Location'].str.contains(r' (?:ST|AVE)\b', na=False)]
+    carrefours = candidats[candidats['Location'].str.contains(' & ')]
+    originaux = pd.concat([candidats.drop(carrefours.index).iloc[::200].head(15), carrefours.iloc[::50].head(5)])
+    copies = originaux.assign(**{
+        'File Number': [f"2099-{i:05d}" for i in range(len(originaux))],
+        'Crime': originaux['Crime'].str.upper().str.replace(' ', ' / ', n=1),
+        'Location': originaux['Location'].map(_ressaisir),
+    })
+    return pd.concat([brut, copies], ignore_index=True), originaux, copies
+
+def test_normalisation_des_copies(avec_copies):
+    _, originaux, copies = avec_copies
+    assert (copies['Location'].to_numpy() != originaux['Location'].to_numpy()).all()
+    assert (normaliser_location(copies['Location']).to_numpy()
+            == normaliser_location(originaux['Location']).to_numpy()).all()
+
+def test_copies_marquees(brut, avec_copies):
+    df, originaux, copies = avec_copies
+    reference = main.nettoyer_donnees(brut.copy())
+    propre = main.nettoyer_donnees(df)
+
+    _, a_supprimer_ref = marquer_quasi_doublons(reference)
+    groupes, a_supprimer = marquer_quasi_doublons(propre)
+    # Les copies, en fin de fichier, sont marquées ; le reste est marqué comme sans elles
+    est_copie = propre['File Number'].isin(copies['File Number']).to_numpy()
+    assert est_copie.sum() == len(copies)
+    assert a_supprimer[est_copie].all()
+    np.testing.assert_array_equal(a_supprimer[~est_copie], a_supprimer_ref)
+    # Chaque copie est dans le groupe de son original
+    par_numero = pd.Series(groupes, index=propre['File Number'].to_numpy())
+    np.testing.assert_array_equal(par_numero[copies['File Number']].to_numpy(),
+                                  par_numero[originaux['File Number']].to_numpy())
+
+def test_nettoyage_supprime_les_copies(brut, avec_copies):
+    df, originaux, copies = avec_copies
+    reference = main.nettoyer_donnees(brut.copy(), quasi_doublons=True)
+    resultat = main.nettoyer_donnees(df, quasi_doublons=True)
+    assert len(resultat) == len(reference)
+    assert not resultat['File Number'].isin(copies['File Number']).any()
+    assert originaux['File Number'].isin(resultat['File Number']).all()
+
+def test_paire_a_cheval_sur_minuit():
+    df = pd.DataFrame({
+        'File Number': ['2020-00001', '2020-00002', '2020-00003'],
+        'crime_start': pd.to_datetime(['2020-03-01 23:30', '2020-03-02 00:15', '2020-03-02 03:00']),
+        'Reporting Area': [101, 101, 101],
+        'Crime': ['Hit and Run', 'HIT / RUN', 'Hit and Run'],
+        'Location': ['100 HARVARD ST, Cambridge, MA', '100 Harvard Street', '100 HARVARD ST, Cambridge, MA'],
+    })
+    groupes, a_supprimer = marquer_quasi_doublons(df)
+    # 45 min d'écart malgré le changement de jour ; le troisième est à 2 h 45 du second
+    np.testing.assert_array_equal(groupes, [0, 0, -1])
+    np.testing.assert_array_equal(a_supprimer, [False, True, False])
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import main
+
+# Lignes conformes de l'échantillon livré (10 506 rapports), relevées avec l'audit historique
+# par indicateur (benchmark.audit_par_indicateur)
+COMPTEURS_ECHANTILLON = {
+    'Complétude [File Number]': 10506,
+    'Complétude [Crime]': 9981,
+    'Complétude [Neighborhood]': 9789,
+    'Unicité [File Number]': 10000,
+    'Taux Doublons Exacts': 204,
+    'Validité Date [Date of Report]': 10403,
+    'Cohérence Temporelle (Report >= Crime)': 9994,
+    'Conformité [Reporting Area]': 10389,
+}
+
+def test_compteurs_de_l_echantillon(brut):
+    assert len(brut) == 10506
+    assert main.compter_indicateurs(brut) == COMPTEURS_ECHANTILLON
+    stats = main.calculer_indicateurs(brut)
+    for indicateur, nb in COMPTEURS_ECHANTILLON.items():
+        assert stats[indicateur] == pytest.approx(nb / len(brut) * 100), indicateur
+
+@pytest.fixture
+def garder(brut):
+    # Un sous-ensemble qui écarte des valeurs distinctes entières (et leurs répétitions)
+    return (brut['Neighborhood'] != 'Cambridgeport').to_numpy() & (np.arange(len(brut)) % 3 != 0)
+
+def test_restreindre_compte_le_sous_ensemble(brut, garder):
+    verification = main.Verification(brut)
+    verification.compter()
+    sous = verification.restreindre(garder)
+    attendu = main.Verification(brut[garder]).compter()
+
+    assert sous.compter() == attendu
+    assert attendu['Unicité [File Number]'] == brut[garder]['File Number'].nunique()
+    assert attendu['Unicité [File Number]'] < brut['File Number'].nunique()
+
+def test_restreindre_garde_les_masques_et_valeurs(brut, garder):
+    verification = main.Verification(brut)
+    verification.compter()
+    sous = verification.restreindre(garder)
+    neuve = main.Verification(brut[garder])
+    for nom in sous.regles:
+        np.testing.assert_array_equal(sous.masque(nom), neuve.masque(nom), err_msg=nom)
+    np.testing.assert_array_equal(sous.valeurs('Date of Report', 'date_report'),
+                                  neuve.valeurs('Date of Report', 'date_report'))
+    np.testing.assert_array_equal(sous.valeurs('Crime Date Time', 'intervalle_crime', 1),
+                                  neuve.valeurs('Crime Date Time', 'intervalle_crime', 1))